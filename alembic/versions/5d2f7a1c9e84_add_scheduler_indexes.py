@@ -0,0 +1,60 @@
+"""add scheduler indexes
+
+Revision ID: 5d2f7a1c9e84
+Revises: 4a1151ba0645
+Create Date: 2025-01-20 10:14:32.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d2f7a1c9e84'
+down_revision: Union[str, None] = '4a1151ba0645'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        # ASSIGNED/ACTIVE shipments that are due: terminal + status equality, range on next_scrape_time
+        op.create_index(
+            'ix_shipments_due', 'shipments',
+            ['terminal_id', 'scrape_status', 'next_scrape_time'],
+            postgresql_where=sa.text("scrape_status IN ('ASSIGNED', 'ACTIVE')"),
+            postgresql_concurrently=True
+        )
+        # FAILED/IN_PROGRESS shipments, including stale IN_PROGRESS claims by last_scraped_time
+        op.create_index(
+            'ix_shipments_retry', 'shipments',
+            ['terminal_id', 'scrape_status', 'last_scraped_time'],
+            postgresql_where=sa.text("scrape_status IN ('FAILED', 'IN_PROGRESS')"),
+            postgresql_concurrently=True
+        )
+        # Claim/stream ordering by (next_scrape_time, shipment_id) within a terminal
+        op.create_index(
+            'ix_shipments_terminal_next_scrape', 'shipments',
+            ['terminal_id', 'next_scrape_time', 'shipment_id'],
+            postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_container_status_table_container_number', 'container_status_table',
+            ['container_number'],
+            postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_container_status_table_container_number',
+                      table_name='container_status_table', postgresql_concurrently=True)
+        op.drop_index('ix_shipments_terminal_next_scrape',
+                      table_name='shipments', postgresql_concurrently=True)
+        op.drop_index('ix_shipments_retry', table_name='shipments',
+                      postgresql_concurrently=True)
+        op.drop_index('ix_shipments_due', table_name='shipments',
+                      postgresql_concurrently=True)
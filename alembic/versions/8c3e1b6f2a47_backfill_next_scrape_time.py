@@ -0,0 +1,38 @@
+"""backfill next_scrape_time as the due time of scheduled shipments
+
+Revision ID: 8c3e1b6f2a47
+Revises: 5d2f7a1c9e84
+Create Date: 2025-01-22 09:41:05.532871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c3e1b6f2a47'
+down_revision: Union[str, None] = '5d2f7a1c9e84'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The scheduler now filters on next_scrape_time <= now instead of computing
+    # (now - last_scraped_time) / 3600 >= frequency, so both must agree for existing rows
+    op.execute(
+        """
+        UPDATE shipments
+        SET next_scrape_time = last_scraped_time + frequency * INTERVAL '1 hour'
+        WHERE scrape_status IN ('ASSIGNED', 'ACTIVE')
+          AND last_scraped_time IS NOT NULL
+          AND frequency IS NOT NULL
+          AND next_scrape_time IS DISTINCT FROM last_scraped_time + frequency * INTERVAL '1 hour'
+        """
+    )
+
+
+def downgrade() -> None:
+    # Data backfill only; the previous values are not recoverable and not needed
+    pass
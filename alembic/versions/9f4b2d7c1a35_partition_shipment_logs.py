@@ -0,0 +1,120 @@
+"""partition shipment_logs by month on scraped_at
+
+Revision ID: 9f4b2d7c1a35
+Revises: 8c3e1b6f2a47
+Create Date: 2025-01-27 11:05:48.219304
+
+"""
+import datetime
+from typing import Sequence, Union
+from zoneinfo import ZoneInfo
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9f4b2d7c1a35'
+down_revision: Union[str, None] = '8c3e1b6f2a47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Monthly partitions created ahead of the current month.
+# The helpers below are a frozen copy of commons.maintenance at this revision.
+MONTHS_AHEAD = 3
+
+
+def month_start(value) -> datetime.date:
+    return datetime.date(value.year, value.month, 1)
+
+
+def add_months(month: datetime.date, months: int) -> datetime.date:
+    index = month.year * 12 + month.month - 1 + months
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def create_partitions(bind, first_month: datetime.date, last_month: datetime.date) -> None:
+    month = first_month
+    while month <= last_month:
+        bind.execute(sa.text(
+            f"CREATE TABLE IF NOT EXISTS shipment_logs_{month.year:04d}_{month.month:02d} "
+            f"PARTITION OF shipment_logs "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+        ))
+        month = add_months(month, 1)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+
+    # Step 1: Move the existing table aside
+    op.rename_table('shipment_logs', 'shipment_logs_legacy')
+    op.execute(
+        "ALTER TABLE shipment_logs_legacy RENAME CONSTRAINT uq_shipment_logs_log_id TO uq_shipment_logs_legacy_log_id")
+
+    # Step 2: Create the partitioned table. Unique keys must include the partition key,
+    # so log_id is unique together with scraped_at
+    op.execute(
+        """
+        CREATE TABLE shipment_logs (
+            log_id UUID NOT NULL,
+            shipment_id UUID NOT NULL REFERENCES shipments (shipment_id),
+            scrape_status scrapestatus,
+            scraped_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            new_data JSON,
+            CONSTRAINT pk_shipment_logs PRIMARY KEY (log_id, scraped_at)
+        ) PARTITION BY RANGE (scraped_at)
+        """
+    )
+    op.create_index(
+        'ix_shipment_logs_shipment_scraped', 'shipment_logs',
+        ['shipment_id', sa.text('scraped_at DESC')])
+
+    # Step 3: Create monthly partitions covering the existing logs and the next months
+    current_month = month_start(datetime.datetime.now(ZoneInfo("America/New_York")))
+    oldest = bind.execute(sa.text("SELECT min(scraped_at) FROM shipment_logs_legacy")).scalar()
+    first_month = min(month_start(oldest), current_month) if oldest else current_month
+    last_month = add_months(current_month, MONTHS_AHEAD)
+    newest = bind.execute(sa.text("SELECT max(scraped_at) FROM shipment_logs_legacy")).scalar()
+    if newest:
+        last_month = max(last_month, month_start(newest))
+    create_partitions(bind, first_month, last_month)
+
+    # Step 4: Copy the logs over and drop the old table
+    op.execute(
+        """
+        INSERT INTO shipment_logs (log_id, shipment_id, scrape_status, scraped_at, new_data)
+        SELECT log_id, shipment_id, scrape_status, scraped_at, new_data
+        FROM shipment_logs_legacy
+        """
+    )
+    op.drop_table('shipment_logs_legacy')
+
+
+def downgrade() -> None:
+    # Step 1: Recreate the plain table
+    op.rename_table('shipment_logs', 'shipment_logs_partitioned')
+    op.execute(
+        """
+        CREATE TABLE shipment_logs (
+            log_id UUID NOT NULL,
+            shipment_id UUID NOT NULL REFERENCES shipments (shipment_id),
+            scrape_status scrapestatus,
+            scraped_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            new_data JSON
+        )
+        """
+    )
+
+    # Step 2: Copy the logs back and drop the partitioned table with its partitions
+    op.execute(
+        """
+        INSERT INTO shipment_logs (log_id, shipment_id, scrape_status, scraped_at, new_data)
+        SELECT log_id, shipment_id, scrape_status, scraped_at, new_data
+        FROM shipment_logs_partitioned
+        """
+    )
+    op.drop_table('shipment_logs_partitioned')
+
+    # Step 3: Restore the unique constraint on log_id
+    op.create_unique_constraint('uq_shipment_logs_log_id', 'shipment_logs', ['log_id'])
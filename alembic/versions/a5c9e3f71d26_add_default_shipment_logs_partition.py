@@ -0,0 +1,47 @@
+"""add a default partition to shipment_logs
+
+Revision ID: a5c9e3f71d26
+Revises: e6f0b3d27a94
+Create Date: 2025-02-10 09:42:17.508316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a5c9e3f71d26'
+down_revision: Union[str, None] = 'e6f0b3d27a94'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Logs of months without a partition land here instead of failing the insert;
+    # commons.maintenance moves them out when it creates the month's partition
+    op.execute(
+        "CREATE TABLE IF NOT EXISTS shipment_logs_default PARTITION OF shipment_logs DEFAULT")
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+
+    # Step 1: Detach the default partition, so monthly partitions can be created for its logs
+    op.execute("ALTER TABLE shipment_logs DETACH PARTITION shipment_logs_default")
+
+    # Step 2: Create the missing monthly partitions and move the logs into them
+    months = bind.execute(sa.text(
+        "SELECT DISTINCT date_trunc('month', scraped_at)::date FROM shipment_logs_default"
+    )).scalars().all()
+    for month in months:
+        next_month = bind.execute(sa.text(
+            "SELECT (CAST(:month AS date) + interval '1 month')::date"), {"month": month}).scalar()
+        bind.execute(sa.text(
+            f"CREATE TABLE IF NOT EXISTS shipment_logs_{month.year:04d}_{month.month:02d} "
+            f"PARTITION OF shipment_logs "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month.isoformat()}')"
+        ))
+    op.execute("INSERT INTO shipment_logs SELECT * FROM shipment_logs_default")
+    op.drop_table('shipment_logs_default')
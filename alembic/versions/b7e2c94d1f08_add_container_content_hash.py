@@ -0,0 +1,29 @@
+"""add content_hash and last_seen_at to container_status_table
+
+Revision ID: b7e2c94d1f08
+Revises: 9f4b2d7c1a35
+Create Date: 2025-01-30 14:22:37.806115
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e2c94d1f08'
+down_revision: Union[str, None] = '9f4b2d7c1a35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Both columns are nullable: existing rows get a hash on their next scrape
+    op.add_column('container_status_table', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.add_column('container_status_table', sa.Column('last_seen_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('container_status_table', 'last_seen_at')
+    op.drop_column('container_status_table', 'content_hash')
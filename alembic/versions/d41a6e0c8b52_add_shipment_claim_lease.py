@@ -0,0 +1,42 @@
+"""add claimed_at and claimed_by lease columns to shipments
+
+Revision ID: d41a6e0c8b52
+Revises: b7e2c94d1f08
+Create Date: 2025-02-03 09:41:12.530318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd41a6e0c8b52'
+down_revision: Union[str, None] = 'b7e2c94d1f08'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Nullable: claims made before this revision fall back to last_scraped_time
+    op.add_column('shipments', sa.Column('claimed_at', sa.DateTime(), nullable=True))
+    op.add_column('shipments', sa.Column('claimed_by', postgresql.UUID(as_uuid=True), nullable=True))
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        # IN_PROGRESS shipments by lease time, for stale-claim recovery
+        op.create_index(
+            'ix_shipments_claims', 'shipments',
+            ['terminal_id', 'claimed_at'],
+            postgresql_where=sa.text("scrape_status = 'IN_PROGRESS'"),
+            postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_shipments_claims', table_name='shipments',
+                      postgresql_concurrently=True)
+    op.drop_column('shipments', 'claimed_by')
+    op.drop_column('shipments', 'claimed_at')
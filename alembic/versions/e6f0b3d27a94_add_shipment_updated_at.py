@@ -0,0 +1,27 @@
+"""add updated_at to shipments
+
+Revision ID: e6f0b3d27a94
+Revises: d41a6e0c8b52
+Create Date: 2025-02-05 16:08:51.274093
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6f0b3d27a94'
+down_revision: Union[str, None] = 'd41a6e0c8b52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Nullable: existing rows get a value on their next change, and a NULL never blocks a write
+    op.add_column('shipments', sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('shipments', 'updated_at')
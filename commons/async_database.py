@@ -0,0 +1,88 @@
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+import os
+import uuid
+from typing import Any, Dict, Optional
+from contextlib import asynccontextmanager
+from commons.database import _env_bool, get_engine_options
+from commons.utils.logger import get_logger
+
+logger = get_logger()
+
+# Created on first use, like the synchronous engine in commons.database
+_async_engine: Optional[AsyncEngine] = None
+_async_session_factory: Optional[async_sessionmaker] = None
+
+
+def get_async_database_url() -> str:
+    """
+    Return ASYNC_DATABASE_URL, or DATABASE_URL with its driver switched to asyncpg.
+    With DB_PGBOUNCER set, SQLAlchemy's prepared statement cache is turned off as well.
+    """
+    database_url = os.getenv("ASYNC_DATABASE_URL") or os.getenv("DATABASE_URL")
+    if not database_url:
+        raise ValueError("DATABASE_URL environment variable is not set.")
+    url = make_url(database_url)
+    if url.get_backend_name() == "postgresql" and url.get_driver_name() != "asyncpg":
+        url = url.set(drivername="postgresql+asyncpg")
+    if _env_bool("DB_PGBOUNCER", False):
+        url = url.update_query_dict({"prepared_statement_cache_size": "0"})
+    return url.render_as_string(hide_password=False)
+
+
+def get_async_engine_options() -> Dict[str, Any]:
+    """
+    Same pool settings as the synchronous engine; asyncpg takes the statement timeout
+    through server_settings instead of libpq options.
+
+    Set DB_PGBOUNCER behind pgbouncer in transaction mode: each transaction may run on another
+    server connection, where the statements asyncpg prepared earlier do not exist. Its statement
+    cache is then disabled (statement_cache_size=0) and prepared statements get unique names.
+    """
+    options = get_engine_options()
+    connect_args = options.pop("connect_args", None)
+    statement_timeout_ms = os.getenv("DB_STATEMENT_TIMEOUT_MS")
+    async_connect_args: Dict[str, Any] = {}
+    if connect_args and statement_timeout_ms:
+        async_connect_args["server_settings"] = {"statement_timeout": statement_timeout_ms}
+    if _env_bool("DB_PGBOUNCER", False):
+        async_connect_args["statement_cache_size"] = 0
+        async_connect_args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid.uuid4()}__"
+    if async_connect_args:
+        options["connect_args"] = async_connect_args
+    return options
+
+
+def get_async_engine() -> AsyncEngine:
+    """Return the shared async engine, creating it on first use."""
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = create_async_engine(
+            get_async_database_url(), **get_async_engine_options())
+        logger.info("Async database engine created")
+    return _async_engine
+
+
+def get_async_session_factory() -> async_sessionmaker:
+    """Return the shared async session factory."""
+    global _async_session_factory
+    if _async_session_factory is None:
+        # Expired attributes would need implicit IO to reload, which AsyncSession cannot do
+        _async_session_factory = async_sessionmaker(
+            bind=get_async_engine(), autoflush=False, expire_on_commit=False)
+    return _async_session_factory
+
+
+@asynccontextmanager
+async def get_async_session():
+    """Provide an asynchronous transactional scope around a series of operations."""
+    session: AsyncSession = get_async_session_factory()()
+    try:
+        yield session
+        await session.commit()
+    except Exception as e:
+        await session.rollback()
+        logger.error(f"Error during async session: {e}")
+        raise
+    finally:
+        await session.close()
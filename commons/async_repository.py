@@ -0,0 +1,224 @@
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import SQLAlchemyError
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+from commons.repository import BaseRepository
+from commons.utils.logger import get_logger
+
+logger = get_logger()
+
+
+class AsyncBaseRepository:
+    def __init__(self, session: AsyncSession, model: Any):
+        self.session = session
+        self.model = model
+        self.run_id = logger.run_id
+
+    async def save(self, entity: Any):
+        try:
+            logger.info(f"Saving entity: {entity}")
+            self.session.add(entity)
+            await self.session.commit()  # Commit after save
+        except SQLAlchemyError as e:
+            await self.session.rollback()
+            logger.error(f"Error saving entity: {str(e)}", exc_info=True)
+            raise
+        except Exception as e:  # Catch all other exceptions
+            await self.session.rollback()
+            logger.error(
+                f"Unexpected error saving entity: {str(e)}", exc_info=True)
+            raise
+
+    async def update(self, entity: Any, updates: Any):
+        try:
+            logger.info(f"Updating entity: {entity}")
+            for key, value in updates.__dict__.items():
+                if key != '_sa_instance_state':  # Skip internal SQLAlchemy state
+                    # Only update if the new value is not None or blank
+                    if value not in [None, '']:
+                        setattr(entity, key, value)
+            await self.session.commit()  # Commit after update
+        except SQLAlchemyError as e:
+            await self.session.rollback()
+            logger.error(f"Error updating entity: {str(e)}", exc_info=True)
+            raise
+        except Exception as e:
+            await self.session.rollback()
+            logger.error(f"Unexpected error updating entity: {str(e)}", exc_info=True)
+            raise
+
+    async def save_or_update(self, entity: Any, unique_field: str, unique_value: Any):
+        try:
+            existing_entity = await self.get_by_fields(**{unique_field: unique_value})
+            if existing_entity:
+                await self.update(existing_entity, entity)
+            else:
+                await self.save(entity)
+        except SQLAlchemyError as e:
+            await self.session.rollback()
+            logger.error(
+                f"Error saving or updating entity: {str(e)}", exc_info=True)
+            raise
+        except Exception as e:  # Catch all other exceptions
+            await self.session.rollback()
+            logger.error(
+                f"Unexpected error saving or updating entity: {str(e)}", exc_info=True)
+            raise
+
+    async def save_or_touch(self, entity: Any, unique_fields: Optional[Dict[str, Any]], change_field: str,
+                            touch_fields: Sequence[str] = (), existing_entity: Any = None) -> Any:
+        """
+        Async counterpart of `BaseRepository.save_or_touch`.
+        """
+        try:
+            if unique_fields is not None:
+                result = await self.session.execute(
+                    select(self.model).filter_by(**unique_fields).limit(1))
+                existing_entity = result.scalars().first()
+            if existing_entity is None:
+                await self.save(entity)
+                return entity
+            change_value = getattr(entity, change_field)
+            if change_value is not None and getattr(existing_entity, change_field) == change_value:
+                for field in touch_fields:
+                    setattr(existing_entity, field, getattr(entity, field))
+                await self.session.commit()
+            else:
+                await self.update(existing_entity, entity)
+            return existing_entity
+        except SQLAlchemyError as e:
+            await self.session.rollback()
+            logger.error(
+                f"Error saving or touching entity: {str(e)}", exc_info=True)
+            raise
+        except Exception as e:
+            await self.session.rollback()
+            logger.error(
+                f"Unexpected error saving or touching entity: {str(e)}", exc_info=True)
+            raise
+
+    async def bulk_upsert(self, entities: Iterable[Any], conflict_columns: Sequence[str],
+                          update_columns: Optional[Sequence[str]] = None, skip_blank: bool = True,
+                          batch_size: int = 1000, change_column: Optional[str] = None,
+                          touch_columns: Sequence[str] = (), guard_column: Optional[str] = None) -> int:
+        """
+        Async counterpart of `BaseRepository.bulk_upsert`.
+        """
+        try:
+            count, statements = BaseRepository._upsert_statements(
+                self.model, entities, conflict_columns, update_columns, skip_blank, batch_size,
+                change_column, touch_columns, guard_column)
+            logger.info(
+                f"Bulk upserting {count} {self.model.__name__} rows in batches of {batch_size}")
+            for stmt in statements:
+                await self.session.execute(stmt)
+            await self.session.commit()  # Commit once for all batches
+            return count
+        except SQLAlchemyError as e:
+            await self.session.rollback()
+            logger.error(f"Error bulk upserting entities: {str(e)}", exc_info=True)
+            raise
+        except Exception as e:
+            await self.session.rollback()
+            logger.error(
+                f"Unexpected error bulk upserting entities: {str(e)}", exc_info=True)
+            raise
+
+    async def bulk_update_by_ids(self, id_field: str, ids: Sequence[Any], values: Dict[str, Any],
+                                 returning: Sequence[str] = (), criteria: Sequence[Any] = ()) -> List[Any]:
+        """
+        Async counterpart of `BaseRepository.bulk_update_by_ids`.
+        """
+        if not ids:
+            return []
+        try:
+            id_column = getattr(self.model, id_field)
+            stmt = (
+                update(self.model)
+                .where(id_column.in_(list(ids)), *criteria)
+                .values(**values)
+                .returning(id_column, *(getattr(self.model, key) for key in returning))
+                # Loaded instances of the updated rows get the new values
+                .execution_options(synchronize_session="fetch")
+            )
+            logger.info(
+                f"Bulk updating {len(ids)} {self.model.__name__} rows by {id_field}")
+            # Pending changes to these rows must reach the database before the UPDATE
+            await self.session.flush()
+            rows = (await self.session.execute(stmt)).all()
+            await self.session.commit()  # Commit once for the whole set
+            return rows
+        except SQLAlchemyError as e:
+            await self.session.rollback()
+            logger.error(f"Error bulk updating entities: {str(e)}", exc_info=True)
+            raise
+        except Exception as e:
+            await self.session.rollback()
+            logger.error(
+                f"Unexpected error bulk updating entities: {str(e)}", exc_info=True)
+            raise
+
+    async def delete(self, entity: Any):
+        try:
+            logger.info(f"Deleting entity: {entity}")
+            await self.session.delete(entity)
+            await self.session.commit()  # Commit after delete
+        except SQLAlchemyError as e:
+            await self.session.rollback()
+            logger.error(f"Error deleting entity: {str(e)}", exc_info=True)
+            raise ValueError(f"Failed to delete entity: {str(e)}")
+        except Exception as e:  # Catch all other exceptions
+            await self.session.rollback()
+            logger.error(
+                f"Unexpected error deleting entity: {str(e)}", exc_info=True)
+            raise ValueError(f"Unexpected failure to delete entity: {str(e)}")
+
+    async def get_by_id(self, entity_id: Any) -> Any:
+        try:
+            return await self.session.get(self.model, entity_id)
+        except SQLAlchemyError as e:
+            logger.error(
+                f"Error fetching entity by ID: {str(e)}", exc_info=True)
+            await self.session.rollback()
+            raise
+        except Exception as e:  # Catch all other exceptions
+            logger.error(
+                f"Unexpected error fetching entity by ID: {str(e)}", exc_info=True)
+            await self.session.rollback()
+            raise
+
+    async def get_by_fields(self, **kwargs) -> Any:
+        try:
+            logger.info(f"Fetching entity by fields: {kwargs}")
+            result = await self.session.execute(
+                select(self.model).filter_by(**kwargs).limit(1))
+            return result.scalars().first()
+        except SQLAlchemyError as e:
+            logger.error(
+                f"Error fetching entity by fields: {str(e)}", exc_info=True)
+            await self.session.rollback()
+            raise
+        except Exception as e:  # Catch all other exceptions
+            logger.error(
+                f"Unexpected error fetching entity by fields: {str(e)}", exc_info=True)
+            await self.session.rollback()
+            raise
+
+    async def get_latest_by_field(self, field_name: str, field_value: Any):
+        try:
+            logger.info(
+                f"Fetching latest entity where {field_name}={field_value}")
+            result = await self.session.execute(
+                select(self.model).filter_by(**{field_name: field_value})
+                .order_by(self.model.updated_at.desc()).limit(1))
+            return result.scalars().first()
+        except SQLAlchemyError as e:
+            logger.error(
+                f"Error fetching latest entity by {field_name}: {str(e)}", exc_info=True)
+            await self.session.rollback()
+            raise
+        except Exception as e:
+            logger.error(
+                f"Unexpected error fetching latest entity by {field_name}: {str(e)}", exc_info=True)
+            await self.session.rollback()
+            raise
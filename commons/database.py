@@ -1,8 +1,12 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from sqlalchemy.exc import SQLAlchemyError
 from commons.schemas.base import Base
 import os
+import threading
+from typing import Any, Dict, Optional
 from commons.utils.logger import get_logger
 from contextlib import contextmanager
 from .scraper_metadata import ScraperMetadata
@@ -10,15 +14,87 @@ from .enums import Scraper
 
 logger = get_logger()
 
-# Create engines and sessions
-engine = create_engine(os.getenv("DATABASE_URL"))
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# The engine and session factory are created on first use, not at import time
+_engine: Optional[Engine] = None
+_session_factory: Optional[sessionmaker] = None
+_engine_lock = threading.Lock()
+
+
+def _env_int(name: str, default: Optional[int]) -> Optional[int]:
+    value = os.getenv(name)
+    return int(value) if value not in (None, '') else default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value in (None, ''):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def get_engine_options() -> Dict[str, Any]:
+    """
+    Build the create_engine keyword arguments from the environment.
+
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE (seconds) and DB_POOL_PRE_PING
+    configure the connection pool. DB_USE_NULL_POOL opens a connection per checkout, which suits
+    pgbouncer in transaction mode. DB_STATEMENT_TIMEOUT_MS sets the server-side statement_timeout.
+    """
+    options: Dict[str, Any] = {
+        "pool_pre_ping": _env_bool("DB_POOL_PRE_PING", True),
+    }
+    if _env_bool("DB_USE_NULL_POOL", False):
+        options["poolclass"] = NullPool
+    else:
+        options["pool_size"] = _env_int("DB_POOL_SIZE", 5)
+        options["max_overflow"] = _env_int("DB_MAX_OVERFLOW", 10)
+        options["pool_timeout"] = _env_int("DB_POOL_TIMEOUT", 30)
+        options["pool_recycle"] = _env_int("DB_POOL_RECYCLE", 1800)
+
+    statement_timeout_ms = _env_int("DB_STATEMENT_TIMEOUT_MS", None)
+    if statement_timeout_ms:
+        options["connect_args"] = {
+            "options": f"-c statement_timeout={statement_timeout_ms}"}
+    return options
+
+
+def get_engine() -> Engine:
+    """Return the shared engine, creating it on first use."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                database_url = os.getenv("DATABASE_URL")
+                if not database_url:
+                    raise ValueError(
+                        "DATABASE_URL environment variable is not set.")
+                _engine = create_engine(database_url, **get_engine_options())
+                logger.info("Database engine created")
+    return _engine
+
+
+def get_session_factory() -> sessionmaker:
+    """Return the shared session factory, bound to the lazily created engine."""
+    global _session_factory
+    if _session_factory is None:
+        _session_factory = sessionmaker(
+            autocommit=False, autoflush=False, bind=get_engine())
+    return _session_factory
+
+
+def __getattr__(name: str) -> Any:
+    # Keep `from commons.database import engine, SessionLocal` working without eager creation
+    if name == "engine":
+        return get_engine()
+    if name == "SessionLocal":
+        return get_session_factory()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 @contextmanager
 def get_session():
     """Provide a transactional scope around a series of operations."""
-    session = SessionLocal()
+    session = get_session_factory()()
     try:
         yield session
         session.commit()
@@ -33,7 +109,10 @@ def get_session():
 def create_tables():
     """Create tables if they do not exist."""
     try:
-        Base.metadata.create_all(engine)
+        Base.metadata.create_all(get_engine())
+        # shipment_logs is partitioned and accepts rows only once its partitions exist
+        from commons.maintenance import maintain_shipment_logs
+        maintain_shipment_logs()
         initialize_data()
         logger.info("Tables created successfully.")
     except SQLAlchemyError as e:
@@ -93,4 +172,9 @@ def initialize_data():
             raise
 
 
-create_tables()
+def bootstrap_database():
+    """
+    Create the schema and seed the initial data. Call this explicitly from deployment or
+    setup jobs; importing this module no longer touches the database.
+    """
+    create_tables()
@@ -0,0 +1,164 @@
+import datetime
+import os
+import re
+from typing import List, Optional
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from commons.utils.date import get_current_datetime_in_est
+from commons.utils.logger import get_logger
+
+SHIPMENT_LOGS_TABLE = "shipment_logs"
+# Months of shipment log history kept; older monthly partitions are dropped
+DEFAULT_RETENTION_MONTHS = 12
+# Monthly partitions created ahead of the current month
+DEFAULT_MONTHS_AHEAD = 3
+
+# Catches logs no monthly partition covers yet, so inserts never fail when maintenance falls behind
+DEFAULT_PARTITION = f"{SHIPMENT_LOGS_TABLE}_default"
+
+_PARTITION_NAME = re.compile(rf"^{SHIPMENT_LOGS_TABLE}_(\d{{4}})_(\d{{2}})$")
+
+
+def month_start(value: datetime.datetime) -> datetime.date:
+    return datetime.date(value.year, value.month, 1)
+
+
+def add_months(month: datetime.date, months: int) -> datetime.date:
+    index = month.year * 12 + month.month - 1 + months
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: datetime.date) -> str:
+    return f"{SHIPMENT_LOGS_TABLE}_{month.year:04d}_{month.month:02d}"
+
+
+def create_default_shipment_log_partition(connection: Connection) -> None:
+    """
+    Create the DEFAULT shipment_logs partition if it does not exist.
+    """
+    connection.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {SHIPMENT_LOGS_TABLE} DEFAULT"))
+
+
+def create_shipment_log_partitions(connection: Connection, first_month: datetime.date,
+                                   last_month: datetime.date) -> List[str]:
+    """
+    Create the monthly shipment_logs partitions from `first_month` to `last_month` inclusive.
+    Existing partitions are left as they are. Logs of a new month that went to the DEFAULT
+    partition are moved into the month's partition.
+    :return: The names of the partitions covered.
+    """
+    names = []
+    month = month_start(first_month)
+    while month <= last_month:
+        name = partition_name(month)
+        start, end = month.isoformat(), add_months(month, 1).isoformat()
+        bounds = f"FOR VALUES FROM ('{start}') TO ('{end}')"
+        if _default_partition_holds(connection, name, start, end):
+            # PostgreSQL refuses a partition whose range has rows in the DEFAULT partition:
+            # move them into a plain table first, then attach it
+            connection.execute(text(
+                f"CREATE TABLE {name} (LIKE {SHIPMENT_LOGS_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+            moved = connection.execute(text(
+                f"""
+                WITH moved AS (
+                    DELETE FROM {DEFAULT_PARTITION}
+                    WHERE scraped_at >= :start AND scraped_at < :end
+                    RETURNING *
+                )
+                INSERT INTO {name} SELECT * FROM moved
+                """
+            ), {"start": start, "end": end}).rowcount
+            connection.execute(text(
+                f"ALTER TABLE {SHIPMENT_LOGS_TABLE} ATTACH PARTITION {name} {bounds}"))
+            get_logger().warning(
+                f"Moved {moved} shipment logs from {DEFAULT_PARTITION} to the new partition {name}")
+        else:
+            connection.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {SHIPMENT_LOGS_TABLE} {bounds}"))
+        names.append(name)
+        month = add_months(month, 1)
+    return names
+
+
+def _default_partition_holds(connection: Connection, name: str, start: str, end: str) -> bool:
+    # Only a partition that does not exist yet can have its rows in the DEFAULT partition
+    missing = connection.execute(text(
+        "SELECT to_regclass(:name) IS NULL AND to_regclass(:default) IS NOT NULL"
+    ), {"name": name, "default": DEFAULT_PARTITION}).scalar()
+    if not missing:
+        return False
+    return connection.execute(text(
+        f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE scraped_at >= :start AND scraped_at < :end)"
+    ), {"start": start, "end": end}).scalar()
+
+
+def drop_expired_shipment_log_partitions(connection: Connection, oldest_month: datetime.date) -> List[str]:
+    """
+    Drop the monthly shipment_logs partitions holding only logs older than `oldest_month`.
+    The DEFAULT partition is never dropped.
+    :return: The names of the dropped partitions.
+    """
+    partitions = connection.execute(text(
+        """
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = :table
+        """
+    ), {"table": SHIPMENT_LOGS_TABLE}).scalars().all()
+
+    dropped = []
+    for name in sorted(partitions):
+        match = _PARTITION_NAME.match(name)
+        if match is None:
+            continue
+        month = datetime.date(int(match.group(1)), int(match.group(2)), 1)
+        if month < oldest_month:
+            connection.execute(text(f"DROP TABLE IF EXISTS {name}"))
+            dropped.append(name)
+    return dropped
+
+
+def maintain_shipment_logs(connection: Optional[Connection] = None, retention_months: Optional[int] = None,
+                           months_ahead: Optional[int] = None):
+    """
+    Create the DEFAULT and upcoming shipment_logs partitions and drop the expired ones.
+    Meant to run daily (e.g. from cron): `python -m commons.maintenance`.
+
+    SHIPMENT_LOG_RETENTION_MONTHS and SHIPMENT_LOG_PARTITIONS_AHEAD override the defaults.
+    :param connection: Connection to run on. Defaults to a transaction on the shared engine.
+    """
+    if retention_months is None:
+        retention_months = int(os.getenv(
+            "SHIPMENT_LOG_RETENTION_MONTHS", DEFAULT_RETENTION_MONTHS))
+    if months_ahead is None:
+        months_ahead = int(os.getenv(
+            "SHIPMENT_LOG_PARTITIONS_AHEAD", DEFAULT_MONTHS_AHEAD))
+    if retention_months < 1:
+        raise ValueError("Shipment log retention must be at least one month.")
+
+    if connection is None:
+        from commons.database import get_engine
+        with get_engine().begin() as connection:
+            return maintain_shipment_logs(connection, retention_months, months_ahead)
+
+    current_month = month_start(get_current_datetime_in_est())
+    create_default_shipment_log_partition(connection)
+    created = create_shipment_log_partitions(
+        connection, current_month, add_months(current_month, months_ahead))
+    dropped = drop_expired_shipment_log_partitions(
+        connection, add_months(current_month, 1 - retention_months))
+    stranded = connection.execute(text(f"SELECT count(*) FROM {DEFAULT_PARTITION}")).scalar()
+    if stranded:
+        get_logger().error(
+            f"{stranded} shipment logs are in {DEFAULT_PARTITION}, outside the monthly partitions")
+    # Fetched here: importing this module must not require an initialised logger
+    get_logger().info(
+        f"Shipment log partitions ensured: {created}; dropped: {dropped}")
+
+
+if __name__ == "__main__":
+    get_logger("maintenance")
+    maintain_shipment_logs()
@@ -1,4 +1,5 @@
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Iterable, Union
+import pandas as pd
 from commons.schemas.shipment import ContainerAvailability
 from commons.rules.engine import BusinessRule
 
@@ -7,12 +8,31 @@ class ContainerDataFactory:
     def __init__(self, mapping_config: Dict[str, str], rules: List[BusinessRule] = None):
         """
         Initialize the factory with the mapping configuration and custom rules.
+        The mapping configuration is compiled once into a plan reused for every row.
         :param mapping_config: A dictionary containing the mapping configuration.
         :param rules: A list of rules to apply for computing complex values.
         """
         self.mapping_config = mapping_config
         self.rules = rules or []
 
+        # -- Plan: (target_field, source_field) pairs, in mapping_config order
+        self._plan = tuple(mapping_config.items())
+        # -- Plan: source keys that are consumed by the mapping and never land in additional_info
+        self._consumed_keys = frozenset(mapping_config.values())
+        # -- Plan: whether a mapped field is an attribute of ContainerAvailability.
+        #    Fields added by rules are resolved on first sight and cached.
+        self._is_model_field = {
+            target_field: hasattr(ContainerAvailability, target_field)
+            for target_field in mapping_config
+        }
+
+    def _model_field(self, field_name: str) -> bool:
+        is_model_field = self._is_model_field.get(field_name)
+        if is_model_field is None:
+            is_model_field = hasattr(ContainerAvailability, field_name)
+            self._is_model_field[field_name] = is_model_field
+        return is_model_field
+
     def create_container_data(self, row: Dict[str, Any], shipment_id: int) -> ContainerAvailability:
         """
         Create a ContainerAvailability instance based on the provided data row.
@@ -20,48 +40,134 @@ class ContainerDataFactory:
         :param shipment_id: The ID of the shipment associated with this container.
         :return: A ContainerAvailability instance.
         """
-        # -- STEP A: Copy the entire row so we can track fields not mapped at all.
-        unmapped_fields = dict(row)
-
-        # -- STEP B: Build mapped_data from mapping_config
-        mapped_data = {}
-        for target_field, source_field in self.mapping_config.items():
-            value = row.get(source_field)
-            mapped_data[target_field] = value
-
-            # If the source_field existed in 'row', remove it from unmapped_fields.
-            if source_field in unmapped_fields:
-                del unmapped_fields[source_field]
+        # -- STEP A: Build mapped_data from the compiled plan
+        get = row.get
+        mapped_data = {target_field: get(source_field)
+                       for target_field, source_field in self._plan}
 
-        # -- STEP C: Apply custom rules to compute/override fields in mapped_data
+        # -- STEP B: Apply custom rules to compute/override fields in mapped_data
         for rule_class in self.rules:
             rule_instance = rule_class(json_data=row, mapped_data=mapped_data)
             rule_instance.process()
 
-        # -- STEP D: Determine which mapped_data fields belong on ContainerAvailability
+        # -- STEP C: Split mapped_data into ContainerAvailability fields and leftovers
         relevant_data = {}
-        leftover_mapped = {}
+        additional_info = {}
         for field_name, field_value in mapped_data.items():
-            if hasattr(ContainerAvailability, field_name):
+            if self._model_field(field_name):
                 relevant_data[field_name] = field_value
             else:
-                leftover_mapped[field_name] = field_value
+                additional_info[field_name] = field_value
 
-        # -- STEP E: Combine leftover_mapped + unmapped_fields into additional_info
-        additional_info = {}
-        additional_info.update(leftover_mapped)
-        additional_info.update(unmapped_fields)
+        # -- STEP D: Unmapped row fields override leftovers in additional_info
+        consumed_keys = self._consumed_keys
+        for key, value in row.items():
+            if key not in consumed_keys:
+                additional_info[key] = value
 
         # *Remove fields with value=None in additional_info*
         additional_info = {
             k: v for k, v in additional_info.items() if v is not None
         }
 
-        # -- STEP F: Build and return the ContainerAvailability object
+        # -- STEP E: Build and return the ContainerAvailability object
         container_availability = ContainerAvailability(
             shipment_id=shipment_id,
             additional_info=additional_info,
             **relevant_data
         )
 
-        return container_availability
\ No newline at end of file
+        return container_availability
+
+    def create_container_data_many(self, rows: Union[pd.DataFrame, Iterable[Dict[str, Any]]],
+                                   shipment_id_by_container: Dict[str, Any],
+                                   as_dicts: bool = False) -> List[Any]:
+        """
+        Map a whole result set in one columnar pass.
+        :param rows: A pandas DataFrame or a list of row dictionaries from the scraper.
+        :param shipment_id_by_container: Shipment ID for each mapped container_number.
+        :param as_dicts: Return plain column dictionaries (ready for `bulk_upsert`) instead of
+                         ContainerAvailability instances.
+        :return: One mapped container per row, in input order.
+        """
+        if isinstance(rows, pd.DataFrame):
+            frame = rows
+            json_rows = None
+        else:
+            json_rows = list(rows)
+            # object dtype keeps values as given: rows missing a key must not turn 1 into 1.0
+            frame = pd.DataFrame(json_rows, dtype=object)
+        if frame.empty:
+            return []
+        frame = self._none_for_missing(frame)
+        if json_rows is None:
+            json_rows = [
+                {k: v for k, v in record.items() if v is not None}
+                for record in frame.to_dict('records')
+            ]
+
+        # -- STEP A: Build mapped columns from the compiled plan
+        mapped = self._none_for_missing(pd.DataFrame({
+            target_field: frame[source_field] if source_field in frame.columns else None
+            for target_field, source_field in self._plan
+        }, index=frame.index))
+
+        # -- STEP B: Apply custom rules over the whole result set
+        mapped = self._apply_rules_many(json_rows, mapped)
+
+        # -- STEP C: Split columns into ContainerAvailability fields and additional_info
+        model_columns = [
+            column for column in mapped.columns if self._model_field(column)]
+        unmapped_columns = [
+            column for column in frame.columns if column not in self._consumed_keys]
+        # Unmapped row fields override leftovers with the same name
+        leftover_columns = [
+            column for column in mapped.columns
+            if column not in model_columns and column not in unmapped_columns]
+        extra = pd.concat(
+            [mapped[leftover_columns], frame[unmapped_columns]], axis=1)
+        additional_infos = [
+            {k: v for k, v in record.items() if v is not None}
+            for record in extra.to_dict('records')
+        ]
+
+        # -- STEP D: Resolve shipment IDs by container number
+        container_numbers = mapped['container_number'] if 'container_number' in mapped.columns \
+            else pd.Series(None, index=mapped.index, dtype=object)
+        shipment_ids = [shipment_id_by_container.get(number)
+                        for number in container_numbers]
+
+        # -- STEP E: Assemble the output
+        records = mapped[model_columns].to_dict('records')
+        containers = []
+        for record, shipment_id, additional_info in zip(records, shipment_ids, additional_infos):
+            record['shipment_id'] = shipment_id
+            record['additional_info'] = additional_info
+            containers.append(
+                record if as_dicts else ContainerAvailability(**record))
+        return containers
+
+    def _apply_rules_many(self, json_rows: List[Dict[str, Any]], mapped: pd.DataFrame) -> pd.DataFrame:
+        # Rules providing `process_many(json_rows, mapped_frame)` run once over the whole frame;
+        # the others run per row on record dictionaries, converting only when the form changes.
+        mapped_rows = None
+        for rule_class in self.rules:
+            process_many = getattr(rule_class, 'process_many', None)
+            if process_many is not None:
+                if mapped_rows is not None:
+                    mapped = pd.DataFrame(mapped_rows, index=mapped.index, dtype=object)
+                    mapped_rows = None
+                process_many(json_rows, mapped)
+            else:
+                if mapped_rows is None:
+                    mapped_rows = mapped.to_dict('records')
+                for json_row, mapped_row in zip(json_rows, mapped_rows):
+                    rule_class(json_data=json_row, mapped_data=mapped_row).process()
+        if mapped_rows is not None:
+            mapped = pd.DataFrame(mapped_rows, index=mapped.index, dtype=object)
+        return self._none_for_missing(mapped)
+
+    @staticmethod
+    def _none_for_missing(frame: pd.DataFrame) -> pd.DataFrame:
+        # Missing values become None, as `row.get` would return, instead of NaN
+        return frame.astype(object).where(frame.notna(), None)
@@ -1,10 +1,83 @@
+from sqlalchemy import Enum, String, Text, case, func, literal_column, or_, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.inspection import inspect
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
-from typing import Any
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+from contextlib import contextmanager
 from commons.utils.logger import get_logger
 
 logger = get_logger()
 
+# Key under which the active UnitOfWork is stored in Session.info
+UNIT_OF_WORK_KEY = "unit_of_work"
+
+
+class UnitOfWork:
+    def __init__(self, session: Session, size: int = 500):
+        """
+        Defer commits on a session and commit them in chunks of `size` entities.
+        :param session: The SQLAlchemy session shared by the repositories taking part.
+        :param size: Number of written entities after which the chunk is committed.
+        """
+        self.session = session
+        self.size = size
+        self.pending: List[Any] = []  # Entities written in the current chunk
+        self.failed_chunks: List[List[Any]] = []  # Chunks that were rolled back
+
+    def track(self, *entities: Any):
+        """Record entities written in the current chunk without committing."""
+        self.pending.extend(entity for entity in entities if entity is not None)
+
+    def register(self, *entities: Any):
+        """Record written entities and commit the chunk once it is full."""
+        self.track(*entities)
+        if len(self.pending) >= self.size:
+            self.commit()
+
+    def commit(self):
+        """Commit the current chunk. On failure the chunk is rolled back and recorded."""
+        try:
+            self.session.commit()
+            logger.info(f"Committed chunk of {len(self.pending)} entities")
+            self.pending = []
+        except Exception as e:
+            logger.error(f"Error committing chunk: {str(e)}", exc_info=True)
+            self.rollback()
+            raise
+
+    def close(self):
+        """
+        Commit the last chunk. A failing commit is rolled back and only re-raised when no
+        written entities were recorded for it, since otherwise it is reported in failed_chunks.
+        """
+        had_pending = bool(self.pending)
+        try:
+            self.commit()
+        except SQLAlchemyError:
+            if not had_pending:
+                raise
+
+    def rollback(self):
+        """Roll back the current chunk and record the entities it contained."""
+        self.session.rollback()
+        if self.pending:
+            logger.error(
+                f"Rolled back chunk of {len(self.pending)} entities")
+            self.failed_chunks.append(self.pending)
+            self.pending = []
+
+    def failed_entities(self, model: Any = None) -> List[Any]:
+        """
+        Return the entities of all rolled back chunks, optionally only those of `model`.
+        Bulk upserts are recorded as the rows they were given (instances or dicts) and bulk
+        updates as the rows they returned.
+        """
+        return [
+            entity for chunk in self.failed_chunks for entity in chunk
+            if model is None or isinstance(entity, model)
+        ]
+
 
 class BaseRepository:
     def __init__(self, session: Session, model: Any):
@@ -12,17 +85,82 @@ class BaseRepository:
         self.model = model
         self.run_id = logger.run_id
 
+    @property
+    def unit_of_work(self) -> Optional[UnitOfWork]:
+        return self.session.info.get(UNIT_OF_WORK_KEY)
+
+    @contextmanager
+    def batch(self, size: int = 500):
+        """
+        Defer commits of every repository sharing this session until `size` entities
+        have been written or the block exits. Nested calls reuse the outer unit of work.
+        """
+        if self.unit_of_work is not None:
+            yield self.unit_of_work
+            return
+
+        unit_of_work = UnitOfWork(self.session, size)
+        self.session.info[UNIT_OF_WORK_KEY] = unit_of_work
+        try:
+            yield unit_of_work
+        except Exception:
+            unit_of_work.rollback()
+            raise
+        else:
+            unit_of_work.close()
+        finally:
+            self.session.info.pop(UNIT_OF_WORK_KEY, None)
+
+    def _track(self, *entities: Any):
+        # Recorded before the write, so a failing write is reported with its chunk
+        unit_of_work = self.unit_of_work
+        if unit_of_work is not None:
+            unit_of_work.track(*entities)
+
+    def _commit(self, *entities: Any):
+        unit_of_work = self.unit_of_work
+        if unit_of_work is None:
+            self.session.commit()
+        else:
+            unit_of_work.track(*entities)
+            self.session.flush()  # Surface errors now, commit with the chunk
+            unit_of_work.register()
+
+    @contextmanager
+    def _read_scope(self):
+        """
+        Inside a unit of work, run a read in a SAVEPOINT: a failing read then only rolls back
+        to it, and the writes pending in the chunk are kept.
+        """
+        if self.unit_of_work is None:
+            yield
+        else:
+            with self.session.begin_nested():
+                yield
+
+    def _rollback_read(self):
+        # Inside a unit of work the failed read was already confined to its savepoint
+        if self.unit_of_work is None:
+            self.session.rollback()
+
+    def _rollback(self):
+        unit_of_work = self.unit_of_work
+        if unit_of_work is None:
+            self.session.rollback()
+        else:
+            unit_of_work.rollback()
+
     def save(self, entity: Any):
         try:
             logger.info(f"Saving entity: {entity}")
             self.session.add(entity)
-            self.session.commit()  # Commit after save
+            self._commit(entity)  # Commit after save
         except SQLAlchemyError as e:
-            self.session.rollback()
+            self._rollback()
             logger.error(f"Error saving entity: {str(e)}", exc_info=True)
             raise
         except Exception as e:  # Catch all other exceptions
-            self.session.rollback()
+            self._rollback()
             logger.error(
                 f"Unexpected error saving entity: {str(e)}", exc_info=True)
             raise
@@ -35,13 +173,13 @@ class BaseRepository:
                     # Only update if the new value is not None or blank
                     if value not in [None, '']:
                         setattr(entity, key, value)
-            self.session.commit()  # Commit after update
+            self._commit(entity)  # Commit after update
         except SQLAlchemyError as e:
-            self.session.rollback()
+            self._rollback()
             logger.error(f"Error updating entity: {str(e)}", exc_info=True)
             raise
         except Exception as e:
-            self.session.rollback()
+            self._rollback()
             logger.error(f"Unexpected error updating entity: {str(e)}", exc_info=True)
             raise
         
@@ -54,103 +192,373 @@ class BaseRepository:
             else:
                 self.save(entity)
         except SQLAlchemyError as e:
-            self.session.rollback()
+            self._rollback()
             logger.error(
                 f"Error saving or updating entity: {str(e)}", exc_info=True)
             raise
         except Exception as e:  # Catch all other exceptions
-            self.session.rollback()
+            self._rollback()
             logger.error(
                 f"Unexpected error saving or updating entity: {str(e)}", exc_info=True)
             raise
 
+    def save_or_touch(self, entity: Any, unique_fields: Optional[Dict[str, Any]], change_field: str,
+                      touch_fields: Sequence[str] = (), existing_entity: Any = None) -> Any:
+        """
+        Like `save_or_update`, but when the stored row has the same `change_field` value
+        (e.g. a content hash) only `touch_fields` are written instead of the whole entity.
+
+        :param unique_fields: Column values identifying the stored row. Pass None when the
+                              stored row was already looked up and is given as `existing_entity`.
+        :param change_field: Attribute whose value changes whenever the content changes.
+        :param touch_fields: Attributes written even when the content is unchanged.
+        :param existing_entity: The stored row when `unique_fields` is None; None means there is none.
+        :return: The persistent entity: `entity` when it was inserted, else the stored row.
+        """
+        try:
+            if unique_fields is not None:
+                existing_entity = self.session.query(self.model).filter_by(
+                    **unique_fields).first()
+            if existing_entity is None:
+                self.save(entity)
+                return entity
+            change_value = getattr(entity, change_field)
+            if change_value is not None and getattr(existing_entity, change_field) == change_value:
+                for field in touch_fields:
+                    setattr(existing_entity, field, getattr(entity, field))
+                self._commit(existing_entity)
+            else:
+                self.update(existing_entity, entity)
+            return existing_entity
+        except SQLAlchemyError as e:
+            self._rollback()
+            logger.error(
+                f"Error saving or touching entity: {str(e)}", exc_info=True)
+            raise
+        except Exception as e:
+            self._rollback()
+            logger.error(
+                f"Unexpected error saving or touching entity: {str(e)}", exc_info=True)
+            raise
+
+    def bulk_upsert(self, entities: Iterable[Any], conflict_columns: Sequence[str],
+                    update_columns: Optional[Sequence[str]] = None, skip_blank: bool = True,
+                    batch_size: int = 1000, change_column: Optional[str] = None,
+                    touch_columns: Sequence[str] = (), guard_column: Optional[str] = None) -> int:
+        """
+        Insert or update many entities with PostgreSQL INSERT ... ON CONFLICT DO UPDATE.
+
+        :param entities: ORM instances of the repository model or plain dicts keyed by column name.
+        :param conflict_columns: Columns of the unique/primary key used to detect conflicts.
+        :param update_columns: Columns to overwrite on conflict. Defaults to every non-conflict column.
+        :param skip_blank: Keep the stored value when the incoming one is None or '' (same as `update`).
+        :param batch_size: Number of rows sent per statement.
+        :param change_column: Column whose value changes whenever the content changes (e.g. a
+                              content hash). When set, conflicting rows with the same value keep
+                              their stored columns and only `touch_columns` are written.
+        :param touch_columns: Columns written on conflict even when the content is unchanged.
+        :param guard_column: Column such as updated_at. A conflicting row is only updated when the
+                             incoming value is not older than the stored one, so a delayed write
+                             never overwrites a newer change.
+        :return: The number of rows written.
+        """
+        try:
+            entities = list(entities)
+            count, statements = self._upsert_statements(
+                self.model, entities, conflict_columns, update_columns, skip_blank, batch_size,
+                change_column, touch_columns, guard_column)
+            logger.info(
+                f"Bulk upserting {count} {self.model.__name__} rows in batches of {batch_size}")
+            self._track(*entities)  # Counts toward the chunk size of a unit of work
+            for stmt in statements:
+                self.session.execute(stmt)
+            self._commit()  # Commit once for all batches
+            return count
+        except SQLAlchemyError as e:
+            self._rollback()
+            logger.error(f"Error bulk upserting entities: {str(e)}", exc_info=True)
+            raise
+        except Exception as e:
+            self._rollback()
+            logger.error(
+                f"Unexpected error bulk upserting entities: {str(e)}", exc_info=True)
+            raise
+
+    def bulk_update_by_ids(self, id_field: str, ids: Sequence[Any], values: Dict[str, Any],
+                           returning: Sequence[str] = (), criteria: Sequence[Any] = ()) -> List[Any]:
+        """
+        Update every row whose `id_field` is in `ids` with one UPDATE ... RETURNING statement.
+
+        :param id_field: Name of the identifying column.
+        :param ids: Identifiers of the rows to update.
+        :param values: Column values or SQL expressions to set.
+        :param returning: Extra columns returned alongside `id_field`.
+        :param criteria: Extra WHERE clauses; rows failing them are left as they are and not returned.
+        :return: One row per updated entity, starting with `id_field`.
+        """
+        if not ids:
+            return []
+        try:
+            id_column = getattr(self.model, id_field)
+            stmt = (
+                update(self.model)
+                .where(id_column.in_(list(ids)), *criteria)
+                .values(**values)
+                .returning(id_column, *(getattr(self.model, key) for key in returning))
+                # Loaded instances of the updated rows get the new values
+                .execution_options(synchronize_session="fetch")
+            )
+            logger.info(
+                f"Bulk updating {len(ids)} {self.model.__name__} rows by {id_field}")
+            # Pending changes to these rows must reach the database before the UPDATE
+            self.session.flush()
+            rows = self.session.execute(stmt).all()
+            self._commit(*rows)  # Commit once for the whole set
+            return rows
+        except SQLAlchemyError as e:
+            self._rollback()
+            logger.error(f"Error bulk updating entities: {str(e)}", exc_info=True)
+            raise
+        except Exception as e:
+            self._rollback()
+            logger.error(
+                f"Unexpected error bulk updating entities: {str(e)}", exc_info=True)
+            raise
+
+    @classmethod
+    def _upsert_statements(cls, model: Any, entities: Iterable[Any], conflict_columns: Sequence[str],
+                           update_columns: Optional[Sequence[str]], skip_blank: bool, batch_size: int,
+                           change_column: Optional[str] = None, touch_columns: Sequence[str] = (),
+                           guard_column: Optional[str] = None) -> Tuple[int, List[Any]]:
+        """
+        Build the INSERT ... ON CONFLICT statements of a bulk upsert.
+        Columns a row does not set get their insert default and are left untouched on conflict.
+        Rows are grouped by the columns they lack, so each statement has a uniform column set.
+        :return: The number of rows and the statements to execute.
+        """
+        table = model.__table__
+        columns = [(attr.key, attr.columns[0])
+                   for attr in inspect(model).column_attrs]
+        if update_columns is None:
+            update_columns = [
+                key for key, _ in columns if key not in conflict_columns]
+
+        rows = cls._dedupe_rows(
+            (cls._to_row(entity, columns) for entity in entities), conflict_columns)
+        groups: Dict[FrozenSet[str], List[Dict[str, Any]]] = {}
+        for row, absent in rows:
+            groups.setdefault(absent, []).append(row)
+
+        statements = []
+        for absent, group_rows in groups.items():
+            group_update_columns = [
+                key for key in update_columns if key not in absent]
+            for start in range(0, len(group_rows), batch_size):
+                stmt = insert(table).values(group_rows[start:start + batch_size])
+                set_ = cls._upsert_set(
+                    table, stmt, group_update_columns, skip_blank, change_column, touch_columns)
+                if set_:
+                    where = None
+                    if guard_column is not None:
+                        # Rows stored before the column existed have no value to compare
+                        stored = table.c[guard_column]
+                        where = or_(stored.is_(None), stmt.excluded[guard_column] >= stored)
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=list(conflict_columns), set_=set_, where=where)
+                else:
+                    stmt = stmt.on_conflict_do_nothing(
+                        index_elements=list(conflict_columns))
+                statements.append(stmt)
+        return len(rows), statements
+
+    @classmethod
+    def _to_row(cls, entity: Any, columns: List[Tuple[str, Any]]) -> Tuple[Dict[str, Any], FrozenSet[str]]:
+        # Every row carries the full column set so one statement can hold the whole batch;
+        # columns the entity does not set are filled with their insert default and reported
+        if isinstance(entity, dict):
+            present = entity.keys()
+            values = entity
+        else:
+            state = inspect(entity)
+            # Persistent rows are complete; transient ones only carry what was assigned
+            present = None if state.key is not None else state.dict.keys()
+            values = None
+        row = {}
+        absent = []
+        for key, column in columns:
+            if present is None:
+                row[key] = getattr(entity, key)
+            elif key in present:
+                row[key] = values[key] if values is not None else getattr(entity, key)
+            else:
+                row[key] = cls._insert_default(column)
+                absent.append(key)
+        return row, frozenset(absent)
+
+    @staticmethod
+    def _insert_default(column: Any) -> Any:
+        default = column.default
+        if default is not None:
+            if default.is_callable:
+                return default.arg(None)
+            if default.is_scalar or default.is_clause_element:
+                return default.arg
+        # The DEFAULT keyword applies a server default, or NULL without one
+        return literal_column("DEFAULT")
+
+    @staticmethod
+    def _dedupe_rows(rows: Iterable[Tuple[Dict[str, Any], FrozenSet[str]]],
+                     conflict_columns: Sequence[str]) -> List[Tuple[Dict[str, Any], FrozenSet[str]]]:
+        # ON CONFLICT cannot touch the same row twice in one statement, so the last row per key wins
+        deduped = {}
+        for row, absent in rows:
+            deduped[tuple(row[key] for key in conflict_columns)] = (row, absent)
+        return list(deduped.values())
+
+    @classmethod
+    def _upsert_set(cls, table: Any, stmt: Any, update_columns: Sequence[str], skip_blank: bool,
+                    change_column: Optional[str] = None, touch_columns: Sequence[str] = ()) -> Dict[str, Any]:
+        changed = None
+        if change_column is not None:
+            changed = table.c[change_column].is_distinct_from(
+                stmt.excluded[change_column])
+        set_ = {}
+        for key in update_columns:
+            value = cls._upsert_value(table.c[key], stmt.excluded[key], skip_blank)
+            if changed is not None and key not in touch_columns:
+                # Unchanged content keeps the stored value
+                value = case((changed, value), else_=table.c[key])
+            set_[key] = value
+        return set_
+
+    @staticmethod
+    def _upsert_value(current: Any, incoming: Any, skip_blank: bool) -> Any:
+        if not skip_blank:
+            return incoming
+        # Enum subclasses String, but '' is not a valid enum value
+        if isinstance(current.type, (String, Text)) and not isinstance(current.type, Enum):
+            # '' and NULL both fall back to the stored value
+            return func.coalesce(func.nullif(incoming, ''), current)
+        return func.coalesce(incoming, current)
+
     def delete(self, entity: Any):
         try:
             logger.info(f"Deleting entity: {entity}")
             self.session.delete(entity)
-            self.session.commit()  # Commit after delete
+            self._commit(entity)  # Commit after delete
         except SQLAlchemyError as e:
-            self.session.rollback()
+            self._rollback()
             logger.error(f"Error deleting entity: {str(e)}", exc_info=True)
             raise ValueError(f"Failed to delete entity: {str(e)}")
         except Exception as e:  # Catch all other exceptions
-            self.session.rollback()
+            self._rollback()
             logger.error(
                 f"Unexpected error deleting entity: {str(e)}", exc_info=True)
             raise ValueError(f"Unexpected failure to delete entity: {str(e)}")
 
     def get_by_id(self, entity_id: int) -> Any:
         try:
-            return self.session.query(self.model).get(entity_id)
+            with self._read_scope():
+                return self.session.query(self.model).get(entity_id)
         except SQLAlchemyError as e:
             logger.error(
                 f"Error fetching entity by ID: {str(e)}", exc_info=True)
-            self.session.rollback()
+            self._rollback_read()
             raise
         except Exception as e:  # Catch all other exceptions
             logger.error(
                 f"Unexpected error fetching entity by ID: {str(e)}", exc_info=True)
-            self.session.rollback()
+            self._rollback_read()
             raise
 
     def get_by_fields(self, **kwargs) -> Any:
         try:
             logger.info(f"Fetching entity by fields: {kwargs}")
-            return self.session.query(self.model).filter_by(**kwargs).first()
+            with self._read_scope():
+                return self.session.query(self.model).filter_by(**kwargs).first()
         except SQLAlchemyError as e:
             logger.error(
                 f"Error fetching entity by fields: {str(e)}", exc_info=True)
-            self.session.rollback()
+            self._rollback_read()
             raise
         except Exception as e:  # Catch all other exceptions
             logger.error(
                 f"Unexpected error fetching entity by fields: {str(e)}", exc_info=True)
-            self.session.rollback()
+            self._rollback_read()
+            raise
+
+    def get_all_by_field_in(self, field_name: str, values: Iterable[Any], chunk_size: int = 1000) -> List[Any]:
+        """
+        Fetch every entity whose `field_name` is one of `values`, one query per `chunk_size` values.
+        """
+        try:
+            values = list(dict.fromkeys(values))
+            logger.info(
+                f"Fetching {self.model.__name__} entities for {len(values)} values of {field_name}")
+            column = getattr(self.model, field_name)
+            entities = []
+            with self._read_scope():
+                for start in range(0, len(values), chunk_size):
+                    entities.extend(self.session.query(self.model).filter(
+                        column.in_(values[start:start + chunk_size])).all())
+            return entities
+        except SQLAlchemyError as e:
+            logger.error(
+                f"Error fetching entities by {field_name}: {str(e)}", exc_info=True)
+            self._rollback_read()
+            raise
+        except Exception as e:
+            logger.error(
+                f"Unexpected error fetching entities by {field_name}: {str(e)}", exc_info=True)
+            self._rollback_read()
             raise
 
     def get_latest(self, order_by_field: str):
         try:
             logger.info(f"Fetching latest entity ordered by {order_by_field}")
-            return self.session.query(self.model).order_by(getattr(self.model, order_by_field).desc()).first()
+            with self._read_scope():
+                return self.session.query(self.model).order_by(getattr(self.model, order_by_field).desc()).first()
         except SQLAlchemyError as e:
             logger.error(
                 f"Error fetching latest entity: {str(e)}", exc_info=True)
-            self.session.rollback()
+            self._rollback_read()
             raise
         except Exception as e:  # Catch all other exceptions
             logger.error(
                 f"Unexpected error fetching latest entity: {str(e)}", exc_info=True)
-            self.session.rollback()
+            self._rollback_read()
             raise
 
     def get_by_container_number_and_shipment_id(self, container_number: str, shipment_id: str) -> Any:
         try:
             logger.info(
                 f"Fetching entity by container number: {container_number} and shipment ID: {shipment_id}")
-            return self.session.query(self.model).filter_by(container_number=container_number, shipment_id=shipment_id).first()
+            with self._read_scope():
+                return self.session.query(self.model).filter_by(container_number=container_number, shipment_id=shipment_id).first()
         except SQLAlchemyError as e:
             logger.error(
                 f"Error fetching entity by container number and shipment ID: {str(e)}", exc_info=True)
-            self.session.rollback()
+            self._rollback_read()
             raise
         except Exception as e:  # Catch all other exceptions
             logger.error(
                 f"Unexpected error fetching entity by container number and shipment ID: {str(e)}", exc_info=True)
-            self.session.rollback()
+            self._rollback_read()
             raise
 
     def get_latest_by_field(self, field_name: str, field_value: Any):
         try:
             logger.info(
                 f"Fetching latest entity where {field_name}={field_value}")
-            return self.session.query(self.model).filter_by(**{field_name: field_value}).order_by(self.model.updated_at.desc()).first()
+            with self._read_scope():
+                return self.session.query(self.model).filter_by(**{field_name: field_value}).order_by(self.model.updated_at.desc()).first()
         except SQLAlchemyError as e:
             logger.error(
                 f"Error fetching latest entity by {field_name}: {str(e)}", exc_info=True)
-            self.session.rollback()
+            self._rollback_read()
             raise
         except Exception as e:
             logger.error(
                 f"Unexpected error fetching latest entity by {field_name}: {str(e)}", exc_info=True)
-            self.session.rollback()
+            self._rollback_read()
             raise
@@ -1,6 +1,23 @@
-from typing import Dict
+from typing import Any, Dict, List
+import pandas as pd
 from commons.schemas.shipment import ContainerAvailability
 
+# The JSON fields the rules read
+SOURCE_FIELDS = ['LocalDateTime', 'GateOutDate', 'GoodThru', 'Freight', 'Customs', 'Hold',
+                 'YardLocation', 'VesselEta']
+
+
+def _get(row: Dict[str, Any], key: str, default: Any) -> Any:
+    """Return `row[key]`, or `default` when the key is missing or None (e.g. JSON null)."""
+    value = row.get(key)
+    return default if value is None else value
+
+
+def _column(source: pd.DataFrame, key: str, default: Any) -> pd.Series:
+    """Return `_get(row, key, default)` for every row of `source` as an object Series."""
+    column = source[key]
+    return column.where(column.notna(), default)
+
 
 class APMRules:
     def __init__(self, json_data: Dict[str, str], mapped_data: Dict[str, str]):
@@ -14,9 +31,9 @@ class APMRules:
 
     def apply_demurrage_rule(self):
         """Apply the rule for 'Demurrage'."""
-        current_date = self.json_data.get('LocalDateTime', '')
-        gate_out_date = self.json_data.get('GateOutDate', '')
-        good_thru = self.json_data.get('GoodThru', '')
+        current_date = _get(self.json_data, 'LocalDateTime', '')
+        gate_out_date = _get(self.json_data, 'GateOutDate', '')
+        good_thru = _get(self.json_data, 'GoodThru', '')
 
         if current_date > good_thru and not gate_out_date:
             self.mapped_data['demurrage_amount'] = 'YES'
@@ -25,9 +42,9 @@ class APMRules:
 
     def apply_holds_rule(self):
         """Apply the rule for 'Holds'."""
-        freight_status = self.json_data.get('Freight', '')
-        customs_status = self.json_data.get('Customs', '')
-        hold = self.json_data.get('Hold', '')
+        freight_status = _get(self.json_data, 'Freight', '')
+        customs_status = _get(self.json_data, 'Customs', '')
+        hold = _get(self.json_data, 'Hold', '')
 
         if freight_status == 'HOLD' or customs_status == 'HOLD' or hold == 'HOLD':
             self.mapped_data['holds'] = 'YES'
@@ -44,8 +61,7 @@ class APMRules:
     def apply_transit_state_rule(self):
         """Apply the rule for 'Transit State'."""
         if not self.json_data.get('YardLocation'):
-            self.mapped_data['transit_state'] = self.json_data.get(
-                'VesselEta', '')
+            self.mapped_data['transit_state'] = _get(self.json_data, 'VesselEta', '')
 
     def process(self):
         """
@@ -55,3 +71,44 @@ class APMRules:
         self.apply_holds_rule()
         self.apply_departed_terminal_rule()
         self.apply_transit_state_rule()
+
+    @classmethod
+    def process_many(cls, json_rows: List[Dict[str, str]], mapped_frame: pd.DataFrame):
+        """
+        Apply all the rules to a whole result set at once.
+        Produces exactly the values `process` produces row by row; the fields are read as
+        pandas columns, where NaN counts as missing like None.
+        :param json_rows: The JSON rows from the scraper, aligned with `mapped_frame`.
+        :param mapped_frame: The mapped data, one row per JSON row; updated in place.
+        """
+        index = mapped_frame.index
+        # Missing keys become NaN; only the fields the rules read are loaded
+        source = pd.DataFrame(json_rows, columns=SOURCE_FIELDS, index=index, dtype=object)
+        yes_no = {True: 'YES', False: 'NO'}
+
+        # Demurrage
+        current_date = _column(source, 'LocalDateTime', '')
+        gate_out_date = _column(source, 'GateOutDate', '')
+        good_thru = _column(source, 'GoodThru', '')
+        has_gate_out = gate_out_date.astype(bool)
+        mapped_frame['demurrage_amount'] = (
+            (current_date > good_thru) & ~has_gate_out).map(yes_no).astype(object)
+
+        # Holds
+        on_hold = (
+            (_column(source, 'Freight', '') == 'HOLD')
+            | (_column(source, 'Customs', '') == 'HOLD')
+            | (_column(source, 'Hold', '') == 'HOLD')
+        )
+        mapped_frame['holds'] = on_hold.map(yes_no).astype(object)
+
+        # Departed Terminal
+        departed = _column(source, 'GateOutDate', None).astype(bool)
+        mapped_frame['yard_terminal_release_status'] = departed.map(yes_no).astype(object)
+
+        # Transit State, only where there is no yard location
+        in_transit = ~_column(source, 'YardLocation', None).astype(bool)
+        transit_state = mapped_frame['transit_state'] if 'transit_state' in mapped_frame.columns \
+            else pd.Series(None, index=index, dtype=object)
+        mapped_frame['transit_state'] = transit_state.where(
+            ~in_transit, _column(source, 'VesselEta', ''))
@@ -0,0 +1,123 @@
+from commons.rules.catalog.fetch_shipments_rule import FetchShipmentsRule
+from commons.rules.catalog.set_status_in_progress_rule import SetInProgressStatusRule
+from commons.utils.date import get_current_datetime_in_est
+from commons.enums import ScrapeStatus
+from sqlalchemy import select, update
+from commons.schemas.shipment import Shipment
+from typing import Dict, Any, Iterable, List, Optional
+from commons.utils.logger import get_logger
+
+logger = get_logger()
+
+# Default number of shipments a worker claims per call
+CLAIM_LIMIT = 100
+
+
+class ClaimShipmentsRule(FetchShipmentsRule):
+    def apply(self, context: Dict[str, Any]) -> None:
+        """
+        Atomically claim up to `claim_limit` due shipments of the terminal for this run.
+
+        Candidate rows are locked with SELECT ... FOR UPDATE SKIP LOCKED and flipped to
+        IN_PROGRESS with the run_id in the same statement, so several workers can drain one
+        terminal's backlog without picking the same shipment twice. The claimed shipments are
+        already IN_PROGRESS and must not be passed to `mark_shipments_in_progress` again.
+        The claim is a lease held by `run_id`: iterate the shipments with
+        `ShipmentService.iter_claimed_shipments`, which renews it, or call `renew_claims` while
+        processing takes longer than the lease, or other workers take the shipments over.
+
+        :param context: The context dictionary containing the SQLAlchemy session, scraper metadata,
+                        and optionally `claim_limit`, `run_id` and `claim_lease_minutes`.
+        """
+        session = context.get('session')
+        scraper_metadata = context.get('scraper_metadata')
+
+        if not session or not scraper_metadata:
+            raise ValueError(
+                "Session and scraper_metadata must be provided in the context.")
+
+        terminal_id = scraper_metadata.terminal_id
+        claim_limit = context.get('claim_limit', CLAIM_LIMIT)
+        run_id = context.get('run_id') or logger.run_id
+        current_time_est = get_current_datetime_in_est()
+
+        shipment_id = self.get_shipment_id_from_env()
+        if shipment_id:
+            logger.info(
+                f"Claiming shipment with ID {shipment_id} for trigger use case")
+            criteria = (Shipment.terminal_id == terminal_id) & (
+                Shipment.shipment_id == shipment_id)
+        else:
+            criteria = self.eligibility_filter(
+                terminal_id, current_time_est, self.get_stale_before(context, current_time_est))
+
+        claimable = (
+            select(Shipment.shipment_id)
+            .where(criteria)
+            .order_by(Shipment.next_scrape_time, Shipment.shipment_id)
+            .limit(claim_limit)
+            .with_for_update(skip_locked=True)
+            .cte('claimable')
+        )
+        stmt = (
+            update(Shipment)
+            .where(Shipment.shipment_id == claimable.c.shipment_id)
+            .values(run_id=run_id, **SetInProgressStatusRule.column_values(Shipment, current_time_est, run_id))
+            .returning(Shipment)
+            .execution_options(synchronize_session=False, populate_existing=True)
+        )
+
+        try:
+            shipments = session.scalars(stmt).all()
+            session.commit()  # Release the row locks and publish the claim
+        except Exception as e:
+            session.rollback()
+            logger.error(
+                f"Failed to claim shipments for terminal ID {terminal_id}: {str(e)}", exc_info=True)
+            raise
+
+        logger.info(
+            f"Claimed {len(shipments)} shipments for terminal ID: {terminal_id} and run ID: {run_id}")
+        context['shipments'] = shipments
+
+    @staticmethod
+    def renew_claims(session: Any, shipment_ids: Iterable[Any], run_id: Optional[Any] = None) -> List[Any]:
+        """
+        Extend the lease on shipments still claimed by `run_id` (default: the current run).
+        Returns the IDs that were renewed; the others were taken over or already finished.
+        """
+        shipment_ids = list(shipment_ids)
+        if not shipment_ids:
+            return []
+        run_id = run_id or logger.run_id
+        stmt = ClaimShipmentsRule.renew_statement(shipment_ids, run_id)
+        try:
+            renewed = session.scalars(stmt).all()
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.error(
+                f"Failed to renew claims of run ID {run_id}: {str(e)}", exc_info=True)
+            raise
+
+        if len(renewed) < len(shipment_ids):
+            logger.error(
+                f"Run ID {run_id} lost the claim on {len(shipment_ids) - len(renewed)} of {len(shipment_ids)} shipments")
+        return renewed
+
+    @staticmethod
+    def renew_statement(shipment_ids: List[Any], run_id: Any) -> Any:
+        """
+        Build the UPDATE of `renew_claims`, returning the renewed shipment IDs.
+        """
+        return (
+            update(Shipment)
+            .where(
+                Shipment.shipment_id.in_(shipment_ids),
+                Shipment.claimed_by == run_id,
+                Shipment.scrape_status == ScrapeStatus.IN_PROGRESS.name
+            )
+            .values(claimed_at=get_current_datetime_in_est())
+            .returning(Shipment.shipment_id)
+            .execution_options(synchronize_session=False)
+        )
@@ -2,16 +2,23 @@ import os
 from commons.rules.engine import BusinessRule
 from commons.enums import ScrapeStatus
 from commons.utils.date import get_current_datetime_in_est
-from sqlalchemy import func, or_, and_
+from sqlalchemy import or_, and_
 from commons.schemas.shipment import Shipment
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from commons.utils.logger import get_logger
+from datetime import datetime, timedelta
 import uuid
 
 logger = get_logger()
 
+# IN_PROGRESS shipments whose lease was not renewed for this long are considered abandoned.
+# Overridden by the CLAIM_LEASE_MINUTES environment variable or `claim_lease_minutes` in the context.
+CLAIM_LEASE_MINUTES = 30
+
 
 class FetchShipmentsRule(BusinessRule):
+    outputs = ('shipments',)
+
     def apply(self, context: Dict[str, Any]) -> None:
         """
         Apply the rule to fetch shipments based on the provided terminal ID and other criteria.
@@ -29,16 +36,7 @@ class FetchShipmentsRule(BusinessRule):
         current_time_est = get_current_datetime_in_est()
 
         # Check if a specific shipment ID is provided in the environment variable
-        shipment_id = None
-        try:
-            shipment_id_str = os.getenv("SHIPMENT_ID")
-            if shipment_id_str:
-                shipment_id = uuid.UUID(shipment_id_str)
-                logger.info(
-                    f"Shipment ID from environment variable: {shipment_id}")
-        except (ValueError, TypeError) as e:
-            logger.error(f"Invalid SHIPMENT_ID environment variable: {e}")
-            shipment_id = None
+        shipment_id = self.get_shipment_id_from_env()
 
         if shipment_id:
             logger.info(
@@ -57,26 +55,106 @@ class FetchShipmentsRule(BusinessRule):
         else:
             # ORM-based query using the Shipment model for all matching shipments
             shipments = session.query(Shipment).filter(
-                Shipment.terminal_id == terminal_id,
-                or_(
-                    and_(
-                        or_(
-                            Shipment.scrape_status == ScrapeStatus.ASSIGNED.name,
-                            Shipment.scrape_status == ScrapeStatus.ACTIVE.name
-                        ),
-                        Shipment.start_scrape_time <= current_time_est,
-                        Shipment.start_scrape_time <= Shipment.next_scrape_time,
-                        (func.extract('epoch', current_time_est - Shipment.last_scraped_time) / 3600) >= Shipment.frequency
-                    ),
-                    or_(
-                        # TODO: Remove the IN_PROGRESS logic in the next sprint for refinement
-                        Shipment.scrape_status == ScrapeStatus.IN_PROGRESS.name,
-                        Shipment.scrape_status == ScrapeStatus.FAILED.name
-                    )
-                )
+                self.eligibility_filter(
+                    terminal_id, current_time_est, self.get_stale_before(context, current_time_est))
             ).all()
 
             # Store the fetched shipments in the context for further processing
             logger.info(
                 f"Fetched {len(shipments)} shipments for terminal ID: {terminal_id}")
             context['shipments'] = shipments
+
+    @staticmethod
+    def get_shipment_id_from_env() -> Optional[uuid.UUID]:
+        """
+        Return the shipment ID from the SHIPMENT_ID environment variable, if valid.
+        """
+        try:
+            shipment_id_str = os.getenv("SHIPMENT_ID")
+            if shipment_id_str:
+                shipment_id = uuid.UUID(shipment_id_str)
+                logger.info(
+                    f"Shipment ID from environment variable: {shipment_id}")
+                return shipment_id
+        except (ValueError, TypeError) as e:
+            logger.error(f"Invalid SHIPMENT_ID environment variable: {e}")
+        return None
+
+    @staticmethod
+    def get_claim_lease_minutes(context: Dict[str, Any]) -> float:
+        """
+        Return the minutes a claim stays valid without being renewed.
+        """
+        minutes = context.get('claim_lease_minutes')
+        if minutes is None:
+            minutes = float(os.getenv("CLAIM_LEASE_MINUTES", CLAIM_LEASE_MINUTES))
+        return minutes
+
+    @classmethod
+    def get_stale_before(cls, context: Dict[str, Any], current_time: datetime) -> datetime:
+        """
+        Return the lease time before which an IN_PROGRESS shipment is picked up again.
+        """
+        return current_time - timedelta(minutes=cls.get_claim_lease_minutes(context))
+
+    @staticmethod
+    def eligibility_filter(terminal_id: str, current_time: datetime, stale_before: datetime):
+        """
+        Build the predicate selecting the shipments of a terminal that are due for scraping.
+
+        :param terminal_id: The terminal the shipments belong to.
+        :param current_time: The current time in EST.
+        :param stale_before: IN_PROGRESS shipments whose lease was last renewed before this time
+                             are due again.
+        """
+        return and_(
+            Shipment.terminal_id == terminal_id,
+            or_(
+                and_(
+                    Shipment.scrape_status.in_(
+                        [ScrapeStatus.ASSIGNED.name, ScrapeStatus.ACTIVE.name]),
+                    Shipment.start_scrape_time <= current_time,
+                    Shipment.start_scrape_time <= Shipment.next_scrape_time,
+                    # next_scrape_time is kept at last_scraped_time + frequency by the status rules,
+                    # so this range predicate replaces the per-row epoch computation
+                    Shipment.last_scraped_time.isnot(None),
+                    Shipment.next_scrape_time <= current_time
+                ),
+                Shipment.scrape_status == ScrapeStatus.FAILED.name,
+                # Claims whose owner stopped renewing the lease are recovered
+                and_(
+                    Shipment.scrape_status == ScrapeStatus.IN_PROGRESS.name,
+                    FetchShipmentsRule.stale_claim(stale_before)
+                )
+            )
+        )
+
+    @staticmethod
+    def stale_claim(stale_before: datetime):
+        """
+        Build the predicate selecting claims whose lease was last renewed before `stale_before`.
+        """
+        return or_(
+            Shipment.claimed_at <= stale_before,
+            # Claims made before leases existed fall back to the scrape time
+            and_(
+                Shipment.claimed_at.is_(None),
+                or_(
+                    Shipment.last_scraped_time.is_(None),
+                    Shipment.last_scraped_time <= stale_before
+                )
+            )
+        )
+
+    @classmethod
+    def claim_available(cls, run_id: Any, stale_before: datetime):
+        """
+        Build the predicate selecting shipments `run_id` may claim: those not IN_PROGRESS, or
+        claimed by `run_id` itself, or whose claim went stale. A live claim of another run
+        is never taken over.
+        """
+        return or_(
+            Shipment.scrape_status != ScrapeStatus.IN_PROGRESS.name,
+            Shipment.claimed_by == run_id,
+            cls.stale_claim(stale_before)
+        )
@@ -1,5 +1,5 @@
 from commons.rules.engine import BusinessRule
-from typing import Dict, Any
+from typing import Dict, Any, Sequence
 from commons.enums import ScrapeStatus
 from commons.utils.logger import get_logger
 
@@ -7,6 +7,8 @@ logger = get_logger()
 
 
 class SetActiveStatusRule(BusinessRule):
+    inputs = ('shipment',)
+
     def apply(self, context: Dict[str, Any]) -> None:
         """
         If the shipment's status is ACTIVE, update the next_scrape_time
@@ -17,3 +19,13 @@ class SetActiveStatusRule(BusinessRule):
         shipment.error = None
         logger.info(
             f"Shipment ID {shipment.shipment_id} status set to ACTIVE")
+
+    def apply_many(self, contexts: Sequence[Dict[str, Any]]) -> None:
+        """
+        Mark every shipment of the batch ACTIVE with a single log line.
+        """
+        for context in contexts:
+            shipment = context.get("shipment")
+            shipment.scrape_status = ScrapeStatus.ACTIVE
+            shipment.error = None
+        logger.info(f"Set status to ACTIVE for {len(contexts)} shipments")
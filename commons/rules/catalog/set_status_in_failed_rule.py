@@ -1,25 +1,53 @@
 from commons.rules.engine import BusinessRule
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Sequence
 from commons.enums import ScrapeStatus
 from commons.utils.date import get_current_datetime_in_est
 from commons.utils.logger import get_logger
-from datetime import timedelta
+from datetime import datetime, timedelta
+from sqlalchemy import literal_column
 
 logger = get_logger()
 
 
 class SetFailedStatusRule(BusinessRule):
+    inputs = ('shipment',)
+
     def apply(self, context: Dict[str, Any]) -> None:
 
         shipment = context.get('shipment')
-        error_message = context.get('error_message')
+        self._set_failed(shipment, context.get('error_message'),
+                         get_current_datetime_in_est())
+        if shipment:
+            logger.info(
+                f"Setting status to FAILED and updating last_scraped_time for shipment ID {shipment.shipment_id}")
 
+    def apply_many(self, contexts: Sequence[Dict[str, Any]]) -> None:
+        """
+        Mark every shipment of the batch FAILED, computing the current time once.
+        """
         current_time = get_current_datetime_in_est()
-        next_scrape_time = current_time + timedelta(hours=shipment.frequency)
-         
+        for context in contexts:
+            self._set_failed(context.get('shipment'),
+                             context.get('error_message'), current_time)
+        logger.info(f"Set status to FAILED for {len(contexts)} shipments")
+
+    @staticmethod
+    def _set_failed(shipment: Any, error_message: Optional[str], current_time: datetime) -> None:
+        # Without a frequency the shipment is not rescheduled, as in `column_values`
+        next_scrape_time = None if shipment.frequency is None \
+            else current_time + timedelta(hours=shipment.frequency)
+
         shipment.scrape_status = ScrapeStatus.FAILED
         shipment.next_scrape_time = next_scrape_time
         shipment.error = error_message
-        if shipment:
-            logger.info(
-                f"Setting status to FAILED and updating last_scraped_time for shipment ID {shipment.shipment_id}")
+
+    @staticmethod
+    def column_values(model: Any, current_time: datetime, error_message: Optional[str]) -> Dict[str, Any]:
+        """
+        Return the same changes as `apply` as column values for a set-based UPDATE on `model`.
+        """
+        return {
+            "scrape_status": ScrapeStatus.FAILED,
+            "next_scrape_time": current_time + model.frequency * literal_column("INTERVAL '1 hour'"),
+            "error": error_message,
+        }
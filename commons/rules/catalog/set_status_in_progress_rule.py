@@ -1,13 +1,16 @@
 from commons.rules.engine import BusinessRule
-from typing import Dict, Any
+from typing import Dict, Any, Sequence
 from commons.enums import ScrapeStatus
 from commons.utils.date import get_current_datetime_in_est
 from commons.utils.logger import get_logger
-from datetime import timedelta
+from datetime import datetime, timedelta
+from sqlalchemy import literal_column
 logger = get_logger()
 
 
 class SetInProgressStatusRule(BusinessRule):
+    inputs = ('shipment',)
+
     def apply(self, context: Dict[str, Any]) -> None:
         """
         If the shipment's status is set to IN_PROGRESS, update the last_scraped_time.
@@ -17,14 +20,47 @@ class SetInProgressStatusRule(BusinessRule):
             logger.info(
                 f"Setting status to IN_PROGRESS and updating last_scraped_time for shipment ID {shipment.shipment_id}")
 
-            current_time = get_current_datetime_in_est()
-            next_scrape_time = current_time + \
-                timedelta(hours=shipment.frequency)
-
-            shipment.scrape_status = ScrapeStatus.IN_PROGRESS
-            shipment.last_scraped_time = get_current_datetime_in_est()
-            shipment.next_scrape_time = next_scrape_time
-            shipment.error = None
+            self._set_in_progress(shipment, get_current_datetime_in_est())
 
             logger.info(
                 f"Shipment ID {shipment.shipment_id} status set to IN_PROGRESS and last_scraped_time updated to {shipment.last_scraped_time}")
+
+    def apply_many(self, contexts: Sequence[Dict[str, Any]]) -> None:
+        """
+        Mark every shipment of the batch IN_PROGRESS, computing the current time once.
+        """
+        current_time = get_current_datetime_in_est()
+        shipments = [context.get("shipment") for context in contexts]
+        for shipment in shipments:
+            if shipment:
+                self._set_in_progress(shipment, current_time)
+        logger.info(
+            f"Set status to IN_PROGRESS for {len(shipments)} shipments, last_scraped_time {current_time}")
+
+    @staticmethod
+    def _set_in_progress(shipment: Any, current_time: datetime) -> None:
+        # Without a frequency the shipment is not rescheduled, as in `column_values`
+        next_scrape_time = None if shipment.frequency is None \
+            else current_time + timedelta(hours=shipment.frequency)
+
+        shipment.scrape_status = ScrapeStatus.IN_PROGRESS
+        shipment.last_scraped_time = current_time
+        shipment.next_scrape_time = next_scrape_time
+        shipment.error = None
+        shipment.claimed_at = current_time
+        shipment.claimed_by = logger.run_id
+
+    @staticmethod
+    def column_values(model: Any, current_time: datetime, claimed_by: Any = None) -> Dict[str, Any]:
+        """
+        Return the same changes as `apply` as column values for a set-based UPDATE on `model`.
+        :param claimed_by: Run holding the claim; defaults to the current run.
+        """
+        return {
+            "scrape_status": ScrapeStatus.IN_PROGRESS,
+            "last_scraped_time": current_time,
+            "next_scrape_time": current_time + model.frequency * literal_column("INTERVAL '1 hour'"),
+            "error": None,
+            "claimed_at": current_time,
+            "claimed_by": claimed_by or logger.run_id,
+        }
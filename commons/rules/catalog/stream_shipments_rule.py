@@ -0,0 +1,87 @@
+from commons.rules.catalog.fetch_shipments_rule import FetchShipmentsRule
+from commons.utils.date import get_current_datetime_in_est
+from sqlalchemy import or_, and_
+from commons.schemas.shipment import Shipment
+from typing import Dict, Any, Iterator, Optional
+from commons.utils.logger import get_logger
+from datetime import timedelta
+
+logger = get_logger()
+
+# Default number of shipments loaded per page
+CHUNK_SIZE = 500
+
+
+class StreamShipmentsRule(FetchShipmentsRule):
+    def apply(self, context: Dict[str, Any]) -> None:
+        """
+        Store a generator of due shipments in `context['shipments']` instead of a list.
+
+        Shipments are loaded in keyset-paginated pages ordered by shipment_id, so only one page is
+        held in memory at a time. Each page is a separate query, which keeps the stream valid when
+        the consumer commits between pages.
+
+        :param context: The context dictionary containing the SQLAlchemy session, scraper metadata,
+                        and optionally `chunk_size` and `claim_lease_minutes`.
+        """
+        session = context.get('session')
+        scraper_metadata = context.get('scraper_metadata')
+
+        if not session or not scraper_metadata:
+            raise ValueError(
+                "Session and scraper_metadata must be provided in the context.")
+
+        shipment_id = self.get_shipment_id_from_env()
+        if shipment_id:
+            # The trigger use case only ever yields a single shipment
+            super().apply(context)
+            context['shipments'] = iter(context['shipments'])
+            return
+
+        context['shipments'] = self.iter_shipments(
+            session, scraper_metadata.terminal_id, context.get('chunk_size', CHUNK_SIZE),
+            self.get_claim_lease_minutes(context))
+
+    def iter_shipments(self, session: Any, terminal_id: str, chunk_size: int = CHUNK_SIZE,
+                       claim_lease_minutes: Optional[float] = None) -> Iterator[Shipment]:
+        """
+        Yield the due shipments of a terminal page by page.
+
+        Pages follow the immutable shipment_id, so processing a row (which moves its
+        next_scrape_time forward and may leave it FAILED, hence still eligible) never brings it
+        back into a later page. Shipments claimed by another run after the stream started
+        (last_scraped_time at or after its start) are skipped.
+        """
+        started_at = get_current_datetime_in_est()
+        if claim_lease_minutes is None:
+            claim_lease_minutes = self.get_claim_lease_minutes({})
+        stale_before = started_at - timedelta(minutes=claim_lease_minutes)
+        criteria = and_(
+            self.eligibility_filter(terminal_id, started_at, stale_before),
+            or_(
+                Shipment.last_scraped_time.is_(None),
+                Shipment.last_scraped_time < started_at
+            )
+        )
+
+        total = 0
+        last_id = None
+        while True:
+            query = session.query(Shipment).filter(criteria)
+            if last_id is not None:
+                query = query.filter(Shipment.shipment_id > last_id)
+            page = query.order_by(Shipment.shipment_id).limit(chunk_size).all()
+
+            if not page:
+                break
+            # Read the cursor before the consumer gets a chance to modify the rows
+            last_id = page[-1].shipment_id
+            total += len(page)
+            logger.info(
+                f"Fetched page of {len(page)} shipments for terminal ID: {terminal_id}")
+            yield from page
+            if len(page) < chunk_size:
+                break
+
+        logger.info(
+            f"Streamed {total} shipments for terminal ID: {terminal_id}")
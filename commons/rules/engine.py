@@ -1,22 +1,102 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any
+from typing import Dict, Any, List, Sequence, Tuple
 from commons.utils.logger import get_logger
 
 logger = get_logger()
 
 
 class BusinessRule(ABC):
+    # Context keys the rule reads; the rule is skipped when any of them is missing or None
+    inputs: Tuple[str, ...] = ()
+    # Context keys the rule writes; rules reading them are ordered after this one
+    outputs: Tuple[str, ...] = ()
+
+    def guard(self, context: Dict[str, Any]) -> bool:
+        """Return False to skip the rule for this context."""
+        return True
+
     @abstractmethod
     def apply(self, context: Dict[str, Any]) -> None:
         pass
 
+    def apply_many(self, contexts: Sequence[Dict[str, Any]]) -> None:
+        """
+        Apply the rule to a batch of contexts. Rules can override this to share work
+        across the batch (e.g. compute timestamps once); by default each context is applied in turn.
+        """
+        for context in contexts:
+            self.apply(context)
+
 
 class BusinessRuleEngine:
     def __init__(self, rules: list[BusinessRule]):
+        """
+        Build the execution plan once: rules are ordered so that every producer of a context key
+        runs before its consumers. Rules that declare neither inputs nor outputs keep their
+        position relative to all other rules.
+        """
         self.rules = rules
+        self._plan = self._build_plan(rules)
+
+    @staticmethod
+    def _build_plan(rules: List[BusinessRule]) -> List[Tuple[BusinessRule, Tuple[str, ...], bool]]:
+        count = len(rules)
+        dependencies = [set() for _ in range(count)]
+        for later in range(count):
+            for earlier in range(later):
+                first, second = rules[earlier], rules[later]
+                undeclared = not (first.inputs or first.outputs) or not (
+                    second.inputs or second.outputs)
+                writes_first = set(first.outputs)
+                if undeclared or writes_first & set(second.inputs) or writes_first & set(second.outputs):
+                    dependencies[later].add(earlier)
+                if set(second.outputs) & set(first.inputs):
+                    dependencies[earlier].add(later)
+
+        # Stable topological sort: among ready rules, the one listed first runs first
+        order = []
+        done = set()
+        while len(order) < count:
+            ready = [
+                index for index in range(count)
+                if index not in done and dependencies[index] <= done
+            ]
+            if not ready:
+                cycle = [rules[index].__class__.__name__ for index in range(count) if index not in done]
+                raise ValueError(f"Rules have cyclic input/output dependencies: {cycle}")
+            order.append(ready[0])
+            done.add(ready[0])
+
+        # Whether guard is overridden is resolved once, not per context
+        return [
+            (rules[index], tuple(rules[index].inputs),
+             type(rules[index]).guard is not BusinessRule.guard)
+            for index in order
+        ]
 
     def apply_rules(self, context: Dict[str, Any]) -> None:
-        logger.info("Applying rules...")
-        for rule in self.rules:
-            logger.info(f"Applying rule: {rule.__class__.__name__}")
+        applied = 0
+        for rule, inputs, has_guard in self._plan:
+            if inputs and any(context.get(key) is None for key in inputs):
+                continue
+            if has_guard and not rule.guard(context):
+                continue
             rule.apply(context)
+            applied += 1
+        logger.info(f"Applied {applied} of {len(self._plan)} rules")
+
+    def apply_rules_many(self, contexts: Sequence[Dict[str, Any]]) -> None:
+        """
+        Apply the plan to a batch of independent contexts, one rule at a time, handing each
+        rule every context it applies to through `apply_many`.
+        """
+        for rule, inputs, has_guard in self._plan:
+            eligible = [
+                context for context in contexts
+                if not (inputs and any(context.get(key) is None for key in inputs))
+                and (not has_guard or rule.guard(context))
+            ]
+            if eligible:
+                rule.apply_many(eligible)
+        logger.info(
+            f"Applied {len(self._plan)} rules to {len(contexts)} contexts")
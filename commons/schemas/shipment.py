@@ -1,9 +1,11 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, PrimaryKeyConstraint, Text, Enum, JSON
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, PrimaryKeyConstraint, Text, Enum, JSON, Index, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from .base import Base
-from commons.utils.date import get_current_datetime_in_est
+from commons.utils.date import get_current_datetime_in_est, get_current_timestamp_in_est
 from commons.enums import ScrapeStatus
+import hashlib
+import json
 import uuid
 
 class ContainerAvailability(Base):
@@ -11,7 +13,7 @@ class ContainerAvailability(Base):
 
     shipment_id = Column(UUID(as_uuid=True), ForeignKey(
         "shipments.shipment_id", ondelete="CASCADE"), nullable=False)
-    container_number = Column(String, nullable=False)
+    container_number = Column(String, nullable=False, index=True)
     vessel_eta = Column(String, nullable=True)
     port = Column(String, nullable=False)
     terminal = Column(String, nullable=False)
@@ -30,9 +32,44 @@ class ContainerAvailability(Base):
     line = Column(String, nullable=True)
     additional_info = Column(JSON, nullable=True)
     delivery_date = Column(String, nullable=True)
+    # Hash of the scraped content, see `hash_content`; unchanged rows are not rewritten
+    content_hash = Column(String(64), nullable=True)
+    # Last time a scrape returned this container, updated even when the content is unchanged
+    last_seen_at = Column(DateTime, nullable=True)
 
     shipment = relationship("Shipment", back_populates="containers")
 
+    # Columns that identify or track the row rather than describe the container
+    HASH_EXCLUDED_FIELDS = frozenset(
+        ('shipment_id', 'content_hash', 'last_seen_at'))
+
+    @classmethod
+    def hash_content(cls, row: dict) -> str:
+        """
+        Hash the scraped content of a row (mapped fields and additional_info).
+        Strings are stripped, and blank or None values are left out, so formatting noise and
+        newly added empty columns do not change the hash.
+        """
+        content = {}
+        for key, value in row.items():
+            if key in cls.HASH_EXCLUDED_FIELDS:
+                continue
+            if isinstance(value, str):
+                value = value.strip()
+            if value not in (None, '', {}):
+                content[key] = value
+        encoded = json.dumps(content, sort_keys=True,
+                             separators=(',', ':'), default=str)
+        return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+    def refresh_content_hash(self, seen_at=None) -> str:
+        """
+        Set `content_hash` from the current values and mark the container as seen.
+        """
+        self.content_hash = self.hash_content(self.to_dict())
+        self.last_seen_at = seen_at or get_current_datetime_in_est()
+        return self.content_hash
+
     def __repr__(self):
         return (f"<ContainerAvailability(container_number='{self.container_number}', "
                 f"available='{self.available}')")
@@ -67,6 +104,12 @@ class Shipment(Base):
     company_code = Column(String, nullable=True)
     vessel_orig_eta = Column(DateTime, nullable=True)  # Store as DateTime
     run_id = Column(UUID(as_uuid=True), nullable=True)
+    # Lease of the run processing an IN_PROGRESS shipment, renewed while it works
+    claimed_at = Column(DateTime, nullable=True)
+    claimed_by = Column(UUID(as_uuid=True), nullable=True)
+    # Time of the last change; write-behind upserts never overwrite a newer row
+    updated_at = Column(DateTime, nullable=True, default=get_current_timestamp_in_est,
+                        onupdate=get_current_timestamp_in_est)
 
     containers = relationship("ContainerAvailability",
                               back_populates="shipment",
@@ -75,6 +118,18 @@ class Shipment(Base):
     # Add the logs relationship
     logs = relationship("ShipmentLog", back_populates="shipment", cascade="all, delete-orphan")
 
+    # Indexes serving the scheduler queries of FetchShipmentsRule and ClaimShipmentsRule
+    __table_args__ = (
+        Index('ix_shipments_due', 'terminal_id', 'scrape_status', 'next_scrape_time',
+              postgresql_where=text("scrape_status IN ('ASSIGNED', 'ACTIVE')")),
+        Index('ix_shipments_retry', 'terminal_id', 'scrape_status', 'last_scraped_time',
+              postgresql_where=text("scrape_status IN ('FAILED', 'IN_PROGRESS')")),
+        Index('ix_shipments_terminal_next_scrape',
+              'terminal_id', 'next_scrape_time', 'shipment_id'),
+        Index('ix_shipments_claims', 'terminal_id', 'claimed_at',
+              postgresql_where=text("scrape_status = 'IN_PROGRESS'")),
+    )
+
     def __repr__(self):
         return (f"<Shipment(shipment_id={self.shipment_id}, "
                 f"container_number='{self.container_number}', "
@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Column, Integer, DateTime, ForeignKey, Enum, JSON
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Enum, JSON, Index, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from .base import Base
@@ -8,20 +8,28 @@ from commons.enums import ScrapeStatus
 class ShipmentLog(Base):
     __tablename__ = "shipment_logs"
 
+    # Unique together with scraped_at: shipment_logs is range-partitioned by scraped_at
     log_id = Column(UUID(as_uuid=True), primary_key=True,
-                         default=uuid.uuid4, unique=True, nullable=False)
+                         default=uuid.uuid4, nullable=False)
     shipment_id = Column(UUID(as_uuid=True), ForeignKey(
         "shipments.shipment_id"), nullable=False)
     # Status at the time of logging
     scrape_status = Column(Enum(ScrapeStatus), nullable=True)
     # Timestamp for the event, default to current time
-    scraped_at = Column(DateTime, nullable=False)
+    scraped_at = Column(DateTime, primary_key=True, nullable=False)
     # (Optional) Snapshot of data after update
     new_data = Column(JSON, nullable=True)
 
     # Establish relationship with Shipment
     shipment = relationship("Shipment", back_populates="logs")
 
+    # Monthly partitions are created and expired by commons.maintenance
+    __table_args__ = (
+        Index('ix_shipment_logs_shipment_scraped',
+              'shipment_id', text('scraped_at DESC')),
+        {'postgresql_partition_by': 'RANGE (scraped_at)'},
+    )
+
     def __repr__(self):
         return (f"<ShipmentLog(log_id={self.log_id}, shipment_id={self.shipment_id}, "
                 f"scrape_status='{self.scrape_status}')>")
\ No newline at end of file
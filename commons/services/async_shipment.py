@@ -0,0 +1,248 @@
+from typing import Dict, Any, Optional, Sequence
+from commons.async_repository import AsyncBaseRepository
+from commons.services.shipment import ShipmentService
+from commons.utils.logger import get_logger
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+from ..rules.catalog.claim_shipments_rule import ClaimShipmentsRule
+from ..rules.catalog.set_status_in_progress_rule import SetInProgressStatusRule
+from commons.enums import ScrapeStatus
+from commons.utils.date import get_current_datetime_in_est
+
+
+logger = get_logger()
+
+
+class AsyncShipmentService:
+    # Shared with ShipmentService: status rules are stateless singletons
+    IN_PROGRESS_RULE = ShipmentService.IN_PROGRESS_RULE
+    FAILED_RULE = ShipmentService.FAILED_RULE
+    ACTIVE_RULE = ShipmentService.ACTIVE_RULE
+
+    def __init__(self, session: AsyncSession, shipment_repo: AsyncBaseRepository, container_repo: Optional[AsyncBaseRepository] = None):
+        """
+        Asyncio counterpart of ShipmentService. Rules are applied exactly as in the synchronous
+        service; only the repository calls are awaited, so DB writes can overlap with scraping.
+        """
+        self.session = session
+        self.shipment_repo = shipment_repo
+        self.container_repo = container_repo
+
+    async def process(self, context: Dict[str, Any], rules: Optional[Sequence[Any]] = None):
+        shipment = context.get('shipment')
+        container_availability = context.get('container_availability')
+        # Read before anything can roll back and expire the shipment
+        shipment_id = shipment.shipment_id
+
+        try:
+            # Assign run_id to the shipment
+            shipment.run_id = get_logger().run_id
+
+            # Apply any business rules
+            for rule in rules or []:
+                rule.apply(context)
+
+            # Check if the status is still 'IN_PROGRESS'
+            if shipment.scrape_status == ScrapeStatus.IN_PROGRESS:
+                # No errors or special conditions occurred, mark as ACTIVE
+                shipment.scrape_status = ScrapeStatus.ACTIVE
+                logger.info(
+                    f"Setting shipment ID {shipment.shipment_id} to ACTIVE after successful processing")
+
+            # Save the updated shipment status
+            await self.shipment_repo.save_or_update(
+                shipment, "shipment_id", shipment.shipment_id)
+
+            # If container availability data is present, save it
+            if container_availability and self.container_repo:
+                container_availability.shipment_id = shipment.shipment_id
+                await self._save_container(container_availability)
+
+        except Exception as e:
+            logger.error(
+                f"Error processing shipment ID {shipment_id}: {str(e)}", exc_info=True)
+            await self._reload_if_expired(shipment)
+            shipment.scrape_status = ScrapeStatus.FAILED
+            await self.shipment_repo.save_or_update(
+                shipment, "shipment_id", shipment_id)
+            raise
+
+    async def _reload_if_expired(self, entity):
+        """
+        A rollback expires every loaded instance, and AsyncSession cannot load expired
+        attributes on access (MissingGreenlet). Reload them explicitly before use.
+        """
+        state = inspect(entity)
+        if state.expired_attributes and state.session is not None:
+            await self.session.refresh(entity)
+
+    async def _save_container(self, container_availability):
+        """
+        Save a container availability on its composite key (shipment_id, container_number),
+        writing only last_seen_at when its content is unchanged.
+        """
+        container_availability.refresh_content_hash()
+        await self.container_repo.save_or_touch(
+            container_availability,
+            {"shipment_id": container_availability.shipment_id,
+             "container_number": container_availability.container_number},
+            "content_hash", ("last_seen_at",))
+
+    async def process_in_progress(self, context: Dict[str, Any], rules: Optional[Sequence[Any]] = None):
+        """
+        Mark a shipment as 'IN_PROGRESS' and apply any associated rules.
+        """
+        await self._process_status(
+            context, rules, self.IN_PROGRESS_RULE, ScrapeStatus.IN_PROGRESS, "in-progress")
+
+    async def process_failed(self, context: Dict[str, Any], rules: Optional[Sequence[Any]] = None):
+        """
+        Mark a shipment as 'FAILED' and apply any associated rules.
+        """
+        await self._process_status(
+            context, rules, self.FAILED_RULE, ScrapeStatus.FAILED, "failed")
+
+    async def process_active(self, context: Dict[str, Any], rules: Optional[Sequence[Any]] = None):
+        """
+        Process a shipment and optionally container availability, marking them as 'ACTIVE' before applying rules.
+        """
+        await self._process_status(
+            context, rules, self.ACTIVE_RULE, ScrapeStatus.ACTIVE, "active", save_container=True)
+
+    async def process_stopped(self, context: Dict[str, Any], rules: Optional[Sequence[Any]] = None):
+        """
+        Process a shipment marked as 'STOPPED'.
+        """
+        await self._process_status(
+            context, rules, None, ScrapeStatus.STOPPED, "stopped")
+
+    async def _process_status(self, context: Dict[str, Any], rules: Optional[Sequence[Any]], status_rule: Any,
+                              status: ScrapeStatus, label: str, save_container: bool = False):
+        shipment = context.get('shipment')
+        container_availability = context.get('container_availability')
+        shipment_id = shipment.shipment_id
+
+        try:
+            # Caller rules first, then the status rule, without touching the caller's list
+            pipeline = ShipmentService._pipeline(rules, status_rule) if status_rule is not None \
+                else tuple(rules or ())
+            for rule in pipeline:
+                rule.apply(context)
+
+            shipment.scrape_status = status
+
+            # Save the updated shipment
+            await self.shipment_repo.save_or_update(
+                shipment, "shipment_id", shipment.shipment_id)
+
+            # Save container availability if present
+            if save_container and container_availability and self.container_repo:
+                container_availability.shipment_id = shipment.shipment_id
+                await self._save_container(container_availability)
+
+        except Exception as e:
+            logger.error(
+                f"Error processing {label} shipment ID {shipment_id}: {str(e)}")
+            raise
+
+    async def mark_shipments_in_progress(self, shipments):
+        """
+        Mark shipments in progress with a single set-based UPDATE, claiming them for this run.
+        Shipments under a live claim of another run are left to it and skipped; the others
+        that could not be claimed fall back to the FAILED path.
+        Returns the shipments that were claimed. The claims are leases: callers processing
+        them for longer than the lease must call `renew_claims`.
+        """
+        shipments = list(shipments)
+        if not shipments:
+            return []
+
+        model = self.shipment_repo.model
+        current_time = get_current_datetime_in_est()
+        # Read before a failed UPDATE rolls back and expires the shipments
+        shipment_ids = [shipment.shipment_id for shipment in shipments]
+        claimable_ids = [
+            shipment.shipment_id for shipment in shipments if shipment.frequency is not None]
+        values = SetInProgressStatusRule.column_values(model, current_time)
+        criteria = (ClaimShipmentsRule.claim_available(
+            get_logger().run_id, ClaimShipmentsRule.get_stale_before({}, current_time)),)
+        # Every column, as in ShipmentService, so the claimed shipments are complete
+        returning = tuple(
+            attr.key for attr in inspect(model).column_attrs if attr.key != "shipment_id")
+
+        try:
+            rows = await self.shipment_repo.bulk_update_by_ids(
+                "shipment_id", claimable_ids, values, returning, criteria)
+            error_message = None
+        except Exception as e:
+            logger.error(
+                f"Failed to update status to 'In Progress' for {len(claimable_ids)} shipments: {str(e)}", exc_info=True)
+            rows = []
+            error_message = str(e)
+
+        claimed = {row[0]: row for row in rows}
+        claimable_ids = set(claimable_ids)
+        claimed_shipments = []
+        skipped = 0
+        for shipment, shipment_id in zip(shipments, shipment_ids):
+            row = claimed.get(shipment_id)
+            if row is None:
+                if shipment_id in claimable_ids and error_message is None:
+                    # The UPDATE ran: the row is claimed by another run
+                    skipped += 1
+                    continue
+                # Without a frequency there is no next scrape time to schedule
+                message = error_message if shipment_id in claimable_ids \
+                    else "Shipment has no scrape frequency"
+                logger.error(
+                    f"Failed to update status to 'In Progress' for shipment ID {shipment_id} : {message}")
+                await self._reload_if_expired(shipment)
+                context = {"shipment": shipment, "error_message": message}
+                await self.process_failed(context)
+                continue
+            for key, value in zip(returning, row[1:]):
+                set_committed_value(shipment, key, value)
+            claimed_shipments.append(shipment)
+
+        if skipped:
+            logger.info(f"Skipped {skipped} shipments claimed by another run")
+        logger.info(
+            f"Updated status to 'In Progress' for {len(claimed)} of {len(shipments)} shipments")
+        return claimed_shipments
+
+    async def renew_claims(self, shipment_ids, run_id=None):
+        """
+        Async counterpart of ClaimShipmentsRule.renew_claims: extend the lease on shipments
+        still claimed by `run_id` (default: the current run) and return the renewed IDs.
+        """
+        shipment_ids = list(shipment_ids)
+        if not shipment_ids:
+            return []
+        run_id = run_id or get_logger().run_id
+        try:
+            renewed = (await self.session.scalars(
+                ClaimShipmentsRule.renew_statement(shipment_ids, run_id))).all()
+            await self.session.commit()
+        except Exception as e:
+            await self.session.rollback()
+            logger.error(
+                f"Failed to renew claims of run ID {run_id}: {str(e)}", exc_info=True)
+            raise
+        if len(renewed) < len(shipment_ids):
+            logger.error(
+                f"Run ID {run_id} lost the claim on {len(shipment_ids) - len(renewed)} of {len(shipment_ids)} shipments")
+        return renewed
+
+    async def mark_shipments_in_error(self, shipments, error_message):
+        """
+        Log errors for each shipment in the current batch.
+        """
+        for shipment in shipments:
+            try:
+                context = {"shipment": shipment,
+                           "error_message": error_message}
+                await self.process_failed(context)
+            except Exception as e:
+                logger.error(
+                    f"Failed to log error for shipment ID {shipment.shipment_id}: {str(e)}", exc_info=True)
@@ -1,17 +1,21 @@
 import time
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
 import os
 from selenium import webdriver
 from .aws import AWSService
+from .driver_resolver import ChromeDriverResolver
+from .network_capture import NetworkCapture
+from .scrape_profile import get_scrape_profile
+from .waits import Waiter, all_of, dom_settled, install_tracker, network_idle
 
 
 class BrowserService:
-    def __init__(self, aws_service: AWSService, bucket_name, logger, headless=True, window_size="1920,1080", timeout=60, options=None):
+    def __init__(self, aws_service: AWSService, bucket_name, logger, headless=True, window_size="1920,1080", timeout=60, options=None, driver_resolver=None,
+                 poll_interval=0.1, settle_timeout=10, metrics_hook=None, profile=None,
+                 capture_network=False):
         self.driver = None
         self.aws_service = aws_service
         self.bucket_name = bucket_name
@@ -20,7 +24,20 @@ class BrowserService:
         self.headless = headless
         self.window_size = window_size
         self.timeout = timeout
+        # Explicit waits only: no implicit wait is set, so negative lookups return immediately
+        self.poll_interval = poll_interval
+        # Upper bound for waiting until the page settles after a script
+        self.settle_timeout = settle_timeout
+        # Called as metrics_hook(wait_name, seconds, succeeded) after every wait
+        self.metrics_hook = metrics_hook
+        self._waiter = None
+        # ScrapeProfile or its name; selects page-load strategy and blocked resources
+        self.profile = get_scrape_profile(profile)
+        # Record network responses so scrapers can read JSON payloads (see get_json_responses)
+        self.capture_network = capture_network
+        self.network = None
         self.options = options or Options()
+        self.driver_resolver = driver_resolver or ChromeDriverResolver(logger)
         self._initialize_options()
 
     def _initialize_options(self):
@@ -38,21 +55,98 @@ class BrowserService:
         self.options.add_argument('--disable-gpu')
         self.options.add_argument('--disable-infobars')
         self.options.add_argument('--disable-extensions')
-        self.logger.info("Browser options initialized")
+        self.profile.apply_options(self.options)
+        if self.capture_network:
+            NetworkCapture.enable_logging(self.options)
+        self.logger.info(
+            f"Browser options initialized with scrape profile '{self.profile.name}'")
 
     def initialize_browser(self):
         try:
-            service = Service(ChromeDriverManager().install())
+            start = time.perf_counter()
+            service = Service(self.driver_resolver.resolve())
             self.driver = webdriver.Chrome(
                 service=service, options=self.options)
-            # Set implicit wait for general use
-            self.driver.implicitly_wait(self.timeout)
             self.logger.info(
-                f"Browser initialized with a timeout of {self.timeout} seconds")
+                f"Browser started in {time.perf_counter() - start:.2f} seconds")
+            # Track XHR/fetch and DOM mutations on every page for the settle conditions
+            install_tracker(self.driver)
+            self.profile.apply_driver(self.driver)
+            if self.capture_network:
+                self.network = NetworkCapture(self.driver, self.waiter, self.logger)
+            self.logger.info(
+                f"Browser initialized with a wait timeout of {self.timeout} seconds")
         except Exception as e:
             self.logger.error(f"Failed to initialize browser: {e}")
             raise
 
+    @property
+    def waiter(self):
+        """
+        The Waiter of the current driver, created on first use, so drivers attached without
+        `initialize_browser` can wait as well.
+        """
+        if self.driver is None:
+            return None
+        if self._waiter is None or self._waiter.driver is not self.driver:
+            self._waiter = Waiter(
+                self.driver, self.timeout, self.poll_interval, self.metrics_hook, self.logger)
+        return self._waiter
+
+    def is_alive(self):
+        """
+        Check that the browser still answers commands.
+        """
+        if not self.driver:
+            return False
+        try:
+            self.driver.execute_script("return document.readyState")
+            return True
+        except Exception as e:
+            self.logger.error(f"Browser health check failed: {e}")
+            return False
+
+    def reset_session(self, blank_url="about:blank"):
+        """
+        Clear cookies and site data and leave the browser on a blank page, so the next
+        user of a reused browser starts from a clean session.
+        Through CDP, cookies of every domain and the storage (local storage, IndexedDB, caches,
+        service workers) of every origin loaded in the page's frames are cleared.
+        """
+        try:
+            if self.driver:
+                try:
+                    # CDP does not clear session storage, which is kept per tab
+                    self.driver.execute_script(
+                        "window.localStorage.clear(); window.sessionStorage.clear();")
+                except Exception:
+                    pass  # Pages such as about:blank have no storage
+                try:
+                    self.driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+                    for origin in self._frame_origins():
+                        self.driver.execute_cdp_cmd(
+                            "Storage.clearDataForOrigin", {"origin": origin, "storageTypes": "all"})
+                except Exception:
+                    self.driver.delete_all_cookies()
+                self.driver.get(blank_url)
+                self.logger.info("Browser session reset")
+        except Exception as e:
+            self.logger.error(f"Failed to reset browser session: {e}")
+            raise
+
+    def _frame_origins(self):
+        """Return the web origins of the current page and its frames."""
+        origins = []
+        frames = [self.driver.execute_cdp_cmd("Page.getFrameTree", {})["frameTree"]]
+        while frames:
+            tree = frames.pop()
+            origin = tree["frame"].get("securityOrigin", "")
+            # Opaque origins (about:blank, data: URLs) hold no site data
+            if origin.startswith(("http://", "https://")) and origin not in origins:
+                origins.append(origin)
+            frames.extend(tree.get("childFrames", ()))
+        return origins
+
     def stop_browser(self):
         if self.driver:
             self.driver.stop_client()
@@ -89,10 +183,18 @@ class BrowserService:
             self.logger.error(f"Failed to navigate to {url}: {e}")
             raise
 
-    def find_element(self, by: By, value: str):
+    def find_element(self, by: By, value: str, timeout=0):
+        """
+        Find an element. By default it is looked up once, so a missing element fails at once;
+        pass `timeout` to wait up to that many seconds for it to be present.
+        """
         try:
             if self.driver:
-                element = self.driver.find_element(by, value)
+                if timeout:
+                    element = self.waiter.until(
+                        EC.presence_of_element_located((by, value)), timeout, "find_element")
+                else:
+                    element = self.driver.find_element(by, value)
                 self.logger.info(f"Element found: {value}")
                 return element
         except Exception as e:
@@ -105,8 +207,8 @@ class BrowserService:
                 timeout = self.timeout
             self.logger.info(
                 f"Waiting for element to be clickable: {value} for up to {timeout} seconds")
-            element = WebDriverWait(self.driver, timeout).until(
-                EC.element_to_be_clickable((by, value)))
+            element = self.waiter.until(
+                EC.element_to_be_clickable((by, value)), timeout, "click_element")
             element.click()
             self.logger.info(f"Clicked element: {value}")
         except Exception as e:
@@ -119,8 +221,8 @@ class BrowserService:
                 timeout = self.timeout
             self.logger.info(
                 f"Waiting for element to be visible: {value} for up to {timeout} seconds")
-            element = WebDriverWait(self.driver, timeout).until(
-                EC.visibility_of_element_located((by, value)))
+            element = self.waiter.until(
+                EC.visibility_of_element_located((by, value)), timeout, "input_text")
             element.send_keys(text)
             self.logger.info(f"Input text '{text}' into element: {value}")
         except Exception as e:
@@ -134,14 +236,40 @@ class BrowserService:
                 timeout = self.timeout
             self.logger.info(
                 f"Waiting for URL to change from {current_url} for up to {timeout} seconds")
-            WebDriverWait(self.driver, timeout).until(
-                EC.url_changes(current_url))
+            self.waiter.until(
+                EC.url_changes(current_url), timeout, "wait_for_url_change")
             self.logger.info("URL changed successfully")
         except Exception as e:
             self.logger.error(
                 f"URL did not change within the timeout period: {e}")
             raise
 
+    def get_json_responses(self, url_pattern, timeout=None, count=1):
+        """
+        Wait for network responses whose URL matches `url_pattern` (a regular expression) and
+        return their decoded JSON bodies, skipping DOM parsing. Requires capture_network=True.
+
+        :param count: Number of matching JSON responses to wait for. Responses returned by an
+                      earlier call are not counted again.
+        :return: The decoded bodies, oldest first.
+        """
+        try:
+            if self.network is None:
+                raise RuntimeError(
+                    "Network capture is off; create BrowserService with capture_network=True")
+            if timeout is None:
+                timeout = self.timeout
+            self.logger.info(
+                f"Waiting for {count} JSON responses matching {url_pattern} for up to {timeout} seconds")
+            bodies = self.network.wait_for_json(url_pattern, timeout, count)
+            self.logger.info(
+                f"Captured {len(bodies)} JSON responses matching {url_pattern}")
+            return bodies
+        except Exception as e:
+            self.logger.error(
+                f"Failed to capture JSON responses matching {url_pattern}: {e}")
+            raise
+
     def get_cookies(self):
         try:
             if self.driver:
@@ -162,17 +290,15 @@ class BrowserService:
                 f"Waiting for element {value} to become {condition} for up to {timeout} seconds")
 
             if condition == "visible":
-                WebDriverWait(self.driver, timeout).until(
-                    EC.visibility_of_element_located((by, value)))
+                expected = EC.visibility_of_element_located((by, value))
             elif condition == "clickable":
-                WebDriverWait(self.driver, timeout).until(
-                    EC.element_to_be_clickable((by, value)))
+                expected = EC.element_to_be_clickable((by, value))
             elif condition == "present":
-                WebDriverWait(self.driver, timeout).until(
-                    EC.presence_of_element_located((by, value)))
+                expected = EC.presence_of_element_located((by, value))
             else:
                 self.logger.error(f"Invalid wait condition: {condition}")
                 raise ValueError("Invalid wait condition")
+            self.waiter.until(expected, timeout, f"wait_for_element:{condition}")
 
             self.logger.info(f"Element {value} is {condition} now")
         except Exception as e:
@@ -180,21 +306,34 @@ class BrowserService:
                 f"Failed to wait for element {value} to become {condition}: {e}")
             raise
 
-    def execute_script(self, script):
+    def execute_script(self, script, settle=True):
         """
         Executes JavaScript in the context of the current page.
-        
+
         :param script: The JavaScript code to execute.
-        :param args: Arguments to pass to the JavaScript code.
+        :param settle: Wait (up to `settle_timeout` seconds) until the requests and DOM updates
+                       the script triggered have finished, instead of sleeping a fixed time.
         :return: The result of the executed script.
         """
         try:
             if self.driver:
                 self.logger.info(f"Executing script: {script}")
                 result = self.driver.execute_script(script)
-                time.sleep(4)
+                if settle:
+                    self.wait_for_page_settled()
                 self.logger.info(f"Script executed successfully, result: {result}")
                 return result
         except Exception as e:
             self.logger.error(f"Failed to execute script: {script} - {e}")
-            raise
\ No newline at end of file
+            raise
+
+    def wait_for_page_settled(self, timeout=None, network_quiet_ms=500, dom_quiet_ms=300):
+        """
+        Wait until no XHR/fetch request is in flight and the DOM stopped changing.
+        A page that never settles is logged and left as is after `timeout` seconds.
+        :return: Whether the page settled.
+        """
+        if timeout is None:
+            timeout = self.settle_timeout
+        return self.waiter.until_quiet(
+            all_of(network_idle(network_quiet_ms), dom_settled(dom_quiet_ms)), timeout, "page_settled")
@@ -0,0 +1,210 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from .browser import BrowserService
+
+
+class _PooledBrowser:
+    __slots__ = ("browser", "uses", "leased_at")
+
+    def __init__(self, browser: BrowserService):
+        self.browser = browser
+        self.uses = 0
+        self.leased_at = None
+
+
+class BrowserPool:
+    def __init__(self, create_browser: Callable[[], BrowserService], logger, size=2, max_uses=50,
+                 lease_timeout=600, acquire_timeout=120, warm=True):
+        """
+        Keep up to `size` initialized browsers and lease them to scrapers.
+
+        :param create_browser: Returns a new BrowserService; the pool initializes it when needed.
+        :param logger: Logger instance, as passed to BrowserService.
+        :param size: Maximum number of browsers alive at the same time.
+        :param max_uses: Leases after which a browser is quit and replaced by a fresh one.
+        :param lease_timeout: Seconds a lease may last. Expired leases are reclaimed: the browser
+                              is quit and its slot given to the next caller.
+        :param acquire_timeout: Default seconds `acquire` waits for a free browser.
+        :param warm: Start all browsers now instead of on first use.
+        """
+        self.create_browser = create_browser
+        self.logger = logger
+        self.size = size
+        self.max_uses = max_uses
+        self.lease_timeout = lease_timeout
+        self.acquire_timeout = acquire_timeout
+        self._idle: List[_PooledBrowser] = []
+        self._leased: Dict[int, _PooledBrowser] = {}
+        self._count = 0  # Browsers alive or being started
+        self._closed = False
+        self._condition = threading.Condition()
+        if warm:
+            for _ in range(size):
+                try:
+                    self._idle.append(self._start())
+                except Exception:
+                    # Do not leak the browsers started before the failure
+                    for entry in self._idle:
+                        self._quit(entry)
+                    self._idle = []
+                    self._count = 0
+                    raise
+                self._count += 1
+        self.logger.info(f"Browser pool ready with {len(self._idle)} of {size} browsers")
+
+    def acquire(self, timeout=None) -> BrowserService:
+        """
+        Lease a healthy browser with a clean session, waiting up to `timeout` seconds.
+        Raises TimeoutError when none becomes free in time.
+        """
+        if timeout is None:
+            timeout = self.acquire_timeout
+        deadline = time.monotonic() + timeout
+        expired = []
+        try:
+            with self._condition:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("Browser pool is closed.")
+                    expired.extend(self._reap_expired_leases())
+                    if self._idle:
+                        entry = self._idle.pop()
+                        break
+                    if self._count < self.size:
+                        self._count += 1
+                        entry = None
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError(
+                            f"No browser became free within {timeout} seconds")
+                    # Wake up regularly to reclaim expired leases
+                    self._condition.wait(min(remaining, 1.0))
+        finally:
+            # Quitting can take seconds; other callers must not wait on the lock meanwhile
+            for expired_entry in expired:
+                self._quit(expired_entry)
+
+        try:
+            if entry is None:
+                entry = self._start()
+            elif entry.uses >= self.max_uses or not entry.browser.is_alive():
+                self.logger.info(
+                    f"Recycling browser after {entry.uses} uses")
+                self._quit(entry)
+                entry = self._start()
+        except Exception:
+            with self._condition:
+                self._count -= 1
+                self._condition.notify()
+            raise
+
+        entry.uses += 1
+        entry.leased_at = time.monotonic()
+        with self._condition:
+            self._leased[id(entry.browser)] = entry
+        return entry.browser
+
+    def release(self, browser: BrowserService, discard=False):
+        """
+        Return a leased browser. Its session is reset; browsers that fail the reset, whose lease
+        expired, or that are released with `discard=True` are quit instead of reused.
+        """
+        with self._condition:
+            entry = self._leased.pop(id(browser), None)
+        if entry is None:
+            # The lease expired and the browser was already reclaimed
+            return
+
+        keep = not discard and not self._closed \
+            and time.monotonic() - entry.leased_at <= self.lease_timeout
+        if keep:
+            try:
+                browser.reset_session()
+            except Exception:
+                keep = False
+        if not keep:
+            self._quit(entry)
+
+        with self._condition:
+            if keep and not self._closed:
+                self._idle.append(entry)
+            else:
+                self._count -= 1
+            self._condition.notify()
+
+    @contextmanager
+    def lease(self, timeout=None):
+        """
+        Lease a browser for the duration of the block. A browser whose block raised is discarded.
+        """
+        browser = self.acquire(timeout)
+        try:
+            yield browser
+        except Exception:
+            self.release(browser, discard=True)
+            raise
+        else:
+            self.release(browser)
+
+    def map(self, func: Callable[[BrowserService, Any], Any], items: Iterable[Any]) -> List[Any]:
+        """
+        Run `func(browser, item)` for every item, spread across the pool's browsers.
+        Results are returned in the order of `items`; the first exception is re-raised.
+        """
+        def run(item):
+            with self.lease() as browser:
+                return func(browser, item)
+
+        with ThreadPoolExecutor(max_workers=self.size, thread_name_prefix="BrowserPool") as executor:
+            return list(executor.map(run, items))
+
+    def close(self):
+        """Quit the idle browsers; leased browsers are quit when they are released."""
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._count -= len(idle)
+            self._condition.notify_all()
+        for entry in idle:
+            self._quit(entry)
+        self.logger.info("Browser pool closed")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _start(self) -> _PooledBrowser:
+        browser = self.create_browser()
+        if not browser.driver:
+            browser.initialize_browser()
+        return _PooledBrowser(browser)
+
+    def _quit(self, entry: _PooledBrowser):
+        try:
+            entry.browser.quit_browser()
+        except Exception as e:
+            self.logger.error(f"Failed to quit pooled browser: {e}")
+
+    def _reap_expired_leases(self) -> List[_PooledBrowser]:
+        """
+        Reclaim the slots of expired leases and return their entries; the caller quits them
+        once the lock is released. Called with the condition held.
+        """
+        now = time.monotonic()
+        expired = [
+            key for key, entry in self._leased.items()
+            if now - entry.leased_at > self.lease_timeout
+        ]
+        entries = []
+        for key in expired:
+            entries.append(self._leased.pop(key))
+            self._count -= 1
+            self.logger.error(
+                f"Browser lease expired after {self.lease_timeout} seconds; reclaiming it")
+        return entries
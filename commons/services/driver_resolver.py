@@ -0,0 +1,164 @@
+import json
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+from typing import Dict, Optional
+from commons.utils.logger import get_logger
+
+_VERSION = re.compile(r"(\d+(?:\.\d+){1,3})")
+_CHROME_BINARIES = ("google-chrome", "google-chrome-stable",
+                    "chromium", "chromium-browser", "chrome")
+DEFAULT_CACHE_DIR = os.path.join(
+    os.path.expanduser("~"), ".cache", "port-commons", "chromedriver")
+
+
+def _env_bool(name: str) -> bool:
+    return os.getenv(name, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def _binary_version(binary: str) -> Optional[str]:
+    try:
+        output = subprocess.run(
+            [binary, "--version"], capture_output=True, text=True, timeout=10).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    match = _VERSION.search(output)
+    return match.group(1) if match else None
+
+
+# Chrome versions detected in this process, keyed by the requested binary
+_chrome_versions: Dict[Optional[str], str] = {}
+
+
+def get_chrome_version(chrome_binary: Optional[str] = None) -> Optional[str]:
+    """
+    Return the installed Chrome version, or None when no Chrome binary is found.
+    A detected version is remembered for the rest of the process; Chrome is not upgraded
+    under a running scraper, and `--version` costs a subprocess per browser start.
+    """
+    version = _chrome_versions.get(chrome_binary)
+    if version:
+        return version
+    candidates = [chrome_binary] if chrome_binary else _CHROME_BINARIES
+    for candidate in candidates:
+        binary = shutil.which(candidate) or (
+            candidate if os.path.isfile(candidate) else None)
+        if binary:
+            version = _binary_version(binary)
+            if version:
+                _chrome_versions[chrome_binary] = version
+                return version
+    return None
+
+
+class ChromeDriverResolver:
+    # Paths resolved in this process, keyed by Chrome version
+    _resolved: Dict[str, str] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, logger=None, driver_path=None, cache_dir=None, driver_version=None,
+                 offline=None, chrome_binary=None):
+        """
+        Resolve the chromedriver executable once and cache the result on disk per Chrome version.
+
+        Every argument falls back to the environment:
+        CHROMEDRIVER_PATH (use this driver, skip resolution), CHROMEDRIVER_CACHE_DIR,
+        CHROMEDRIVER_VERSION (pin the driver version), CHROMEDRIVER_OFFLINE (only use the cache)
+        and CHROME_BINARY.
+        """
+        self.logger = logger or get_logger()
+        self.driver_path = driver_path or os.getenv("CHROMEDRIVER_PATH")
+        self.cache_dir = cache_dir or os.getenv(
+            "CHROMEDRIVER_CACHE_DIR", DEFAULT_CACHE_DIR)
+        self.driver_version = driver_version or os.getenv("CHROMEDRIVER_VERSION")
+        self.offline = _env_bool("CHROMEDRIVER_OFFLINE") if offline is None else offline
+        self.chrome_binary = chrome_binary or os.getenv("CHROME_BINARY")
+        # (source, seconds) of the last resolution, for startup instrumentation
+        self.last_resolution = None
+
+    @property
+    def cache_file(self):
+        return os.path.join(self.cache_dir, "drivers.json")
+
+    def resolve(self) -> str:
+        """
+        Return the chromedriver path: the configured path, else the cached one for the installed
+        Chrome version, else one installed by webdriver-manager (not in offline mode).
+        """
+        start = time.perf_counter()
+        if self.driver_path:
+            if not os.path.isfile(self.driver_path):
+                raise FileNotFoundError(
+                    f"Configured chromedriver not found: {self.driver_path}")
+            return self._resolved_from("config", self.driver_path, start)
+
+        chrome_version = get_chrome_version(self.chrome_binary)
+        if chrome_version is None:
+            # A driver cached without a Chrome version could belong to any Chrome
+            return self._resolve_uncached(start)
+
+        key = f"{chrome_version}|{self.driver_version or ''}"
+        with self._lock:
+            path = self._resolved.get(key)
+            if path and os.path.isfile(path):
+                return self._resolved_from("memory", path, start)
+
+            entry = self._read_cache().get(key)
+            if entry and os.path.isfile(entry["path"]):
+                self._resolved[key] = entry["path"]
+                return self._resolved_from("disk cache", entry["path"], start)
+
+            if self.offline:
+                raise RuntimeError(
+                    f"No cached chromedriver for Chrome {chrome_version} and offline mode is on. "
+                    "Set CHROMEDRIVER_PATH or resolve once with network access.")
+
+            from webdriver_manager.chrome import ChromeDriverManager
+            path = ChromeDriverManager(driver_version=self.driver_version).install()
+            self._write_cache(key, {
+                "path": path,
+                "chrome_version": chrome_version,
+                "driver_version": _binary_version(path),
+            })
+            self._resolved[key] = path
+            return self._resolved_from("webdriver-manager", path, start)
+
+    def _resolve_uncached(self, start) -> str:
+        self.logger.warning("Chrome version could not be detected; the chromedriver is not cached")
+        if self.offline:
+            raise RuntimeError(
+                "Chrome version could not be detected and offline mode is on. "
+                "Set CHROMEDRIVER_PATH or CHROME_BINARY.")
+        from webdriver_manager.chrome import ChromeDriverManager
+        path = ChromeDriverManager(driver_version=self.driver_version).install()
+        return self._resolved_from("webdriver-manager", path, start)
+
+    def _resolved_from(self, source, path, start):
+        elapsed = time.perf_counter() - start
+        self.last_resolution = (source, elapsed)
+        self.logger.info(
+            f"Resolved chromedriver {path} from {source} in {elapsed:.3f} seconds")
+        return path
+
+    def _read_cache(self) -> Dict[str, Dict[str, str]]:
+        try:
+            with open(self.cache_file) as cache:
+                return json.load(cache)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_cache(self, key, entry):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            cache = self._read_cache()
+            cache[key] = entry
+            temp_file = f"{self.cache_file}.{os.getpid()}.tmp"
+            with open(temp_file, "w") as handle:
+                json.dump(cache, handle, indent=2)
+            # Atomic, so concurrent runs never read a partial file
+            os.replace(temp_file, self.cache_file)
+        except OSError as e:
+            self.logger.error(f"Failed to cache chromedriver path: {e}")
@@ -0,0 +1,143 @@
+import csv
+import datetime
+import io
+import json
+import uuid
+from collections import OrderedDict
+from enum import Enum
+from typing import Any, Callable, Dict, List, Optional
+from sqlalchemy import JSON, Text, bindparam, cast, insert
+from sqlalchemy.orm import Session
+from commons.schemas.shipment_log import ShipmentLog
+from commons.services.writer import BatchWriter
+from commons.utils.date import get_current_datetime_in_est
+from commons.utils.logger import get_logger
+
+logger = get_logger()
+
+
+def _json_default(value: Any) -> Any:
+    # Types found in model columns that the json module does not know
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    raise TypeError(
+        f"Object of type {value.__class__.__name__} is not JSON serializable")
+
+
+# Built once and reused for every log: compact separators, model types handled by `_json_default`
+_ENCODER = json.JSONEncoder(default=_json_default, separators=(",", ":"))
+
+# Column order of the COPY statement
+_LOG_COLUMNS = ("log_id", "shipment_id", "scrape_status", "scraped_at", "new_data")
+
+# new_data arrives already encoded by `_ENCODER`; bind it as text and cast in SQL
+# so the JSON column type does not encode it a second time
+_INSERT_LOGS = insert(ShipmentLog.__table__).values(
+    new_data=cast(bindparam("new_data", type_=Text), JSON))
+
+
+class ShipmentLogWriter(BatchWriter):
+    def __init__(self, session_factory: Optional[Callable[[], Session]] = None, use_copy: bool = False,
+                 max_snapshots: int = 10000, **kwargs):
+        """
+        Record ShipmentLog entries on a background thread.
+        Each log stores only the fields that changed since the previous log of the same shipment
+        written by this writer; the first log of a shipment holds the full snapshot.
+        :param use_copy: Insert batches with PostgreSQL COPY instead of a multi-row INSERT.
+        :param max_snapshots: Number of shipments whose last snapshot is kept. The least recently
+                              logged shipment is dropped first; its next log holds the full snapshot.
+        """
+        if max_snapshots < 1:
+            raise ValueError("max_snapshots must be at least 1.")
+        self.use_copy = use_copy
+        self.max_snapshots = max_snapshots
+        # Last snapshot per shipment ID in least recently used order, only touched by the writer thread
+        self._previous: "OrderedDict[Any, Dict[str, Dict[str, Any]]]" = OrderedDict()
+        super().__init__(session_factory, **kwargs)
+
+    def submit(self, shipment: Any, container_availability: Any = None):
+        """
+        Queue a log of the shipment and its container availability.
+        The rows are copied now; diffing and encoding happen on the writer thread.
+        """
+        snapshot = {"shipment": shipment.to_dict()}
+        if container_availability is not None:
+            snapshot["container_availability"] = container_availability.to_dict()
+        scraped_at = shipment.last_scraped_time or get_current_datetime_in_est()
+        self.submit_item(
+            (shipment.shipment_id, shipment.scrape_status, scraped_at, snapshot))
+
+    def write_batch(self, session: Session, items: List[Any]) -> None:
+        rows = self._log_rows(items)
+        if self.use_copy:
+            self._copy(session, rows)
+        else:
+            session.execute(_INSERT_LOGS, rows)
+        session.commit()
+        logger.info(f"Wrote {len(rows)} shipment logs")
+
+    def _log_rows(self, items: List[Any]) -> List[Dict[str, Any]]:
+        rows = []
+        for shipment_id, scrape_status, scraped_at, snapshot in items:
+            previous = self._previous.get(shipment_id, {})
+            new_data = {}
+            for name, values in snapshot.items():
+                changes = self.diff(previous.get(name), values)
+                if changes:
+                    new_data[name] = changes
+            self._remember(shipment_id, snapshot)
+            rows.append({
+                "log_id": uuid.uuid4(),
+                "shipment_id": shipment_id,
+                "scrape_status": scrape_status,
+                "scraped_at": scraped_at,
+                "new_data": _ENCODER.encode(new_data),
+            })
+        return rows
+
+    def _remember(self, shipment_id: Any, snapshot: Dict[str, Dict[str, Any]]):
+        self._previous[shipment_id] = snapshot
+        self._previous.move_to_end(shipment_id)
+        while len(self._previous) > self.max_snapshots:
+            self._previous.popitem(last=False)
+
+    @staticmethod
+    def diff(previous: Optional[Dict[str, Any]], current: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Return the fields of `current` whose value differs from `previous`.
+        :param previous: The previous snapshot, or None to keep every field.
+        """
+        if previous is None:
+            return dict(current)
+        missing = object()
+        return {
+            key: value for key, value in current.items()
+            if previous.get(key, missing) != value
+        }
+
+    @staticmethod
+    def _copy(session: Session, rows: List[Dict[str, Any]]):
+        # Stream the batch as CSV; empty unquoted fields are read back as NULL
+        buffer = io.StringIO()
+        csv_writer = csv.writer(buffer)
+        for row in rows:
+            scrape_status = row["scrape_status"]
+            csv_writer.writerow([
+                row["log_id"],
+                row["shipment_id"],
+                scrape_status.name if scrape_status is not None else None,
+                row["scraped_at"].isoformat(),
+                row["new_data"],
+            ])
+        buffer.seek(0)
+        cursor = session.connection().connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY {ShipmentLog.__tablename__} ({', '.join(_LOG_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+                buffer)
+        finally:
+            cursor.close()
@@ -0,0 +1,143 @@
+import base64
+import json
+import re
+from typing import Any, Dict, List, Optional, Pattern, Tuple, Union
+
+# Chrome writes DevTools events to the performance log when this capability is set
+PERFORMANCE_LOGGING = {"performance": "ALL"}
+
+
+# Stands for a response whose body could not be read or decoded as JSON
+_NOT_JSON = object()
+
+
+class NetworkCapture:
+    def __init__(self, driver, waiter, logger):
+        """
+        Collect network responses from Chrome's performance log and decode their JSON bodies.
+        The log is drained on every read, so one NetworkCapture should own it per browser.
+        Bodies are fetched through CDP and are only available while the page that made the
+        requests is loaded: read them before navigating away. Responses of previous pages
+        are forgotten when the main frame navigates.
+
+        A response is returned by `get_json` and `wait_for_json` only once, so repeated waits
+        for the same URL count only the responses that arrived since.
+        """
+        self.driver = driver
+        self.waiter = waiter
+        self.logger = logger
+        # requestId -> {"url", "status", "mime_type", "loader_id", "finished", "consumed"},
+        # plus "json" once the body was decoded
+        self._responses: Dict[str, Dict[str, Any]] = {}
+
+    @staticmethod
+    def enable_logging(options):
+        """Turn on the performance log in Chrome options; required before the browser starts."""
+        options.set_capability("goog:loggingPrefs", PERFORMANCE_LOGGING)
+
+    def clear(self):
+        """Forget every response seen so far, e.g. before triggering the request of interest."""
+        self._drain()
+        self._responses.clear()
+
+    def responses(self, url_pattern: Union[str, Pattern], finished_only=True) -> List[Dict[str, Any]]:
+        """
+        Return the responses not yet returned as JSON whose URL matches `url_pattern`
+        (a regular expression), oldest first.
+        """
+        self._drain()
+        pattern = re.compile(url_pattern) if isinstance(url_pattern, str) else url_pattern
+        return [
+            dict(response, request_id=request_id)
+            for request_id, response in self._responses.items()
+            if not response["consumed"] and pattern.search(response["url"])
+            and (response["finished"] or not finished_only)
+        ]
+
+    def get_json(self, url_pattern: Union[str, Pattern]) -> List[Any]:
+        """
+        Return the decoded JSON bodies of the finished responses matching `url_pattern`, which
+        later calls then skip. Bodies that are not JSON are logged and skipped.
+        """
+        bodies = []
+        for request_id, body in self._json_responses(url_pattern):
+            self._responses[request_id]["consumed"] = True
+            bodies.append(body)
+        return bodies
+
+    def wait_for_json(self, url_pattern: Union[str, Pattern], timeout=None, count=1) -> List[Any]:
+        """
+        Wait until at least `count` new responses matching `url_pattern` finished loading with
+        a JSON body, then return those bodies. Raises selenium's TimeoutException otherwise.
+        """
+        self.waiter.until(
+            lambda driver: len(self._json_responses(url_pattern)) >= count, timeout, "wait_for_json")
+        return self.get_json(url_pattern)
+
+    def _json_responses(self, url_pattern) -> List[Tuple[str, Any]]:
+        # Each body is fetched and decoded once, then kept with its response
+        decoded = []
+        for response in self.responses(url_pattern):
+            stored = self._responses[response["request_id"]]
+            if "json" not in stored:
+                stored["json"] = self._decode(response)
+            if stored["json"] is not _NOT_JSON:
+                decoded.append((response["request_id"], stored["json"]))
+        return decoded
+
+    def _decode(self, response) -> Any:
+        body = self._body(response)
+        if body is None:
+            return _NOT_JSON
+        try:
+            return json.loads(body)
+        except ValueError:
+            self.logger.error(f"Response from {response['url']} is not JSON")
+            return _NOT_JSON
+
+    def _body(self, response) -> Optional[str]:
+        try:
+            result = self.driver.execute_cdp_cmd(
+                "Network.getResponseBody", {"requestId": response["request_id"]})
+        except Exception as e:
+            self.logger.error(
+                f"Failed to read response body from {response['url']}: {e}")
+            return None
+        body = result.get("body", "")
+        if result.get("base64Encoded"):
+            body = base64.b64decode(body).decode("utf-8", errors="replace")
+        return body
+
+    def _drain(self):
+        for entry in self.driver.get_log("performance"):
+            try:
+                message = json.loads(entry["message"])["message"]
+            except (KeyError, ValueError):
+                continue
+            method = message.get("method")
+            params = message.get("params", {})
+            if method == "Network.responseReceived":
+                response = params.get("response", {})
+                self._responses[params["requestId"]] = {
+                    "url": response.get("url", ""),
+                    "status": response.get("status"),
+                    "mime_type": response.get("mimeType"),
+                    "loader_id": params.get("loaderId"),
+                    "finished": False,
+                    "consumed": False,
+                }
+            elif method == "Page.frameNavigated":
+                frame = params.get("frame", {})
+                if not frame.get("parentId"):
+                    self._prune(frame.get("loaderId"))
+            elif method == "Network.loadingFinished":
+                response = self._responses.get(params.get("requestId"))
+                if response is not None:
+                    response["finished"] = True
+
+    def _prune(self, loader_id):
+        # The main frame loaded a new document; bodies of the previous ones are gone
+        self._responses = {
+            request_id: response for request_id, response in self._responses.items()
+            if response["loader_id"] == loader_id
+        }
@@ -0,0 +1,111 @@
+import os
+from typing import Dict, List, Sequence
+
+# File extensions per resource type
+RESOURCE_EXTENSIONS: Dict[str, Sequence[str]] = {
+    "image": ("png", "jpg", "jpeg", "gif", "webp", "svg", "ico", "bmp"),
+    "font": ("woff", "woff2", "ttf", "otf", "eot"),
+    "stylesheet": ("css",),
+    "media": ("mp4", "webm", "ogg", "mp3", "wav"),
+}
+
+# URL patterns (Network.setBlockedURLs wildcards) per resource type. Each extension is matched
+# at the end of the URL and before a query string, as in cache-busted 'logo.png?v=3'
+RESOURCE_PATTERNS: Dict[str, Sequence[str]] = {
+    resource_type: tuple(
+        pattern for extension in extensions for pattern in (f"*.{extension}", f"*.{extension}?*"))
+    for resource_type, extensions in RESOURCE_EXTENSIONS.items()
+}
+
+# Analytics and tracking hosts commonly embedded in terminal portals
+TRACKER_PATTERNS: Sequence[str] = (
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*facebook.net*", "*hotjar.com*", "*clarity.ms*", "*newrelic.com*", "*nr-data.net*",
+    "*segment.io*", "*mixpanel.com*",
+)
+
+
+class ScrapeProfile:
+    def __init__(self, name, page_load_strategy=None, block_resource_types=(), block_url_patterns=(),
+                 block_trackers=False, disable_images=False):
+        """
+        How much of a page the browser loads.
+        :param page_load_strategy: 'normal', 'eager' (stop at DOMContentLoaded) or 'none'.
+                                   With 'eager' and 'none', scrapers must wait explicitly for their data.
+                                   None leaves the strategy of the Chrome options as it is.
+        :param block_resource_types: Keys of RESOURCE_PATTERNS blocked through CDP.
+        :param block_url_patterns: Extra URL patterns to block, with '*' wildcards.
+        :param block_trackers: Also block TRACKER_PATTERNS.
+        :param disable_images: Turn off image loading in Chrome's settings.
+        """
+        if page_load_strategy not in (None, "normal", "eager", "none"):
+            raise ValueError(f"Invalid page load strategy: {page_load_strategy}")
+        unknown = set(block_resource_types) - set(RESOURCE_PATTERNS)
+        if unknown:
+            raise ValueError(f"Unknown resource types: {sorted(unknown)}")
+        self.name = name
+        self.page_load_strategy = page_load_strategy
+        self.block_resource_types = tuple(block_resource_types)
+        self.block_url_patterns = tuple(block_url_patterns)
+        self.block_trackers = block_trackers
+        self.disable_images = disable_images
+
+    def blocked_urls(self) -> List[str]:
+        patterns = []
+        for resource_type in self.block_resource_types:
+            patterns.extend(RESOURCE_PATTERNS[resource_type])
+        if self.block_trackers:
+            patterns.extend(TRACKER_PATTERNS)
+        patterns.extend(self.block_url_patterns)
+        return list(dict.fromkeys(patterns))
+
+    def apply_options(self, options):
+        """Apply the launch-time settings to Chrome options."""
+        if self.page_load_strategy is not None:
+            options.page_load_strategy = self.page_load_strategy
+        if self.disable_images:
+            options.add_argument('--blink-settings=imagesEnabled=false')
+            prefs = dict(options.experimental_options.get("prefs", {}))
+            prefs["profile.managed_default_content_settings.images"] = 2
+            options.add_experimental_option("prefs", prefs)
+
+    def apply_driver(self, driver):
+        """Apply the runtime settings (URL blocking) to a started browser."""
+        blocked = self.blocked_urls()
+        if blocked:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": blocked})
+
+    def __repr__(self):
+        return (f"<ScrapeProfile(name='{self.name}', page_load_strategy={self.page_load_strategy!r}, "
+                f"blocked={len(self.blocked_urls())})>")
+
+
+PROFILES: Dict[str, ScrapeProfile] = {
+    # Chrome's defaults: everything is loaded
+    "default": ScrapeProfile("default"),
+    # Layout still renders, so visibility and clickability checks behave as before
+    "light": ScrapeProfile(
+        "light", page_load_strategy="eager", block_resource_types=("image", "font", "media"),
+        block_trackers=True, disable_images=True),
+    # Data-only pages driven by explicit waits or captured responses
+    "minimal": ScrapeProfile(
+        "minimal", page_load_strategy="none",
+        block_resource_types=("image", "font", "stylesheet", "media"),
+        block_trackers=True, disable_images=True),
+}
+
+
+def get_scrape_profile(profile=None) -> ScrapeProfile:
+    """
+    Return a ScrapeProfile given as an instance or a PROFILES name.
+    Without one, SCRAPE_PROFILE from the environment selects it, else 'default'.
+    """
+    if isinstance(profile, ScrapeProfile):
+        return profile
+    name = profile or os.getenv("SCRAPE_PROFILE") or "default"
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown scrape profile '{name}'. Available: {sorted(PROFILES)}")
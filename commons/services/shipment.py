@@ -1,14 +1,23 @@
-from typing import Dict, Any, List, Optional
-from commons.repository import BaseRepository
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+from contextlib import contextmanager
+from itertools import islice
+from commons.repository import BaseRepository, UnitOfWork
+from commons.services.log_writer import ShipmentLogWriter
+from commons.services.writer import WriteBehindWriter
 from commons.utils.logger import get_logger
+from sqlalchemy import inspect
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from ..rules.catalog.claim_shipments_rule import ClaimShipmentsRule
 from ..rules.catalog.set_status_in_active_rule import SetActiveStatusRule
 from ..rules.catalog.set_status_in_failed_rule import SetFailedStatusRule
 from ..rules.catalog.set_status_in_progress_rule import SetInProgressStatusRule
 # Assuming ScrapeStatus is in commons.enums
 from commons.enums import ScrapeStatus
+from commons.utils.date import get_current_datetime_in_est
 from ..schemas.shipment_log import ShipmentLog
 import datetime
+import time
 from enum import Enum
 import uuid
 
@@ -17,11 +26,58 @@ logger = get_logger()
 
 
 class ShipmentService:
-    def __init__(self, session: Session, shipment_repo: BaseRepository, container_repo: Optional[BaseRepository] = None, shipment_log_repo: Optional[BaseRepository] = None):
+    # Status rules are stateless, so one instance of each is shared by every call
+    IN_PROGRESS_RULE = SetInProgressStatusRule()
+    FAILED_RULE = SetFailedStatusRule()
+    ACTIVE_RULE = SetActiveStatusRule()
+
+    def __init__(self, session: Session, shipment_repo: BaseRepository, container_repo: Optional[BaseRepository] = None, shipment_log_repo: Optional[BaseRepository] = None, writer: Optional[WriteBehindWriter] = None, log_writer: Optional[ShipmentLogWriter] = None):
+        """
+        :param writer: Optional write-behind writer. When set, `process` and `process_active`
+                       queue their results on it instead of writing them synchronously.
+        :param log_writer: Optional ShipmentLog writer. When set, every status change is recorded
+                           in shipment_logs off the hot path.
+        """
         self.session = session
         self.shipment_repo = shipment_repo
         self.container_repo = container_repo
         self.shipment_log_repo = shipment_log_repo
+        self.writer = writer
+        self.log_writer = log_writer
+        # Stored containers of the current batch keyed by (shipment_id, container_number),
+        # filled by `preload_containers`
+        self.container_index: Optional[Dict[Tuple[Any, Any], Any]] = None
+        self.preloaded_shipment_ids: Set[Any] = set()
+
+    @contextmanager
+    def batch(self, size: int = 500):
+        """
+        Defer commits of shipment and container writes and commit them once per `size` entities.
+        A failing chunk is rolled back on its own; the shipments it contained are logged on exit
+        and can be read with `failed_shipment_ids`.
+        """
+        with self.shipment_repo.batch(size) as unit_of_work:
+            try:
+                yield unit_of_work
+            finally:
+                failed_ids = self.failed_shipment_ids(unit_of_work)
+                if failed_ids:
+                    logger.error(
+                        f"{len(failed_ids)} shipments were in rolled back chunks: {failed_ids}")
+
+    def failed_shipment_ids(self, unit_of_work: UnitOfWork) -> List[Any]:
+        """
+        Return the IDs of the shipments whose writes were part of a rolled back chunk.
+        """
+        failed_ids = {}
+        for entity in unit_of_work.failed_entities():
+            if isinstance(entity, dict):
+                shipment_id = entity.get('shipment_id')
+            else:
+                shipment_id = getattr(entity, 'shipment_id', None)
+            if shipment_id is not None:
+                failed_ids[shipment_id] = None
+        return list(failed_ids)
 
     def get_model_data(self, model):
         data = {k: v for k, v in model.__dict__.items() if not k.startswith('_')}
@@ -62,7 +118,19 @@ class ShipmentService:
 
         self.shipment_log_repo.save(shipment_log)
 
-    def process(self, context: Dict[str, Any], rules: Optional[List[Any]] = []):
+    def _record_log(self, shipment, container_availability=None):
+        """
+        Queue a ShipmentLog entry when a log writer is configured. Logging never fails the caller.
+        """
+        if self.log_writer is None:
+            return
+        try:
+            self.log_writer.submit(shipment, container_availability)
+        except Exception as e:
+            logger.error(
+                f"Failed to queue shipment log for shipment ID {shipment.shipment_id}: {str(e)}", exc_info=True)
+
+    def process(self, context: Dict[str, Any], rules: Optional[Sequence[Any]] = None):
         shipment = context.get('shipment')
         container_availability = context.get('container_availability')
 
@@ -72,7 +140,7 @@ class ShipmentService:
             shipment.run_id = logger_instance.run_id
 
             # Apply any business rules
-            for rule in rules:
+            for rule in rules or ():
                 rule.apply(context)
 
             # Check if the status is still 'IN_PROGRESS'
@@ -82,18 +150,10 @@ class ShipmentService:
                 logger.info(
                     f"Setting shipment ID {shipment.shipment_id} to ACTIVE after successful processing")
 
-            # Create ShipmentLog entry
-            # self.create_shipment_log(shipment, container_availability)
-
-            # Save the updated shipment status
-            self.shipment_repo.save_or_update(
-                shipment, "shipment_id", shipment.shipment_id)
+            self._save_result(shipment, container_availability)
 
-            # If container availability data is present, save it
-            if container_availability and self.container_repo:
-                container_availability.shipment_id = shipment.shipment_id
-                self.container_repo.save_or_update(
-                    container_availability, "container_number", container_availability.container_number)
+            # Create ShipmentLog entry once the result is saved
+            self._record_log(shipment, container_availability)
 
         except Exception as e:
             logger.error(
@@ -101,22 +161,110 @@ class ShipmentService:
             shipment.scrape_status = ScrapeStatus.FAILED
             self.shipment_repo.save_or_update(
                 shipment, "shipment_id", shipment.shipment_id)
-            # Create ShipmentLog entry
-            # self.create_shipment_log(shipment, container_availability)
+            # Only the FAILED outcome is logged; the failed save above never was
+            self._record_log(shipment, container_availability)
             raise
 
-    def process_in_progress(self, context: Dict[str, Any], rules: Optional[List[Any]] = []):
+    def _save_result(self, shipment, container_availability=None):
         """
-        Mark a shipment as 'IN_PROGRESS' and apply any associated rules.
+        Save a processed shipment and its container availability, or hand them to the
+        write-behind writer when one is configured.
         """
-        shipment = context.get('shipment')
+        if self.writer is not None:
+            self.writer.submit(shipment, container_availability)
+            return
+
+        # Save the updated shipment
+        self.shipment_repo.save_or_update(
+            shipment, "shipment_id", shipment.shipment_id)
 
+        # Save container availability if present
+        if container_availability and self.container_repo:
+            container_availability.shipment_id = shipment.shipment_id
+            self._save_container(container_availability)
+
+    def preload_containers(self, shipments: Iterable[Any]) -> Dict[Tuple[Any, Any], Any]:
+        """
+        Load the stored containers of a batch of shipments with one query, so container saves
+        resolve against the in-memory index instead of selecting row by row.
+        Containers of shipments outside the batch are still looked up on their composite key.
+        The index replaces the previous one; call `clear_container_index` when the batch is done.
+        """
+        shipment_ids = [shipment.shipment_id for shipment in shipments]
+        containers = self.container_repo.get_all_by_field_in(
+            "shipment_id", shipment_ids)
+        self.container_index = {
+            (container.shipment_id, container.container_number): container
+            for container in containers
+        }
+        self.preloaded_shipment_ids = set(shipment_ids)
+        logger.info(
+            f"Preloaded {len(self.container_index)} containers for {len(shipment_ids)} shipments")
+        return self.container_index
+
+    def clear_container_index(self):
+        self.container_index = None
+        self.preloaded_shipment_ids = set()
+
+    def _indexed_container(self, key: Tuple[Any, Any]) -> Any:
+        """
+        Return the indexed container of `key`, dropping it when its insert was rolled back
+        elsewhere: a rollback expunges the rows inserted in its transaction.
+        """
+        container = self.container_index.get(key)
+        if container is not None and not inspect(container).persistent:
+            del self.container_index[key]
+            return None
+        return container
+
+    def _save_container(self, container_availability):
+        """
+        Save a container availability on its composite key (shipment_id, container_number),
+        writing only last_seen_at when its content is unchanged.
+        """
+        container_availability.refresh_content_hash()
+        key = (container_availability.shipment_id,
+               container_availability.container_number)
+        if self.container_index is None or key[0] not in self.preloaded_shipment_ids:
+            self.container_repo.save_or_touch(
+                container_availability,
+                {"shipment_id": key[0], "container_number": key[1]},
+                "content_hash", ("last_seen_at",))
+            return
         try:
+            self.container_index[key] = self.container_repo.save_or_touch(
+                container_availability, None, "content_hash", ("last_seen_at",),
+                existing_entity=self._indexed_container(key))
+        except Exception:
+            self._prune_container_index()
+            raise
+
+    def _prune_container_index(self):
+        # The failed save rolled back its chunk; drop the inserts made in it
+        self.container_index = {
+            key: container for key, container in self.container_index.items()
+            if inspect(container).persistent
+        }
+
+    @staticmethod
+    def _pipeline(rules: Optional[Sequence[Any]], status_rule: Any) -> Tuple[Any, ...]:
+        """
+        Build the rule pipeline for one call: caller rules followed by the status rule.
+        A new tuple is returned each time, so neither the caller's list nor any default grows.
+        """
+        if not rules:
+            return (status_rule,)
+        return (*rules, status_rule)
 
-            rules.append(SetInProgressStatusRule())
+    def process_in_progress(self, context: Dict[str, Any], rules: Optional[Sequence[Any]] = None):
+        """
+        Mark a shipment as 'IN_PROGRESS' and apply any associated rules.
+        """
+        shipment = context.get('shipment')
 
-            # Apply rules
-            for rule in rules:
+        try:
+            # Apply caller rules, then the status rule
+            for rule in self._pipeline(rules, self.IN_PROGRESS_RULE):
                 rule.apply(context)
 
             # Set scrape status to IN_PROGRESS
@@ -127,25 +275,22 @@ class ShipmentService:
                 shipment, "shipment_id", shipment.shipment_id)
 
             # Create ShipmentLog entry
-            # self.create_shipment_log(shipment)
+            self._record_log(shipment)
 
         except Exception as e:
             logger.error(
                 f"Error processing in-progress shipment ID {shipment.shipment_id}: {str(e)}")
             raise
 
-    def process_failed(self, context: Dict[str, Any], rules: Optional[List[Any]] = []):
+    def process_failed(self, context: Dict[str, Any], rules: Optional[Sequence[Any]] = None):
         """
         Mark a shipment as 'FAILED' and apply any associated rules.
         """
         shipment = context.get('shipment')
 
         try:
-
-            rules.append(SetFailedStatusRule())
-
-            # Apply rules
-            for rule in rules:
+            # Apply caller rules, then the status rule
+            for rule in self._pipeline(rules, self.FAILED_RULE):
                 rule.apply(context)
 
             # Set scrape status to FAILED
@@ -155,13 +300,13 @@ class ShipmentService:
             self.shipment_repo.save_or_update(
                 shipment, "shipment_id", shipment.shipment_id)
             # Create ShipmentLog entry
-            # self.create_shipment_log(shipment)
+            self._record_log(shipment)
         except Exception as e:
             logger.error(
                 f"Error processing failed shipment ID {shipment.shipment_id}: {str(e)}")
             raise
 
-    def process_active(self, context: Dict[str, Any], rules: Optional[List[Any]] = []):
+    def process_active(self, context: Dict[str, Any], rules: Optional[Sequence[Any]] = None):
         """
         Process a shipment and optionally container availability, marking them as 'ACTIVE' before applying rules.
         """
@@ -169,35 +314,24 @@ class ShipmentService:
         container_availability = context.get('container_availability')
 
         try:
-
-            rules.append(SetActiveStatusRule())
-
-            # Apply rules
-            for rule in rules:
+            # Apply caller rules, then the status rule
+            for rule in self._pipeline(rules, self.ACTIVE_RULE):
                 rule.apply(context)
 
             # Set scrape status to ACTIVE
             shipment.scrape_status = ScrapeStatus.ACTIVE
 
-            # Create ShipmentLog entry
-            # self.create_shipment_log(shipment, container_availability)
-
-            # Save the updated shipment
-            self.shipment_repo.save_or_update(
-                shipment, "shipment_id", shipment.shipment_id)
+            self._save_result(shipment, container_availability)
 
-            # Save container availability if present
-            if container_availability and self.container_repo:
-                container_availability.shipment_id = shipment.shipment_id
-                self.container_repo.save_or_update(
-                    container_availability, "container_number", container_availability.container_number)
+            # Create ShipmentLog entry once the result is saved
+            self._record_log(shipment, container_availability)
 
         except Exception as e:
             logger.error(
                 f"Error processing active shipment ID {shipment.shipment_id}: {str(e)}")
             raise
 
-    def process_stopped(self, context: Dict[str, Any], rules: Optional[List[Any]] = []):
+    def process_stopped(self, context: Dict[str, Any], rules: Optional[Sequence[Any]] = None):
         """
         Process a shipment marked as 'STOPPED'. This method can be extended with custom logic.
         """
@@ -212,7 +346,7 @@ class ShipmentService:
                 shipment, "shipment_id", shipment.shipment_id)
 
             # Create ShipmentLog entry
-            # self.create_shipment_log(shipment)
+            self._record_log(shipment)
             
 
             logger.info(
@@ -225,27 +359,154 @@ class ShipmentService:
 
     def mark_shipments_in_progress(self, shipments):
         """
-        Mark shipments in progress.
+        Mark shipments in progress with a single set-based UPDATE, claiming them for this run.
+        Shipments under a live claim of another run are left to it and skipped; the others
+        that could not be claimed fall back to the FAILED path.
+        Returns the shipments that were claimed. The claims are leases: consume them with
+        `iter_claimed_shipments` (as `iter_shipments_in_progress` does) or renew them with
+        ClaimShipmentsRule.renew_claims when processing may outlast the lease.
         """
-        for shipment in shipments:
-            try:
-                logger.info(
-                    f"Marking shipment ID {shipment.shipment_id} and container {shipment.container_number} 'In Progress'")
-                context = {"shipment": shipment}
-                self.process_in_progress(context)
+        shipments = list(shipments)
+        if not shipments:
+            return []
+
+        # Without a frequency there is no next scrape time to schedule
+        unscheduled = [shipment for shipment in shipments if shipment.frequency is None]
+        schedulable = [shipment for shipment in shipments if shipment.frequency is not None]
+        for shipment in unscheduled:
+            error_message = "Shipment has no scrape frequency"
+            logger.error(
+                f"Failed to update status to 'In Progress' for shipment ID {shipment.shipment_id} : {error_message}")
+            self.process_failed({"shipment": shipment, "error_message": error_message})
+
+        current_time = get_current_datetime_in_est()
+        values = SetInProgressStatusRule.column_values(self.shipment_repo.model, current_time)
+        criteria = (ClaimShipmentsRule.claim_available(
+            logger.run_id, ClaimShipmentsRule.get_stale_before({}, current_time)),)
+        claimed_shipments, unclaimed, error_message = self._update_status_many(
+            schedulable, values, criteria)
+
+        if error_message is None:
+            # The UPDATE ran: the rows it skipped are claimed by another run
+            if unclaimed:
                 logger.info(
-                    f"Updated status to 'In Progress' for shipment ID {shipment.shipment_id}")
-            except Exception as e:
+                    f"Skipped {len(unclaimed)} shipments claimed by another run")
+        else:
+            for shipment in unclaimed:
                 logger.error(
-                    f"Failed to update status to 'In Progress' for shipment ID {shipment.shipment_id} : {str(e)}", exc_info=True)
-                context = {"shipment": shipment, "error_message": str(e)}
+                    f"Failed to update status to 'In Progress' for shipment ID {shipment.shipment_id} : {error_message}")
+                context = {"shipment": shipment, "error_message": error_message}
                 self.process_failed(context)
 
+        logger.info(
+            f"Updated status to 'In Progress' for {len(claimed_shipments)} of {len(shipments)} shipments")
+        return claimed_shipments
+
+    def _update_status_many(self, shipments: List[Any], values: Dict[str, Any], criteria: Sequence[Any] = ()):
+        """
+        Apply a status rule's column values to all shipments with one UPDATE ... RETURNING.
+        Every column is returned and set on the shipments, so the commit that expires them
+        does not cost a SELECT per shipment afterwards.
+        Returns the updated shipments, the ones that were not updated (failing `criteria` or
+        missing), and the error if the statement failed.
+        """
+        if not shipments:
+            return [], [], None
+        # Read before the UPDATE commits (or fails and rolls back) and expires the shipments
+        shipment_ids = [shipment.shipment_id for shipment in shipments]
+        returning = self._returned_columns()
+        try:
+            rows = self.shipment_repo.bulk_update_by_ids(
+                "shipment_id", shipment_ids, values, returning, criteria)
+            error_message = None
+        except Exception as e:
+            logger.error(
+                f"Failed to update status for {len(shipments)} shipments: {str(e)}", exc_info=True)
+            rows = []
+            error_message = str(e)
+
+        updated_rows = {row[0]: row for row in rows}
+        updated, not_updated = [], []
+        for shipment, shipment_id in zip(shipments, shipment_ids):
+            row = updated_rows.get(shipment_id)
+            if row is None:
+                not_updated.append(shipment)
+                continue
+            # The session synchronizes the shipments it holds; this also covers detached ones
+            for key, value in zip(returning, row[1:]):
+                set_committed_value(shipment, key, value)
+            updated.append(shipment)
+            self._record_log(shipment)
+        return updated, not_updated, error_message
+
+    def _returned_columns(self) -> Tuple[str, ...]:
+        return tuple(
+            attr.key for attr in inspect(self.shipment_repo.model).column_attrs
+            if attr.key != "shipment_id")
+
+    def iter_shipments_in_progress(self, shipments: Iterable[Any], chunk_size: int = 500,
+                                   renew_interval: Optional[float] = None) -> Iterator[Any]:
+        """
+        Consume `shipments` (for example the generator of StreamShipmentsRule) in chunks,
+        mark each chunk in progress and yield the shipments that were claimed.
+        The stored containers of each chunk are preloaded into `container_index`, and the
+        claims are renewed while the chunk is processed (see `iter_claimed_shipments`).
+        Only one chunk is held in memory at a time.
+        """
+        iterator = iter(shipments)
+        while True:
+            chunk = list(islice(iterator, chunk_size))
+            if not chunk:
+                self.clear_container_index()
+                return
+            claimed = self.mark_shipments_in_progress(chunk)
+            if self.container_repo is not None and claimed:
+                self.preload_containers(claimed)
+            yield from self.iter_claimed_shipments(claimed, renew_interval)
+
+    def iter_claimed_shipments(self, shipments: Iterable[Any],
+                               renew_interval: Optional[float] = None) -> Iterator[Any]:
+        """
+        Yield shipments claimed by this run, renewing the claims of those not yet yielded
+        every `renew_interval` seconds (default: a third of the claim lease), so a long batch
+        keeps its tail. Shipments whose claim another run took over meanwhile are skipped.
+        Suits the shipments of `mark_shipments_in_progress` and ClaimShipmentsRule.
+        """
+        shipments = list(shipments)
+        if renew_interval is None:
+            renew_interval = ClaimShipmentsRule.get_claim_lease_minutes({}) * 60 / 3
+        # Read now: renewing commits the session, which expires the shipments
+        shipment_ids = [shipment.shipment_id for shipment in shipments]
+        lost = set()
+        renewed_at = time.monotonic()
+        for index, (shipment, shipment_id) in enumerate(zip(shipments, shipment_ids)):
+            if time.monotonic() - renewed_at >= renew_interval:
+                remaining = shipment_ids[index:]
+                renewed = set(ClaimShipmentsRule.renew_claims(self.session, remaining))
+                lost.update(set(remaining) - renewed)
+                renewed_at = time.monotonic()
+            if shipment_id in lost:
+                logger.error(
+                    f"Skipping shipment ID {shipment_id}: its claim was taken over by another run")
+                continue
+            yield shipment
+
     def mark_shipments_in_error(self, shipments, error_message):
         """
-        Log errors for each shipment in the current batch.
+        Mark every shipment of the current batch FAILED with a single set-based UPDATE.
+        Shipments the statement could not update fall back to the per-shipment FAILED path.
         """
-        for shipment in shipments:
+        shipments = list(shipments)
+        if not shipments:
+            return
+
+        values = SetFailedStatusRule.column_values(
+            self.shipment_repo.model, get_current_datetime_in_est(), error_message)
+        failed_shipments, remaining, _ = self._update_status_many(shipments, values)
+        logger.info(
+            f"Set status to FAILED for {len(failed_shipments)} of {len(shipments)} shipments")
+
+        for shipment in remaining:
             try:
                 context = {"shipment": shipment,
                            "error_message": error_message}
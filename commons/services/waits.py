@@ -0,0 +1,164 @@
+import time
+from typing import Any, Callable, Optional
+from selenium.common.exceptions import JavascriptException, StaleElementReferenceException, TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait
+
+# Instruments the page: counts in-flight and completed XHR/fetch requests and records the time
+# of the last network activity and DOM mutation. Installed on every new document through CDP,
+# or injected on demand by the conditions below.
+TRACKER_SCRIPT = """
+(function () {
+    if (window.__pcTracker) { return; }
+    var tracker = window.__pcTracker = {
+        inflight: 0, completed: 0, lastNetwork: Date.now(), lastMutation: Date.now()
+    };
+    function started() { tracker.inflight++; tracker.lastNetwork = Date.now(); }
+    function finished() {
+        tracker.inflight = Math.max(0, tracker.inflight - 1);
+        tracker.completed++;
+        tracker.lastNetwork = Date.now();
+    }
+    var send = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        started();
+        this.addEventListener('loadend', finished);
+        return send.apply(this, arguments);
+    };
+    if (window.fetch) {
+        var fetch = window.fetch;
+        window.fetch = function () {
+            started();
+            return fetch.apply(this, arguments).finally(finished);
+        };
+    }
+    function observe() {
+        new MutationObserver(function () { tracker.lastMutation = Date.now(); })
+            .observe(document.documentElement, {childList: true, subtree: true, attributes: true, characterData: true});
+    }
+    if (document.documentElement) { observe(); } else { document.addEventListener('DOMContentLoaded', observe); }
+})();
+"""
+
+_TRACKER_STATE = """
+var tracker = window.__pcTracker;
+if (!tracker) { return null; }
+return {inflight: tracker.inflight, completed: tracker.completed,
+        network_quiet: Date.now() - tracker.lastNetwork, dom_quiet: Date.now() - tracker.lastMutation};
+"""
+
+
+def install_tracker(driver) -> bool:
+    """
+    Install the request/mutation tracker on every document the browser loads from now on,
+    and on the current one. Returns False when CDP is unavailable (the conditions then inject
+    the tracker on first use).
+    """
+    try:
+        driver.execute_cdp_cmd(
+            "Page.addScriptToEvaluateOnNewDocument", {"source": TRACKER_SCRIPT})
+        driver.execute_script(TRACKER_SCRIPT)
+        return True
+    except Exception:
+        return False
+
+
+def _tracker_state(driver):
+    state = driver.execute_script(_TRACKER_STATE)
+    if state is None:
+        # Tracking starts now; the condition is re-evaluated on the next poll
+        driver.execute_script(TRACKER_SCRIPT)
+    return state
+
+
+def document_ready():
+    """The document and its subresources finished loading."""
+    def condition(driver):
+        return driver.execute_script("return document.readyState") == "complete"
+    return condition
+
+
+def network_idle(quiet_ms: int = 500):
+    """No XHR/fetch request is in flight and none started or ended for `quiet_ms`."""
+    def condition(driver):
+        state = _tracker_state(driver)
+        return state is not None and state["inflight"] == 0 and state["network_quiet"] >= quiet_ms
+    return condition
+
+
+def dom_settled(quiet_ms: int = 300):
+    """The DOM has not changed for `quiet_ms`."""
+    def condition(driver):
+        state = _tracker_state(driver)
+        return state is not None and state["dom_quiet"] >= quiet_ms
+    return condition
+
+
+def xhr_count_at_least(count: int):
+    """At least `count` XHR/fetch requests completed since the tracker was installed."""
+    def condition(driver):
+        state = _tracker_state(driver)
+        return state is not None and state["completed"] >= count
+    return condition
+
+
+def all_of(*conditions):
+    """Every condition holds on the same poll."""
+    def condition(driver):
+        return all(check(driver) for check in conditions)
+    return condition
+
+
+class Waiter:
+    def __init__(self, driver, timeout=60, poll_interval=0.1,
+                 metrics_hook: Optional[Callable[[str, float, bool], None]] = None, logger=None):
+        """
+        Explicit waits with a shared poll interval. Every wait reports its name, actual duration
+        in seconds and whether it succeeded to `metrics_hook`.
+        """
+        self.driver = driver
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.metrics_hook = metrics_hook
+        self.logger = logger
+
+    def until(self, condition: Callable[[Any], Any], timeout=None, name="wait"):
+        """
+        Poll `condition(driver)` until it returns a truthy value, which is returned.
+        Raises selenium's TimeoutException after `timeout` seconds.
+        """
+        if timeout is None:
+            timeout = self.timeout
+        start = time.perf_counter()
+        succeeded = False
+        try:
+            # Scripts may fail while the page navigates; such polls count as not ready yet
+            result = WebDriverWait(
+                self.driver, timeout, poll_frequency=self.poll_interval,
+                ignored_exceptions=(JavascriptException, StaleElementReferenceException)).until(condition)
+            succeeded = True
+            return result
+        finally:
+            self._report(name, time.perf_counter() - start, succeeded)
+
+    def until_quiet(self, condition: Callable[[Any], Any], timeout=None, name="wait"):
+        """
+        Like `until`, but a timeout is logged and reported instead of raised; returns whether
+        the condition was met. Suits best-effort settling after an action.
+        """
+        try:
+            self.until(condition, timeout, name)
+            return True
+        except TimeoutException:
+            if self.logger:
+                self.logger.warning(
+                    f"{name} not reached within {self.timeout if timeout is None else timeout} seconds")
+            return False
+
+    def _report(self, name, seconds, succeeded):
+        if self.metrics_hook is None:
+            return
+        try:
+            self.metrics_hook(name, seconds, succeeded)
+        except Exception as e:
+            if self.logger:
+                self.logger.error(f"Wait metrics hook failed: {e}")
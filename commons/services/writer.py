@@ -0,0 +1,190 @@
+import atexit
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional
+from sqlalchemy.inspection import inspect
+from sqlalchemy.orm import Session, object_session
+from commons.repository import BaseRepository
+from commons.schemas.shipment import ContainerAvailability, Shipment
+from commons.utils.date import get_current_timestamp_in_est
+from commons.utils.logger import get_logger
+
+logger = get_logger()
+
+# Tells the writer thread to drain the queue and stop
+_STOP = object()
+
+
+class BatchWriter(ABC):
+    def __init__(self, session_factory: Optional[Callable[[], Session]] = None, max_queue_size: int = 10000,
+                 batch_size: int = 500, flush_interval: float = 1.0, put_timeout: Optional[float] = None):
+        """
+        Write items on a background thread, coalescing them into batches.
+        :param session_factory: Creates the writer thread's own session. Defaults to commons.database.
+        :param max_queue_size: Bound of the queue; `submit` blocks when it is full (backpressure).
+        :param batch_size: Maximum number of items written per batch.
+        :param flush_interval: Seconds to wait for a batch to fill before writing what is there.
+        :param put_timeout: Seconds `submit` may block before raising queue.Full. None blocks forever.
+        """
+        if session_factory is None:
+            from commons.database import get_session_factory
+            session_factory = get_session_factory()
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.failed: List[Any] = []  # Items whose batch could not be written
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name=self.__class__.__name__, daemon=True)
+        self._thread.start()
+        # Results still queued at interpreter shutdown are flushed
+        atexit.register(self.close)
+
+    def submit_item(self, item: Any):
+        """Queue an item for writing, blocking while the queue is full."""
+        if self._closed:
+            raise RuntimeError(f"{self.__class__.__name__} is closed.")
+        self._queue.put(item, timeout=self.put_timeout)
+
+    def flush(self):
+        """Block until every item submitted so far has been written (or recorded as failed)."""
+        self._queue.join()
+
+    def close(self, timeout: Optional[float] = None):
+        """Flush the remaining items and stop the writer thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        atexit.unregister(self.close)
+        if self.failed:
+            logger.error(
+                f"{self.__class__.__name__} stopped with {len(self.failed)} unwritten items")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @abstractmethod
+    def write_batch(self, session: Session, items: List[Any]) -> None:
+        """Persist one batch of items with the writer thread's session."""
+
+    def _run(self):
+        session = self.session_factory()
+        try:
+            stopping = False
+            while not stopping:
+                batch, stopping = self._next_batch()
+                if batch:
+                    self._write(session, batch)
+        finally:
+            session.close()
+
+    def _next_batch(self):
+        # Block for the first item, then take whatever arrives until the batch is full or the interval ends
+        batch = []
+        item = self._queue.get()
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            if item is _STOP:
+                self._queue.task_done()
+                return batch, True
+            batch.append(item)
+            remaining = deadline - time.monotonic()
+            if len(batch) >= self.batch_size or remaining <= 0:
+                return batch, False
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                return batch, False
+
+    def _write(self, session: Session, batch: List[Any]):
+        try:
+            self.write_batch(session, batch)
+        except Exception as e:
+            session.rollback()
+            self.failed.extend(batch)
+            logger.error(
+                f"{self.__class__.__name__} failed to write a batch of {len(batch)} items: {str(e)}", exc_info=True)
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+
+class WriteBehindWriter(BatchWriter):
+    def __init__(self, session_factory: Optional[Callable[[], Session]] = None, shipment_model: Any = Shipment,
+                 container_model: Any = ContainerAvailability, **kwargs):
+        """
+        Persist scraped (shipment, container_availability) results off the scraping thread.
+        Results are snapshotted to plain rows on submit and written with batched upserts.
+        Shipments are written as the columns that changed, stamped with updated_at to the
+        microsecond, and never overwrite a row another writer changed after the submit (e.g. a
+        later FAILED status), even within the same second.
+        """
+        self.shipment_model = shipment_model
+        self.container_model = container_model
+        super().__init__(session_factory, **kwargs)
+
+    def submit(self, shipment: Any, container_availability: Any = None):
+        """
+        Queue a processed shipment and its container availability for writing.
+        The rows are copied now and the objects are expunged from their session, which would
+        otherwise write the same changes again. They may keep changing after this call.
+        """
+        shipment_row = self._changed_row(shipment)
+        shipment_row["shipment_id"] = shipment.shipment_id
+        shipment_row["updated_at"] = get_current_timestamp_in_est()
+        container_row = None
+        if container_availability is not None:
+            container_availability.shipment_id = shipment.shipment_id
+            container_availability.refresh_content_hash()
+            container_row = container_availability.to_dict()
+        for entity in (shipment, container_availability):
+            session = object_session(entity) if entity is not None else None
+            if session is not None:
+                session.expunge(entity)
+        self.submit_item((shipment_row, container_row))
+
+    @staticmethod
+    def _changed_row(entity: Any) -> Dict[str, Any]:
+        # Stored rows: the columns changed since they were loaded; new rows: the columns assigned
+        state = inspect(entity)
+        columns = [attr.key for attr in state.mapper.column_attrs]
+        if state.key is None:
+            return {key: state.dict[key] for key in columns if key in state.dict}
+        return {
+            key: getattr(entity, key) for key in columns
+            if state.attrs[key].history.has_changes()
+        }
+
+    def write_batch(self, session: Session, items: List[Any]) -> None:
+        """Write the batch in one transaction."""
+        # Several submits of one shipment merge, later changes winning
+        shipment_rows: Dict[Any, Dict[str, Any]] = {}
+        for shipment_row, _ in items:
+            shipment_rows.setdefault(shipment_row["shipment_id"], {}).update(shipment_row)
+        container_rows = [
+            container_row for _, container_row in items if container_row is not None]
+
+        # Only changed columns are present, so None values (e.g. a cleared error) are written as-is
+        _, statements = BaseRepository._upsert_statements(
+            self.shipment_model, list(shipment_rows.values()), ["shipment_id"], None, False,
+            self.batch_size, guard_column="updated_at")
+        if container_rows:
+            # Containers whose content hash is unchanged only get last_seen_at updated
+            _, container_statements = BaseRepository._upsert_statements(
+                self.container_model, container_rows, ["shipment_id", "container_number"], None, True,
+                self.batch_size, change_column="content_hash", touch_columns=("last_seen_at",))
+            statements.extend(container_statements)
+        for stmt in statements:
+            session.execute(stmt)
+        session.commit()
+        logger.info(
+            f"Wrote {len(shipment_rows)} shipments and {len(container_rows)} containers")
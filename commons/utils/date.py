@@ -10,3 +10,8 @@ def get_current_datetime_in_est():
     naive_datetime_without_microseconds = current_time_est.replace(
         tzinfo=None, microsecond=0)
     return naive_datetime_without_microseconds
+
+
+def get_current_timestamp_in_est():
+    """Get the current datetime in EST without timezone info, keeping microseconds to order writes within a second."""
+    return datetime.now(ZoneInfo("America/New_York")).replace(tzinfo=None)
@@ -0,0 +1,85 @@
+import os
+import sys
+import uuid
+import pytest
+
+# Make `commons` importable when pytest runs from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from commons.utils.logger import get_logger  # noqa: E402
+
+# Modules call get_logger() at import time, which needs a first named initialization
+get_logger("tests")
+
+# Register every model so relationships resolve
+import commons.schemas.shipment  # noqa: E402,F401
+import commons.schemas.shipment_log  # noqa: E402,F401
+
+
+@pytest.fixture
+def session():
+    from tests.sqlite import make_session
+    session = make_session()
+    yield session
+    session.close()
+    session.get_bind().dispose()
+
+
+# Scaled benchmarks are opt-in: they take minutes and their timings vary between machines
+BENCHMARKS_ENV = "RUN_BENCHMARKS"
+# PostgreSQL tests run against this database (a throwaway schema is created per test)
+POSTGRES_ENV = "TEST_DATABASE_URL"
+
+_benchmark_results = []
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", f"benchmark: scaled benchmark, run only when {BENCHMARKS_ENV}=1")
+
+
+def pytest_collection_modifyitems(config, items):
+    if os.getenv(BENCHMARKS_ENV):
+        return
+    skip = pytest.mark.skip(reason=f"set {BENCHMARKS_ENV}=1 to run benchmarks")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
+
+
+def pytest_terminal_summary(terminalreporter):
+    if _benchmark_results:
+        terminalreporter.section("benchmarks")
+        for line in _benchmark_results:
+            terminalreporter.write_line(line)
+
+
+@pytest.fixture
+def benchmark_report():
+    """Record a benchmark result line, shown in the terminal summary."""
+    return _benchmark_results.append
+
+
+@pytest.fixture
+def pg_session():
+    """A session on TEST_DATABASE_URL whose tables live in a schema dropped afterwards."""
+    database_url = os.getenv(POSTGRES_ENV)
+    if not database_url:
+        pytest.skip(f"set {POSTGRES_ENV} to run PostgreSQL tests")
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.orm import sessionmaker
+    from commons.schemas.base import Base
+
+    schema = f"test_{uuid.uuid4().hex}"
+    engine = create_engine(database_url, connect_args={"options": f"-c search_path={schema}"})
+    with engine.begin() as connection:
+        connection.execute(text(f"CREATE SCHEMA {schema}"))
+        Base.metadata.create_all(connection)
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        with engine.begin() as connection:
+            connection.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+        engine.dispose()
@@ -0,0 +1,28 @@
+from sqlalchemy import Column, DateTime, Integer, String, create_engine, event
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+Base = declarative_base()
+
+
+class Item(Base):
+    __tablename__ = "items"
+    item_id = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False)
+    updated_at = Column(DateTime)
+
+
+def make_session():
+    """Return a session on a fresh in-memory SQLite database holding the test tables."""
+    engine = create_engine("sqlite://")
+
+    # pysqlite's own transaction handling breaks SAVEPOINT; let SQLAlchemy emit BEGIN
+    @event.listens_for(engine, "connect")
+    def connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def begin(connection):
+        connection.exec_driver_sql("BEGIN")
+
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)()
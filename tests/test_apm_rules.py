@@ -0,0 +1,57 @@
+import itertools
+import pandas as pd
+import pytest
+from commons.rules.catalog.apm_rules import APMRules
+
+MISSING = object()
+DATES = [MISSING, None, "", "2025-01-01", "2025-01-02"]
+OUTPUTS = ["demurrage_amount", "holds", "yard_terminal_release_status", "transit_state"]
+
+
+def make_row(**values):
+    return {key: value for key, value in values.items() if value is not MISSING}
+
+
+DEMURRAGE_ROWS = [
+    make_row(LocalDateTime=local, GoodThru=good_thru, GateOutDate=gate_out)
+    for local, good_thru, gate_out in itertools.product(DATES, DATES, [MISSING, None, "", "2025-01-03"])
+]
+STATUS_ROWS = [
+    make_row(Freight=freight, Customs=customs, Hold=hold, YardLocation=yard, VesselEta=eta)
+    for freight, customs, hold, yard, eta in itertools.product(
+        [MISSING, None, "HOLD", "RELEASED"], [MISSING, None, "HOLD"], [MISSING, None, "HOLD"],
+        [MISSING, None, "", "B12"], [MISSING, None, "2025-01-05"])
+]
+
+
+def process_rows(rows, mapped_rows):
+    results = []
+    for row, mapped in zip(rows, mapped_rows):
+        mapped = dict(mapped)
+        APMRules(json_data=row, mapped_data=mapped).process()
+        results.append(mapped)
+    return results
+
+
+def process_many_rows(rows, mapped_rows):
+    frame = pd.DataFrame(mapped_rows, dtype=object)
+    APMRules.process_many(rows, frame)
+    return frame.to_dict("records")
+
+
+@pytest.mark.parametrize("rows", [DEMURRAGE_ROWS, STATUS_ROWS], ids=["demurrage", "status"])
+@pytest.mark.parametrize("transit_state", [None, "mapped"])
+def test_process_many_matches_process(rows, transit_state):
+    mapped_rows = [{"container_number": str(i), "transit_state": transit_state} for i in range(len(rows))]
+    expected = process_rows(rows, mapped_rows)
+    actual = process_many_rows(rows, mapped_rows)
+    for row, single, batch in zip(rows, expected, actual):
+        assert {key: batch[key] for key in OUTPUTS} == {key: single[key] for key in OUTPUTS}, row
+
+
+def test_null_local_date_time_is_treated_as_missing():
+    row = {"LocalDateTime": None, "GoodThru": "2025-01-01"}
+    mapped = {}
+    APMRules(json_data=row, mapped_data=mapped).process()
+    assert mapped["demurrage_amount"] == "NO"
+    assert process_many_rows([row], [{"transit_state": None}])[0]["demurrage_amount"] == "NO"
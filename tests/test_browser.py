@@ -0,0 +1,57 @@
+from unittest import mock
+from commons.services.browser import BrowserService
+
+
+def make_browser():
+    browser = BrowserService(None, None, mock.MagicMock())
+    browser.driver = mock.MagicMock()
+    return browser
+
+
+def test_reset_session_clears_every_frame_origin_through_cdp():
+    browser = make_browser()
+    frame_tree = {"frameTree": {
+        "frame": {"securityOrigin": "https://portal.example.com"},
+        "childFrames": [
+            {"frame": {"securityOrigin": "https://auth.example.com"}},
+            {"frame": {"securityOrigin": "://"}},
+        ],
+    }}
+    browser.driver.execute_cdp_cmd.side_effect = \
+        lambda command, params: frame_tree if command == "Page.getFrameTree" else {}
+
+    browser.reset_session()
+
+    commands = [call.args for call in browser.driver.execute_cdp_cmd.call_args_list]
+    assert ("Network.clearBrowserCookies", {}) in commands
+    cleared = [params["origin"] for command, params in commands if command == "Storage.clearDataForOrigin"]
+    assert sorted(cleared) == ["https://auth.example.com", "https://portal.example.com"]
+    browser.driver.delete_all_cookies.assert_not_called()
+    browser.driver.get.assert_called_once_with("about:blank")
+
+
+def test_reset_session_falls_back_without_cdp():
+    browser = make_browser()
+    browser.driver.execute_cdp_cmd.side_effect = RuntimeError("CDP unavailable")
+
+    browser.reset_session()
+
+    browser.driver.delete_all_cookies.assert_called_once()
+    browser.driver.get.assert_called_once_with("about:blank")
+
+
+def test_find_element_looks_up_once_by_default():
+    browser = make_browser()
+    with mock.patch("commons.services.browser.Waiter") as waiter:
+        element = browser.find_element("id", "missing-or-not")
+    assert element is browser.driver.find_element.return_value
+    waiter.return_value.until.assert_not_called()
+
+
+def test_waiter_is_created_for_an_attached_driver():
+    browser = make_browser()
+    waiter = browser.waiter
+    assert waiter.driver is browser.driver and waiter.timeout == browser.timeout
+    assert browser.waiter is waiter
+    browser.driver = mock.MagicMock()
+    assert browser.waiter.driver is browser.driver
@@ -0,0 +1,112 @@
+import threading
+import time
+from unittest import mock
+import pytest
+from commons.services.browser import BrowserService
+from commons.services.browser_pool import BrowserPool
+from commons.services.driver_resolver import get_chrome_version
+from commons.utils.logger import get_logger
+
+
+class FakeBrowser:
+    def __init__(self, on_quit=None):
+        self.driver = object()
+        self.quit = False
+        self.resets = 0
+        self.on_quit = on_quit
+
+    def is_alive(self):
+        return not self.quit
+
+    def reset_session(self):
+        self.resets += 1
+
+    def quit_browser(self):
+        if self.on_quit:
+            self.on_quit()
+        self.quit = True
+
+
+def make_pool(create_browser=FakeBrowser, **kwargs):
+    return BrowserPool(create_browser, mock.MagicMock(), **kwargs)
+
+
+def test_released_browsers_are_reset_and_reused():
+    pool = make_pool(size=1)
+    with pool.lease() as browser:
+        pass
+    assert browser.resets == 1
+    with pool.lease() as reused:
+        assert reused is browser
+
+
+def test_browsers_are_recycled_after_max_uses():
+    pool = make_pool(size=1, max_uses=1)
+    with pool.lease() as first:
+        pass
+    with pool.lease() as second:
+        assert second is not first
+    assert first.quit
+
+
+def test_failed_warm_startup_quits_the_started_browsers():
+    started = []
+
+    def create_browser():
+        if len(started) == 2:
+            raise RuntimeError("Chrome did not start")
+        started.append(FakeBrowser())
+        return started[-1]
+
+    with pytest.raises(RuntimeError):
+        make_pool(create_browser, size=3)
+    assert [browser.quit for browser in started] == [True, True]
+
+
+def test_expired_leases_are_quit_outside_the_lock():
+    pool = make_pool(size=1, lease_timeout=0.01, warm=False)
+    held = []
+
+    def take_lock():
+        acquired = pool._condition.acquire(timeout=1)
+        held.append(acquired)
+        if acquired:
+            pool._condition.release()
+
+    def on_quit():
+        # Another caller can take the lock while the expired browser quits
+        taker = threading.Thread(target=take_lock)
+        taker.start()
+        taker.join()
+
+    expired = pool.acquire()
+    expired.on_quit = on_quit
+    time.sleep(0.02)
+
+    reclaimed = pool.acquire(timeout=1)
+    assert expired.quit and held == [True]
+    assert reclaimed is not expired
+    # The late release of the reclaimed lease is ignored
+    pool.release(expired)
+    assert pool._count == 1
+
+
+def test_acquire_times_out_when_every_browser_is_leased():
+    pool = make_pool(size=1)
+    pool.acquire()
+    with pytest.raises(TimeoutError):
+        pool.acquire(timeout=0.05)
+
+
+@pytest.mark.skipif(get_chrome_version() is None, reason="Chrome is not installed")
+def test_pool_with_chrome_resets_the_session():
+    def create_browser():
+        return BrowserService(None, None, get_logger())
+
+    with BrowserPool(create_browser, get_logger(), size=1) as pool:
+        with pool.lease() as browser:
+            browser.navigate_to_url("data:text/html,<p>pooled</p>")
+            assert browser.is_alive()
+        with pool.lease() as reused:
+            assert reused is browser
+            assert reused.driver.current_url == "about:blank"
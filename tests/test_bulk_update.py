@@ -0,0 +1,70 @@
+import uuid
+from unittest import mock
+from sqlalchemy import event
+from commons.enums import ScrapeStatus
+from commons.repository import BaseRepository
+from commons.rules.catalog.set_status_in_progress_rule import SetInProgressStatusRule
+from commons.schemas.shipment import Shipment
+from commons.services.shipment import ShipmentService
+from tests.sqlite import Item
+
+IN_PROGRESS_VALUES = SetInProgressStatusRule.column_values
+
+
+def test_pending_changes_are_flushed_and_loaded_rows_synchronized(session):
+    repo = BaseRepository(session, Item)
+    session.add_all([Item(item_id=1, name="a"), Item(item_id=2, name="b")])
+    session.commit()
+
+    item = session.get(Item, 1)
+    item.name = "renamed"  # Not flushed yet
+    rows = repo.bulk_update_by_ids("item_id", [1, 2], {"name": Item.name + "!"}, ("name",))
+
+    assert sorted(rows) == [(1, "renamed!"), (2, "b!")]
+    assert item.name == "renamed!"
+    assert session.get(Item, 2).name == "b!"
+
+
+def test_shipments_without_frequency_fail_with_an_accurate_message():
+    repo = mock.MagicMock()
+    repo.model = Shipment
+    repo.bulk_update_by_ids.return_value = []
+    service = ShipmentService(mock.MagicMock(), repo)
+    shipment = Shipment(shipment_id=uuid.uuid4(), frequency=None,
+                        scrape_status=ScrapeStatus.IN_PROGRESS)
+
+    assert service.mark_shipments_in_progress([shipment]) == []
+
+    repo.bulk_update_by_ids.assert_not_called()
+    assert shipment.scrape_status == ScrapeStatus.FAILED
+    assert shipment.error == "Shipment has no scrape frequency"
+    assert shipment.next_scrape_time is None
+    repo.save_or_update.assert_called_once_with(shipment, "shipment_id", shipment.shipment_id)
+
+
+def sqlite_in_progress_values(model, current_time, claimed_by=None):
+    # SQLite has no INTERVAL arithmetic; the statement shape is otherwise the same
+    values = IN_PROGRESS_VALUES(model, current_time, claimed_by)
+    values["next_scrape_time"] = current_time
+    return values
+
+
+def test_marking_in_progress_sends_one_statement(session):
+    Shipment.__table__.create(session.get_bind())
+    session.add_all(Shipment(shipment_id=uuid.uuid4(), terminal_id="T1", frequency=4,
+                             scrape_status=ScrapeStatus.ACTIVE) for _ in range(50))
+    session.commit()
+    shipments = session.query(Shipment).all()
+    service = ShipmentService(session, BaseRepository(session, Shipment))
+    statements = []
+    event.listen(session.get_bind(), "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statement != "BEGIN" and statements.append(statement))
+
+    with mock.patch.object(SetInProgressStatusRule, "column_values", side_effect=sqlite_in_progress_values):
+        claimed = service.mark_shipments_in_progress(shipments)
+    # The claimed shipments are complete without reloading them
+    assert {(shipment.terminal_id, shipment.scrape_status) for shipment in claimed} == \
+        {("T1", ScrapeStatus.IN_PROGRESS)}
+
+    assert len(claimed) == 50
+    assert [statement.split()[0] for statement in statements] == ["UPDATE"]
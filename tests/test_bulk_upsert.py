@@ -0,0 +1,129 @@
+import time
+import uuid
+import pytest
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql
+from commons.enums import ScrapeStatus
+from commons.repository import BaseRepository
+from commons.schemas.shipment import ContainerAvailability, Shipment
+
+
+def compile_pg(stmt):
+    return stmt.compile(dialect=postgresql.dialect())
+
+
+def test_enum_columns_are_not_compared_with_blank():
+    _, statements = BaseRepository._upsert_statements(
+        Shipment, [{"shipment_id": uuid.uuid4(), "scrape_status": ScrapeStatus.ACTIVE}],
+        ["shipment_id"], None, True, 1000)
+    sql = str(compile_pg(statements[0]))
+    assert "scrape_status = coalesce(excluded.scrape_status, shipments.scrape_status)" in sql
+    assert "nullif(excluded.scrape_status" not in sql
+
+
+def test_python_defaults_apply_to_unset_columns():
+    _, statements = BaseRepository._upsert_statements(
+        Shipment, [Shipment(container_number="MSCU1234567", scrape_status=ScrapeStatus.ACTIVE)],
+        ["shipment_id"], None, True, 1000)
+    compiled = compile_pg(statements[0])
+    assert isinstance(compiled.params["shipment_id_m0"], uuid.UUID)
+    assert compiled.params["frequency_m0"] == 4
+    assert compiled.params["submitted_at_m0"] is not None
+    assert compiled.params["next_scrape_time_m0"] is not None
+
+
+def test_unset_columns_keep_stored_values_on_conflict():
+    _, statements = BaseRepository._upsert_statements(
+        Shipment, [{"shipment_id": uuid.uuid4(), "error": "timeout"}],
+        ["shipment_id"], None, True, 1000)
+    sql = str(compile_pg(statements[0]))
+    set_clause = sql.split("DO UPDATE SET", 1)[1]
+    assert "error =" in set_clause
+    assert "frequency" not in set_clause
+    assert "submitted_at" not in set_clause
+
+
+def test_rows_with_different_columns_go_to_separate_statements():
+    count, statements = BaseRepository._upsert_statements(
+        Shipment,
+        [{"shipment_id": uuid.uuid4(), "error": "a"},
+         {"shipment_id": uuid.uuid4(), "error": "b", "frequency": 8},
+         {"shipment_id": uuid.uuid4(), "error": "c"}],
+        ["shipment_id"], None, True, 1000)
+    assert count == 3
+    assert len(statements) == 2
+
+
+def test_duplicate_conflict_keys_keep_last_row():
+    shipment_id = uuid.uuid4()
+    count, statements = BaseRepository._upsert_statements(
+        ContainerAvailability,
+        [{"shipment_id": shipment_id, "container_number": "C1", "available": "NO"},
+         {"shipment_id": shipment_id, "container_number": "C1", "available": "YES"}],
+        ["shipment_id", "container_number"], None, True, 1000)
+    assert count == 1
+    assert compile_pg(statements[0]).params["available_m0"] == "YES"
+
+
+SHIPMENT_ID = uuid.uuid4()
+
+
+def container_rows(count, available="YES"):
+    # Every column is set: SQLite has no DEFAULT keyword in VALUES
+    rows = []
+    for index in range(count):
+        row = {column.name: None for column in ContainerAvailability.__table__.columns}
+        row.update(shipment_id=SHIPMENT_ID, container_number=f"C{index:07d}", port="NJ",
+                   terminal="APM", available=available, additional_info={"index": index})
+        rows.append(row)
+    return rows
+
+
+def stored_rows(session):
+    session.expire_all()
+    return sorted((row.container_number, row.available, row.additional_info["index"])
+                  for row in session.query(ContainerAvailability))
+
+
+def compare_paths(session, count):
+    """Write `count` new rows and then update them, once per path; return both statement counts."""
+    ContainerAvailability.__table__.create(session.get_bind())
+    repository = BaseRepository(session, ContainerAvailability)
+    statements = []
+    event.listen(session.get_bind(), "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statement != "BEGIN" and statements.append(statement))
+    timings = {}
+
+    start = time.perf_counter()
+    for available in ("NO", "YES"):
+        assert repository.bulk_upsert(container_rows(count, available), ["shipment_id", "container_number"]) == count
+    timings["bulk_upsert"] = (time.perf_counter() - start, len(statements))
+    bulk_rows = stored_rows(session)
+
+    session.query(ContainerAvailability).delete()
+    session.commit()
+    statements.clear()
+    start = time.perf_counter()
+    for available in ("NO", "YES"):
+        for row in container_rows(count, available):
+            repository.save_or_update(
+                ContainerAvailability(**row), "container_number", row["container_number"])
+    timings["save_or_update"] = (time.perf_counter() - start, len(statements))
+
+    assert stored_rows(session) == bulk_rows
+    assert [available for _, available, _ in bulk_rows] == ["YES"] * count
+    return timings
+
+
+def test_bulk_upsert_matches_row_by_row_with_fewer_statements(session):
+    timings = compare_paths(session, 1000)
+    # One INSERT ... ON CONFLICT per 1000 rows and call, against a SELECT and a write per row
+    assert timings["bulk_upsert"][1] == 2
+    assert timings["save_or_update"][1] >= 2 * 2 * 1000
+
+
+@pytest.mark.benchmark
+def test_bulk_upsert_10k_rows_benchmark(session, benchmark_report):
+    timings = compare_paths(session, 10000)
+    for path, (seconds, statements) in timings.items():
+        benchmark_report(f"{path}: 10k inserts + 10k updates in {seconds:.2f}s, {statements} statements")
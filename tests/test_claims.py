@@ -0,0 +1,140 @@
+import asyncio
+import datetime
+import uuid
+from unittest import mock
+from sqlalchemy.dialects import postgresql
+from commons.rules.catalog.claim_shipments_rule import ClaimShipmentsRule
+from commons.rules.catalog.fetch_shipments_rule import CLAIM_LEASE_MINUTES, FetchShipmentsRule
+from commons.rules.catalog.set_status_in_progress_rule import SetInProgressStatusRule
+from commons.enums import ScrapeStatus
+from commons.repository import BaseRepository
+from commons.schemas.shipment import Shipment
+from commons.services.async_shipment import AsyncShipmentService
+from commons.services.shipment import ShipmentService
+from commons.utils.date import get_current_datetime_in_est
+from commons.utils.logger import get_logger
+
+NOW = datetime.datetime(2025, 2, 3, 12, 0)
+
+
+def compile_pg(clause):
+    return str(clause.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+def test_stale_claims_are_detected_by_lease_time():
+    sql = compile_pg(FetchShipmentsRule.eligibility_filter("T1", NOW, NOW))
+    assert "shipments.claimed_at <= " in sql
+
+
+def test_lease_timeout_is_configurable(monkeypatch):
+    assert FetchShipmentsRule.get_stale_before({}, NOW) == NOW - datetime.timedelta(minutes=CLAIM_LEASE_MINUTES)
+    monkeypatch.setenv("CLAIM_LEASE_MINUTES", "5")
+    assert FetchShipmentsRule.get_stale_before({}, NOW) == NOW - datetime.timedelta(minutes=5)
+    assert FetchShipmentsRule.get_stale_before({"claim_lease_minutes": 1}, NOW) == NOW - datetime.timedelta(minutes=1)
+
+
+def test_claims_record_the_lease():
+    run_id = uuid.uuid4()
+    values = SetInProgressStatusRule.column_values(Shipment, NOW, run_id)
+    assert values["claimed_at"] == NOW
+    assert values["claimed_by"] == run_id
+
+
+def test_renewal_only_extends_claims_held_by_the_run():
+    session = mock.MagicMock()
+    shipment_ids = [uuid.uuid4(), uuid.uuid4()]
+    session.scalars.return_value.all.return_value = shipment_ids[:1]
+    run_id = uuid.uuid4()
+
+    assert ClaimShipmentsRule.renew_claims(session, shipment_ids, run_id) == shipment_ids[:1]
+
+    sql = compile_pg(session.scalars.call_args.args[0])
+    assert "SET claimed_at=" in sql
+    assert f"shipments.claimed_by = '{run_id}'" in sql
+    assert "shipments.scrape_status = 'IN_PROGRESS'" in sql
+    session.commit.assert_called_once()
+
+
+IN_PROGRESS_VALUES = SetInProgressStatusRule.column_values
+
+
+def sqlite_in_progress_values(model, current_time, claimed_by=None):
+    # SQLite has no INTERVAL arithmetic; the statement shape is otherwise the same
+    values = IN_PROGRESS_VALUES(model, current_time, claimed_by)
+    values["next_scrape_time"] = current_time
+    return values
+
+
+def stored_shipments(session, **claims):
+    Shipment.__table__.create(session.get_bind())
+    shipments = {}
+    for name, (status, claimed_by, claimed_minutes_ago) in claims.items():
+        claimed_at = None if claimed_minutes_ago is None \
+            else get_current_datetime_in_est() - datetime.timedelta(minutes=claimed_minutes_ago)
+        shipments[name] = Shipment(
+            shipment_id=uuid.uuid4(), terminal_id="T1", frequency=4, scrape_status=status,
+            claimed_by=claimed_by, claimed_at=claimed_at, last_scraped_time=claimed_at)
+    session.add_all(shipments.values())
+    session.commit()
+    return shipments
+
+
+def test_live_claims_of_other_runs_are_not_taken_over(session):
+    other_run = uuid.uuid4()
+    shipments = stored_shipments(
+        session,
+        live=(ScrapeStatus.IN_PROGRESS, other_run, 1),
+        stale=(ScrapeStatus.IN_PROGRESS, other_run, CLAIM_LEASE_MINUTES + 1),
+        active=(ScrapeStatus.ACTIVE, None, None))
+    service = ShipmentService(session, BaseRepository(session, Shipment))
+
+    with mock.patch.object(SetInProgressStatusRule, "column_values", side_effect=sqlite_in_progress_values):
+        claimed = service.mark_shipments_in_progress(shipments.values())
+
+    assert claimed == [shipments["stale"], shipments["active"]]
+    assert {shipment.claimed_by for shipment in claimed} == {get_logger().run_id}
+    live = shipments["live"]
+    session.refresh(live)
+    # Left to its owner, not marked FAILED
+    assert (live.scrape_status, live.claimed_by) == (ScrapeStatus.IN_PROGRESS, other_run)
+
+
+def test_claims_are_renewed_while_a_batch_is_processed(session):
+    run_id = get_logger().run_id
+    shipments = list(stored_shipments(
+        session, **{f"s{i}": (ScrapeStatus.IN_PROGRESS, run_id, 5) for i in range(3)}).values())
+    service = ShipmentService(session, BaseRepository(session, Shipment))
+    processed = []
+
+    for shipment in service.iter_claimed_shipments(shipments, renew_interval=0):
+        processed.append(shipment)
+        shipment.scrape_status = ScrapeStatus.ACTIVE
+        session.commit()
+        if len(processed) == 1:
+            # Another run takes the last shipment over
+            shipments[2].claimed_by = uuid.uuid4()
+            session.commit()
+
+    assert processed == shipments[:2]
+    session.refresh(shipments[1])
+    # Renewed when the batch moved on to it
+    assert shipments[1].claimed_at > get_current_datetime_in_est() - datetime.timedelta(minutes=1)
+
+
+def test_sync_and_async_claims_return_the_same_columns():
+    sync_repo = mock.MagicMock(model=Shipment)
+    sync_repo.bulk_update_by_ids.return_value = []
+    ShipmentService(mock.MagicMock(), sync_repo).mark_shipments_in_progress(
+        [Shipment(shipment_id=uuid.uuid4(), frequency=4)])
+
+    async_repo = mock.MagicMock(model=Shipment)
+    async_repo.bulk_update_by_ids = mock.AsyncMock(return_value=[])
+    asyncio.run(AsyncShipmentService(mock.MagicMock(), async_repo).mark_shipments_in_progress(
+        [Shipment(shipment_id=uuid.uuid4(), frequency=4)]))
+
+    sync_args = sync_repo.bulk_update_by_ids.call_args.args
+    async_args = async_repo.bulk_update_by_ids.call_args.args
+    assert sync_args[3] == async_args[3]
+    assert {"claimed_at", "claimed_by"} <= set(sync_args[3])
+    # Both guard the UPDATE on claim ownership
+    assert len(sync_args[4]) == len(async_args[4]) == 1
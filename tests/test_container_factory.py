@@ -0,0 +1,139 @@
+import time
+import uuid
+from unittest import mock
+import pytest
+from commons.mappings.factory import ContainerDataFactory
+from commons.rules.catalog.apm_rules import APMRules
+from commons.schemas.shipment import ContainerAvailability
+
+MAPPING = {
+    "container_number": "ContainerId",
+    "available": "Available",
+    "line": "Line",
+    "port": "Port",
+    "terminal": "Terminal",
+    "transit_state": "TransitState",  # Not a model field: lands in additional_info
+}
+ROWS = [
+    {"ContainerId": "MSCU1234567", "Available": "YES", "Line": 7, "Port": "NY", "Terminal": "APM",
+     "GoodThru": "2025-01-01", "LocalDateTime": "2025-01-02", "Freight": "HOLD", "Extra": "x"},
+    {"ContainerId": "MSCU7654321", "Port": "NY", "Terminal": "APM", "YardLocation": "B12",
+     "VesselEta": "2025-01-05", "GateOutDate": "2025-01-03", "TransitState": None},
+    {"ContainerId": "MSCU0000000", "Available": "NO", "transit_state": "row value wins"},
+]
+
+
+class ExtraFieldRule:
+    """A per-row rule adding a field that is not in the mapping."""
+
+    def __init__(self, json_data, mapped_data):
+        self.json_data = json_data
+        self.mapped_data = mapped_data
+
+    def process(self):
+        self.mapped_data["location"] = self.json_data.get("YardLocation")
+
+
+def reference_container_data(mapping_config, rules, row, shipment_id):
+    """The mapping before it was compiled into a plan."""
+    unmapped_fields = dict(row)
+    mapped_data = {}
+    for target_field, source_field in mapping_config.items():
+        mapped_data[target_field] = row.get(source_field)
+        unmapped_fields.pop(source_field, None)
+    for rule_class in rules:
+        rule_class(json_data=row, mapped_data=mapped_data).process()
+    relevant_data, additional_info = {}, {}
+    for field_name, field_value in mapped_data.items():
+        if hasattr(ContainerAvailability, field_name):
+            relevant_data[field_name] = field_value
+        else:
+            additional_info[field_name] = field_value
+    additional_info.update(unmapped_fields)
+    additional_info = {k: v for k, v in additional_info.items() if v is not None}
+    return ContainerAvailability(shipment_id=shipment_id, additional_info=additional_info, **relevant_data)
+
+
+def test_compiled_plan_matches_the_reference_mapping():
+    rules = [APMRules, ExtraFieldRule]
+    factory = ContainerDataFactory(MAPPING, rules)
+    shipment_id = uuid.uuid4()
+    for row in ROWS:
+        assert factory.create_container_data(row, shipment_id).to_dict() == \
+            reference_container_data(MAPPING, rules, row, shipment_id).to_dict()
+
+
+def test_plan_is_compiled_once():
+    factory = ContainerDataFactory(MAPPING, [ExtraFieldRule])
+    # Rows are mapped from the plan only; the configuration is not read again
+    factory.mapping_config = mock.MagicMock(side_effect=AssertionError("mapping_config read"))
+    with mock.patch("commons.mappings.factory.hasattr", create=True, wraps=hasattr) as lookups:
+        for row in ROWS:
+            factory.create_container_data(row, uuid.uuid4())
+    # Model-field lookups happen once, for the field the rule added
+    assert [call.args[1] for call in lookups.call_args_list] == ["location"]
+    assert factory._is_model_field["location"] is True
+
+
+def test_batch_mapping_matches_row_mapping_with_missing_keys():
+    # Line is an int in one row and absent in the other; a float column would turn 7 into 7.0
+    rows = [
+        {"ContainerId": "MSCU1234567", "Line": 7, "Port": "NY", "Count": 1},
+        {"ContainerId": "MSCU7654321", "Available": "YES", "YardLocation": "B12"},
+    ]
+    shipment_id_by_container = {"MSCU1234567": uuid.uuid4(), "MSCU7654321": uuid.uuid4()}
+    for rules in ([], [ExtraFieldRule], [APMRules], [ExtraFieldRule, APMRules]):
+        factory = ContainerDataFactory(MAPPING, rules)
+        batch = factory.create_container_data_many(rows, shipment_id_by_container, as_dicts=True)
+        for row, mapped in zip(rows, batch):
+            single = factory.create_container_data(
+                row, shipment_id_by_container[row["ContainerId"]]).to_dict()
+            # Compared with types, since 7.0 == 7
+            assert typed(mapped, single) == typed(single, mapped)
+    assert repr(batch[0]["line"]) == "7"
+    assert repr(batch[0]["additional_info"]["Count"]) == "1"
+
+
+def typed(row, other):
+    return {key: (type(value), repr(value)) for key, value in row.items() if key in other}
+
+
+def apm_rows(count):
+    """`count` APM rows cycling through ROWS, each with its own container number."""
+    rows = []
+    for i in range(count):
+        row = dict(ROWS[i % len(ROWS)])
+        row["ContainerId"] = f"MSCU{i:07d}"
+        rows.append(row)
+    return rows
+
+
+@pytest.mark.benchmark
+def test_create_container_data_many_benchmark(benchmark_report):
+    rows = apm_rows(100_000)
+    shipment_id = uuid.uuid4()
+    shipment_id_by_container = {row["ContainerId"]: shipment_id for row in rows}
+    factory = ContainerDataFactory(MAPPING, [APMRules])
+
+    start = time.perf_counter()
+    for row in rows:
+        reference_container_data(MAPPING, [APMRules], row, shipment_id)
+    per_row_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for row in rows:
+        factory.create_container_data(row, shipment_id)
+    compiled_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    containers = factory.create_container_data_many(rows, shipment_id_by_container)
+    many_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    dicts = factory.create_container_data_many(rows, shipment_id_by_container, as_dicts=True)
+    dicts_seconds = time.perf_counter() - start
+
+    assert len(containers) == len(dicts) == len(rows)
+    benchmark_report(f"container mapping, {len(rows)} APM rows: per-row {per_row_seconds:.2f}s, "
+                     f"compiled plan {compiled_seconds:.2f}s, "
+                     f"create_container_data_many {many_seconds:.2f}s, as_dicts {dicts_seconds:.2f}s")
@@ -0,0 +1,55 @@
+import uuid
+from types import SimpleNamespace
+from unittest import mock
+import pytest
+from sqlalchemy.exc import IntegrityError
+from commons.repository import BaseRepository
+from commons.schemas.shipment import ContainerAvailability
+from commons.services.shipment import ShipmentService
+
+
+def make_service(session):
+    ContainerAvailability.__table__.create(session.get_bind())
+    return ShipmentService(session, mock.MagicMock(),
+                           container_repo=BaseRepository(session, ContainerAvailability))
+
+
+def container(shipment_id, available="YES", port="NJ"):
+    return ContainerAvailability(shipment_id=shipment_id, container_number="C1", port=port,
+                                 terminal="T1", available=available)
+
+
+def stored(session):
+    session.rollback()
+    return [(row.shipment_id, row.available) for row in session.query(ContainerAvailability)]
+
+
+def test_shipments_outside_the_preload_use_the_composite_key(session):
+    service = make_service(session)
+    preloaded, other = uuid.uuid4(), uuid.uuid4()
+    service._save_container(container(other, "NO"))
+
+    service.preload_containers([SimpleNamespace(shipment_id=preloaded)])
+    service._save_container(container(other, "YES"))
+
+    # Updated in place instead of inserted a second time
+    assert stored(session) == [(other, "YES")]
+
+
+def test_rolled_back_inserts_leave_the_index(session):
+    service = make_service(session)
+    shipment_id = uuid.uuid4()
+    service.preload_containers([SimpleNamespace(shipment_id=shipment_id)])
+
+    with service.container_repo.batch(size=10):
+        service._save_container(container(shipment_id))
+        assert (shipment_id, "C1") in service.container_index
+        invalid = container(shipment_id, port=None)
+        invalid.container_number = "C2"
+        with pytest.raises(IntegrityError):
+            service._save_container(invalid)
+        # The chunk holding C1 was rolled back with it
+        assert service.container_index == {}
+        service._save_container(container(shipment_id, "NO"))
+
+    assert stored(session) == [(shipment_id, "NO")]
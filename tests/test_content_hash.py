@@ -0,0 +1,150 @@
+import asyncio
+import datetime
+import inspect
+import uuid
+from unittest import mock
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql
+from commons.async_repository import AsyncBaseRepository
+from commons.repository import BaseRepository
+from commons.schemas.shipment import ContainerAvailability
+
+SEEN = datetime.datetime(2025, 2, 1, 8, 0)
+SEEN_AGAIN = datetime.datetime(2025, 2, 2, 8, 0)
+
+
+def container(available="YES", seen_at=SEEN, **values):
+    entity = ContainerAvailability(shipment_id=uuid.uuid4(), container_number="MSCU1234567", port="NJ",
+                                   terminal="APM", available=available, **values)
+    entity.refresh_content_hash(seen_at)
+    return entity
+
+
+def test_hash_ignores_tracking_fields_and_formatting_noise():
+    row = container().to_dict()
+    noisy = dict(row, shipment_id=uuid.uuid4(), last_seen_at=SEEN_AGAIN, content_hash="x",
+                 port=" NJ ", location="", additional_info={})
+    assert ContainerAvailability.hash_content(noisy) == ContainerAvailability.hash_content(row)
+    assert ContainerAvailability.hash_content(dict(row, available="NO")) != \
+        ContainerAvailability.hash_content(row)
+
+
+def record_statements(session):
+    statements = []
+    event.listen(session.get_bind(), "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statement != "BEGIN" and statements.append(statement))
+    return statements
+
+
+def save(repository, entity):
+    return repository.save_or_touch(
+        entity, {"shipment_id": entity.shipment_id, "container_number": entity.container_number},
+        "content_hash", ("last_seen_at",))
+
+
+def test_unchanged_content_only_touches_last_seen_at(session):
+    ContainerAvailability.__table__.create(session.get_bind())
+    repository = BaseRepository(session, ContainerAvailability)
+    stored = save(repository, container())
+    statements = record_statements(session)
+
+    again = container(seen_at=SEEN_AGAIN)
+    again.shipment_id = stored.shipment_id
+    again.refresh_content_hash(SEEN_AGAIN)
+    assert save(repository, again) is stored
+
+    update, = [statement for statement in statements if statement.startswith("UPDATE")]
+    assert update.startswith("UPDATE container_status_table SET last_seen_at=?")
+    session.expire_all()
+    assert stored.last_seen_at == SEEN_AGAIN
+    assert stored.available == "YES"
+
+
+def test_changed_content_rewrites_the_row(session):
+    ContainerAvailability.__table__.create(session.get_bind())
+    repository = BaseRepository(session, ContainerAvailability)
+    stored = save(repository, container())
+    old_hash = stored.content_hash
+
+    changed = container(available="NO", seen_at=SEEN_AGAIN, holds="YES")
+    changed.shipment_id = stored.shipment_id
+    changed.refresh_content_hash(SEEN_AGAIN)
+    assert save(repository, changed) is stored
+
+    session.expire_all()
+    assert (stored.available, stored.holds, stored.last_seen_at) == ("NO", "YES", SEEN_AGAIN)
+    assert stored.content_hash == changed.content_hash != old_hash
+
+
+def test_async_save_or_touch_matches_the_sync_signature():
+    sync_parameters = inspect.signature(BaseRepository.save_or_touch).parameters
+    async_parameters = inspect.signature(AsyncBaseRepository.save_or_touch).parameters
+    assert list(async_parameters) == list(sync_parameters)
+    assert async_parameters["existing_entity"].default is None
+
+
+def test_async_save_or_touch_returns_the_persistent_entity():
+    session = mock.MagicMock()
+    session.commit = mock.AsyncMock()
+    session.rollback = mock.AsyncMock()
+    session.execute = mock.AsyncMock(return_value=mock.MagicMock())
+    repository = AsyncBaseRepository(session, ContainerAvailability)
+    stored = container()
+    again = container(seen_at=SEEN_AGAIN)
+
+    # Given the stored row, nothing is queried and only last_seen_at is written
+    assert asyncio.run(repository.save_or_touch(
+        again, None, "content_hash", ("last_seen_at",), existing_entity=stored)) is stored
+    session.execute.assert_not_awaited()
+    assert stored.last_seen_at == SEEN_AGAIN
+
+    # Looked up and not found: the entity is inserted and returned
+    session.execute.return_value.scalars.return_value.first.return_value = None
+    new = container()
+    assert asyncio.run(repository.save_or_touch(
+        new, {"container_number": new.container_number}, "content_hash", ("last_seen_at",))) is new
+    session.add.assert_called_once_with(new)
+
+
+def upsert(session, entity):
+    # Every column is set: SQLite has no DEFAULT keyword in VALUES
+    row = {column.name: getattr(entity, column.name) for column in ContainerAvailability.__table__.columns}
+    BaseRepository(session, ContainerAvailability).bulk_upsert(
+        [row], ["shipment_id", "container_number"], change_column="content_hash",
+        touch_columns=("last_seen_at",))
+
+
+def test_bulk_upsert_keeps_stored_columns_when_the_hash_is_unchanged(session):
+    ContainerAvailability.__table__.create(session.get_bind())
+    first = container(location="B12")
+    upsert(session, first)
+
+    # The stored location changes behind the hash's back: an unchanged hash keeps the stored columns
+    again = container(seen_at=SEEN_AGAIN, location="B12")
+    again.shipment_id = first.shipment_id
+    again.refresh_content_hash(SEEN_AGAIN)
+    session.execute(ContainerAvailability.__table__.update().values(location="kept"))
+    upsert(session, again)
+    stored = session.query(ContainerAvailability).one()
+    assert (stored.location, stored.last_seen_at) == ("kept", SEEN_AGAIN)
+
+    changed = container(available="NO", seen_at=SEEN_AGAIN, location="C7")
+    changed.shipment_id = first.shipment_id
+    changed.refresh_content_hash(SEEN_AGAIN)
+    upsert(session, changed)
+    session.expire_all()
+    stored = session.query(ContainerAvailability).one()
+    assert (stored.available, stored.location, stored.content_hash) == ("NO", "C7", changed.content_hash)
+
+
+def test_change_column_guards_every_column_but_the_touched_ones():
+    _, statements = BaseRepository._upsert_statements(
+        ContainerAvailability, [container().to_dict()], ["shipment_id", "container_number"],
+        None, True, 1000, change_column="content_hash", touch_columns=("last_seen_at",))
+    sql = str(statements[0].compile(dialect=postgresql.dialect()))
+    set_clause = sql.split("DO UPDATE SET", 1)[1]
+    assert "available = CASE WHEN (container_status_table.content_hash IS DISTINCT FROM " \
+           "excluded.content_hash)" in set_clause
+    # Written whatever the hash, keeping the stored value only when the new one is blank
+    assert set_clause.endswith(
+        "last_seen_at = coalesce(excluded.last_seen_at, container_status_table.last_seen_at)")
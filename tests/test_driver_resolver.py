@@ -0,0 +1,47 @@
+import json
+import os
+from unittest import mock
+import pytest
+from commons.services import driver_resolver
+from commons.services.driver_resolver import ChromeDriverResolver, get_chrome_version
+
+
+@pytest.fixture(autouse=True)
+def fresh_process_state(monkeypatch):
+    monkeypatch.setattr(driver_resolver, "_chrome_versions", {})
+    monkeypatch.setattr(ChromeDriverResolver, "_resolved", {})
+
+
+def make_resolver(tmp_path, **kwargs):
+    return ChromeDriverResolver(mock.MagicMock(), cache_dir=str(tmp_path), **kwargs)
+
+
+def test_chrome_version_is_detected_once(monkeypatch):
+    monkeypatch.setattr(driver_resolver.shutil, "which", lambda name: f"/usr/bin/{name}")
+    version = mock.MagicMock(return_value="126.0.6478.126")
+    monkeypatch.setattr(driver_resolver, "_binary_version", version)
+
+    assert get_chrome_version() == get_chrome_version() == "126.0.6478.126"
+    version.assert_called_once()
+
+
+def test_unknown_chrome_version_is_not_served_from_the_cache(monkeypatch, tmp_path):
+    monkeypatch.setattr(driver_resolver, "get_chrome_version", lambda binary=None: None)
+    stale = tmp_path / "chromedriver"
+    stale.write_text("")
+    (tmp_path / "drivers.json").write_text(json.dumps({"unknown|": {"path": str(stale)}}))
+
+    with pytest.raises(RuntimeError, match="could not be detected"):
+        make_resolver(tmp_path, offline=True).resolve()
+
+
+def test_unknown_chrome_version_is_not_cached(monkeypatch, tmp_path):
+    monkeypatch.setattr(driver_resolver, "get_chrome_version", lambda binary=None: None)
+    manager = mock.MagicMock()
+    manager.return_value.install.return_value = "/drivers/chromedriver"
+
+    with mock.patch("webdriver_manager.chrome.ChromeDriverManager", manager):
+        assert make_resolver(tmp_path).resolve() == "/drivers/chromedriver"
+
+    assert ChromeDriverResolver._resolved == {}
+    assert not os.path.exists(tmp_path / "drivers.json")
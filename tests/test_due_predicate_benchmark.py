@@ -0,0 +1,76 @@
+import datetime
+import time
+import uuid
+import pytest
+from sqlalchemy import and_, func, insert, select
+from commons.enums import ScrapeStatus
+from commons.schemas.shipment import Shipment
+
+ROWS = 20_000
+CHUNK = 50_000
+NOW = datetime.datetime(2025, 1, 1, 12, 0)
+ACTIVE = [ScrapeStatus.ASSIGNED.name, ScrapeStatus.ACTIVE.name]
+
+
+def populate(session, count):
+    Shipment.__table__.create(session.get_bind())
+    for offset in range(0, count, CHUNK):
+        rows = []
+        for i in range(offset, min(offset + CHUNK, count)):
+            # 1% of the rows are due
+            last_scraped_time = NOW - datetime.timedelta(hours=5 if i % 100 == 0 else 1, minutes=i % 50)
+            rows.append({
+                "shipment_id": uuid.uuid4(), "terminal_id": f"T{i % 5}",
+                "scrape_status": ScrapeStatus.ACTIVE if i % 2 else ScrapeStatus.ASSIGNED,
+                "frequency": 4, "start_scrape_time": NOW - datetime.timedelta(days=1),
+                "last_scraped_time": last_scraped_time,
+                "next_scrape_time": last_scraped_time + datetime.timedelta(hours=4),
+            })
+        session.execute(insert(Shipment), rows)
+        session.commit()
+
+
+def per_row_predicate():
+    # The expression the range replaced, in SQLite's date arithmetic
+    hours_since_scrape = (func.julianday(NOW) - func.julianday(Shipment.last_scraped_time)) * 24
+    return and_(Shipment.terminal_id == "T0", Shipment.scrape_status.in_(ACTIVE),
+                hours_since_scrape >= Shipment.frequency)
+
+
+def range_predicate():
+    return and_(Shipment.terminal_id == "T0", Shipment.scrape_status.in_(ACTIVE),
+                Shipment.last_scraped_time.isnot(None), Shipment.next_scrape_time <= NOW)
+
+
+def best_of(session, stmt, runs=3):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        ids = session.scalars(stmt).all()
+        timings.append(time.perf_counter() - start)
+    return min(timings), sorted(ids)
+
+
+def test_range_predicate_matches_per_row_computation(session):
+    populate(session, ROWS)
+    per_row_ids = sorted(session.scalars(select(Shipment.shipment_id).where(per_row_predicate())))
+    range_ids = sorted(session.scalars(select(Shipment.shipment_id).where(range_predicate())))
+
+    assert range_ids == per_row_ids
+    assert len(range_ids) == ROWS // 100  # Every due row belongs to T0
+    plan = " ".join(row[-1] for row in session.connection().exec_driver_sql(
+        "EXPLAIN QUERY PLAN " + str(select(Shipment.shipment_id).where(range_predicate()).compile(
+            session.get_bind(), compile_kwargs={"literal_binds": True}))))
+    assert "next_scrape_time<" in plan
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("count", [100_000, 1_000_000, 10_000_000])
+def test_due_predicate_benchmark(session, benchmark_report, count):
+    populate(session, count)
+    per_row_seconds, per_row_ids = best_of(session, select(Shipment.shipment_id).where(per_row_predicate()))
+    range_seconds, range_ids = best_of(session, select(Shipment.shipment_id).where(range_predicate()))
+
+    assert range_ids == per_row_ids
+    benchmark_report(f"due predicate, {count} rows: per-row {per_row_seconds * 1000:.1f}ms, "
+                     f"range {range_seconds * 1000:.1f}ms")
@@ -0,0 +1,62 @@
+from unittest import mock
+import pytest
+from commons.enums import ScrapeStatus
+from commons.services.log_writer import ShipmentLogWriter
+from commons.services.shipment import ShipmentService
+from commons.services.writer import BatchWriter
+
+
+def make_log_writer(max_snapshots):
+    # The background thread is not needed to test the diffing
+    with mock.patch.object(BatchWriter, "__init__", return_value=None):
+        return ShipmentLogWriter(mock.MagicMock(), max_snapshots=max_snapshots)
+
+
+def log_item(shipment_id, status="ACTIVE"):
+    return shipment_id, None, None, {"shipment": {"shipment_id": shipment_id, "status": status}}
+
+
+def test_snapshots_are_bounded_least_recently_used_first():
+    writer = make_log_writer(max_snapshots=2)
+    writer._log_rows([log_item(1), log_item(2), log_item(1), log_item(3)])
+
+    # 2 was the least recently logged shipment when 3 came in
+    assert list(writer._previous) == [1, 3]
+    # Its next log holds the full snapshot again
+    row, = writer._log_rows([log_item(2)])
+    assert '"shipment_id":2' in row["new_data"]
+    assert list(writer._previous) == [3, 2]
+
+
+def test_max_snapshots_must_be_positive():
+    with pytest.raises(ValueError):
+        make_log_writer(max_snapshots=0)
+
+
+def make_service():
+    shipment_repo = mock.MagicMock()
+    service = ShipmentService(mock.MagicMock(), shipment_repo, log_writer=mock.MagicMock())
+    shipment = mock.MagicMock(scrape_status=ScrapeStatus.IN_PROGRESS)
+    return service, shipment_repo, shipment
+
+
+def test_process_logs_once_after_the_save():
+    service, shipment_repo, shipment = make_service()
+    shipment_repo.save_or_update.side_effect = \
+        lambda *args: service.log_writer.submit.assert_not_called()
+
+    service.process({"shipment": shipment})
+
+    service.log_writer.submit.assert_called_once_with(shipment, None)
+    assert shipment.scrape_status == ScrapeStatus.ACTIVE
+
+
+def test_process_logs_only_the_failed_outcome():
+    service, shipment_repo, shipment = make_service()
+    shipment_repo.save_or_update.side_effect = [RuntimeError("save failed"), None]
+
+    with pytest.raises(RuntimeError):
+        service.process({"shipment": shipment})
+
+    service.log_writer.submit.assert_called_once_with(shipment, None)
+    assert shipment.scrape_status == ScrapeStatus.FAILED
@@ -0,0 +1,105 @@
+import datetime
+import pathlib
+import subprocess
+import sys
+from unittest import mock
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+MIGRATION = ROOT / "alembic" / "versions" / "9f4b2d7c1a35_partition_shipment_logs.py"
+
+
+def run_fresh(code):
+    # A new interpreter, so no logger has been initialised yet
+    return subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+
+
+def test_maintenance_imports_without_a_logger():
+    result = run_fresh("import commons.maintenance")
+    assert result.returncode == 0, result.stderr
+
+
+def test_partition_migration_does_not_import_commons():
+    result = run_fresh(
+        "import importlib.util, sys\n"
+        f"spec = importlib.util.spec_from_file_location('migration', {str(MIGRATION)!r})\n"
+        "spec.loader.exec_module(importlib.util.module_from_spec(spec))\n"
+        "assert not [name for name in sys.modules if name.startswith('commons')]\n")
+    assert result.returncode == 0, result.stderr
+
+
+def test_partition_migration_months_match_maintenance():
+    import importlib.util
+    from commons import maintenance
+    spec = importlib.util.spec_from_file_location("migration", MIGRATION)
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+
+    month = datetime.date(2024, 11, 1)
+    for months in (-13, -1, 0, 1, 2, 14):
+        assert migration.add_months(month, months) == maintenance.add_months(month, months)
+    assert migration.MONTHS_AHEAD == maintenance.DEFAULT_MONTHS_AHEAD
+
+
+class RecordingConnection:
+    """Records the SQL it executes; `scalar()` answers from `answers`, `.scalars().all()` from `partitions`."""
+
+    def __init__(self, answers=(), partitions=()):
+        self.statements = []
+        self.answers = list(answers)
+        self.partitions = list(partitions)
+
+    def execute(self, statement, parameters=None):
+        self.statements.append(" ".join(str(statement).split()))
+        result = mock.MagicMock()
+        result.scalar.side_effect = lambda: self.answers.pop(0)
+        result.scalars.return_value.all.return_value = self.partitions
+        result.rowcount = 2
+        return result
+
+
+def test_default_partition_is_never_dropped():
+    from commons import maintenance
+    connection = RecordingConnection(partitions=[
+        "shipment_logs_default", "shipment_logs_2023_12", "shipment_logs_2024_01"])
+    dropped = maintenance.drop_expired_shipment_log_partitions(connection, datetime.date(2024, 1, 1))
+    assert dropped == ["shipment_logs_2023_12"]
+
+
+def test_new_partition_takes_over_the_default_partition_rows():
+    from commons import maintenance
+    # The partition does not exist yet and the default partition holds rows of its month
+    connection = RecordingConnection(answers=[True, True])
+    names = maintenance.create_shipment_log_partitions(
+        connection, datetime.date(2025, 3, 1), datetime.date(2025, 3, 1))
+
+    assert names == ["shipment_logs_2025_03"]
+    create, move, attach = connection.statements[2:]
+    assert create.startswith("CREATE TABLE shipment_logs_2025_03 (LIKE shipment_logs")
+    assert "DELETE FROM shipment_logs_default" in move and "INSERT INTO shipment_logs_2025_03" in move
+    assert attach == ("ALTER TABLE shipment_logs ATTACH PARTITION shipment_logs_2025_03 "
+                      "FOR VALUES FROM ('2025-03-01') TO ('2025-04-01')")
+
+
+def test_logs_of_months_without_partition_are_kept_on_postgresql(pg_session):
+    import uuid
+    from sqlalchemy import text
+    from commons import maintenance
+    connection = pg_session.connection()
+    current_month = maintenance.month_start(maintenance.get_current_datetime_in_est())
+    maintenance.maintain_shipment_logs(connection, retention_months=12, months_ahead=1)
+
+    # Beyond the partitions maintenance created: lands in the DEFAULT partition
+    month = maintenance.add_months(current_month, 24)
+    shipment_id = uuid.uuid4()
+    connection.execute(text(
+        "INSERT INTO shipments (shipment_id, scrape_status) VALUES (:id, 'ACTIVE')"), {"id": shipment_id})
+    connection.execute(text(
+        "INSERT INTO shipment_logs (log_id, shipment_id, scraped_at) VALUES (:log_id, :id, :at)"),
+        {"log_id": uuid.uuid4(), "id": shipment_id, "at": month})
+
+    def partition():
+        return connection.execute(text("SELECT tableoid::regclass::text FROM shipment_logs")).scalar()
+
+    assert partition() == maintenance.DEFAULT_PARTITION
+    maintenance.create_shipment_log_partitions(connection, month, month)
+    assert partition() == maintenance.partition_name(month)
@@ -0,0 +1,83 @@
+import json
+from unittest import mock
+import pytest
+from commons.services.network_capture import NetworkCapture
+
+
+class FakeDriver:
+    def __init__(self):
+        self.log = []
+        self.bodies = {}
+        self.body_reads = 0
+
+    def get_log(self, name):
+        entries, self.log = self.log, []
+        return entries
+
+    def execute_cdp_cmd(self, command, params):
+        self.body_reads += 1
+        return {"body": self.bodies[params["requestId"]]}
+
+    def event(self, method, **params):
+        self.log.append({"message": json.dumps({"message": {"method": method, "params": params}})})
+
+    def respond(self, request_id, url, body, loader_id="L1"):
+        self.bodies[request_id] = body
+        self.event("Network.responseReceived", requestId=request_id, loaderId=loader_id,
+                   response={"url": url, "status": 200, "mimeType": "application/json"})
+        self.event("Network.loadingFinished", requestId=request_id)
+
+
+class PollingWaiter:
+    # Polls the condition a few times instead of waiting on the clock
+    def until(self, condition, timeout=None, name="wait"):
+        for _ in range(3):
+            result = condition(None)
+            if result:
+                return result
+        raise TimeoutError(name)
+
+
+def make_capture():
+    driver = FakeDriver()
+    return driver, NetworkCapture(driver, PollingWaiter(), mock.MagicMock())
+
+
+def test_repeated_waits_only_count_new_responses():
+    driver, capture = make_capture()
+    driver.respond("1", "https://portal/api/containers", '{"page": 1}')
+    assert capture.wait_for_json("/api/containers") == [{"page": 1}]
+
+    driver.respond("2", "https://portal/api/containers", '{"page": 2}')
+    assert capture.wait_for_json("/api/containers") == [{"page": 2}]
+    assert driver.body_reads == 2
+
+
+def test_non_json_responses_do_not_satisfy_the_wait():
+    driver, capture = make_capture()
+    driver.respond("1", "https://portal/api/containers", "<html>Session expired</html>")
+    with pytest.raises(TimeoutError):
+        capture.wait_for_json("/api/containers")
+    driver.respond("2", "https://portal/api/containers", '{"page": 1}')
+    assert capture.wait_for_json("/api/containers") == [{"page": 1}]
+    # The HTML body was fetched once, not on every poll
+    assert driver.body_reads == 2
+
+
+def test_other_patterns_keep_their_responses():
+    driver, capture = make_capture()
+    driver.respond("1", "https://portal/api/vessels", '{"vessel": "A"}')
+    driver.respond("2", "https://portal/api/containers", '{"page": 1}')
+    assert capture.wait_for_json("/api/containers") == [{"page": 1}]
+    assert capture.wait_for_json("/api/vessels") == [{"vessel": "A"}]
+
+
+def test_main_frame_navigation_prunes_previous_pages():
+    driver, capture = make_capture()
+    driver.respond("1", "https://portal/api/containers", '{"page": 1}', loader_id="L1")
+    driver.event("Page.frameNavigated", frame={"id": "child", "parentId": "main", "loaderId": "L9"})
+    driver.event("Page.frameNavigated", frame={"id": "main", "loaderId": "L2"})
+    driver.respond("2", "https://portal/api/containers", '{"page": 2}', loader_id="L2")
+
+    assert capture.get_json("/api/containers") == [{"page": 2}]
+    assert list(capture._responses) == ["2"]
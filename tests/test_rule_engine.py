@@ -0,0 +1,109 @@
+import pytest
+from commons.rules.engine import BusinessRule, BusinessRuleEngine
+
+
+class Rule(BusinessRule):
+    """Records its name in context['trace'] and sets each of its outputs to its name."""
+
+    def __init__(self, name, inputs=(), outputs=(), guard=None):
+        self.name = name
+        self.inputs = inputs
+        self.outputs = outputs
+        self._guard = guard
+        self.batches = []
+
+    def apply(self, context):
+        context.setdefault("trace", []).append(self.name)
+        for key in self.outputs:
+            context[key] = self.name
+
+    def apply_many(self, contexts):
+        self.batches.append([context["id"] for context in contexts])
+        super().apply_many(contexts)
+
+
+class GuardedRule(Rule):
+    def guard(self, context):
+        return self._guard(context)
+
+
+def plan_names(rules):
+    return [rule.name for rule, _, _ in BusinessRuleEngine(rules)._plan]
+
+
+def test_producers_run_before_their_consumers():
+    rules = [
+        Rule("notify", inputs=("status",)),
+        Rule("status", inputs=("shipments",), outputs=("status",)),
+        Rule("fetch", outputs=("shipments",)),
+    ]
+    context = {}
+    BusinessRuleEngine(rules).apply_rules(context)
+    assert context["trace"] == ["fetch", "status", "notify"]
+
+
+def test_independent_rules_keep_their_listed_order():
+    rules = [Rule("b", outputs=("b",)), Rule("a", outputs=("a",)), Rule("c", inputs=("a",))]
+    assert plan_names(rules) == ["b", "a", "c"]
+
+
+def test_undeclared_rules_keep_their_position():
+    rules = [
+        Rule("undeclared"),
+        Rule("consumer", inputs=("value",)),
+        Rule("producer", outputs=("value",)),
+        Rule("last"),
+    ]
+    assert plan_names(rules) == ["undeclared", "producer", "consumer", "last"]
+
+
+def test_writers_of_the_same_key_keep_their_order():
+    rules = [Rule("first", outputs=("value",)), Rule("second", outputs=("value",))]
+    context = {}
+    BusinessRuleEngine(rules).apply_rules(context)
+    assert context["value"] == "second"
+
+
+def test_rules_with_missing_inputs_are_skipped():
+    rules = [Rule("needs_shipment", inputs=("shipment",)), Rule("always")]
+    engine = BusinessRuleEngine(rules)
+    for context in ({}, {"shipment": None}):
+        engine.apply_rules(context)
+        assert context["trace"] == ["always"]
+    context = {"shipment": object()}
+    engine.apply_rules(context)
+    assert context["trace"] == ["needs_shipment", "always"]
+
+
+def test_rules_whose_guard_is_false_are_skipped():
+    guarded = GuardedRule("guarded", guard=lambda context: context.get("enabled", False))
+    engine = BusinessRuleEngine([guarded, Rule("always")])
+    assert [has_guard for _, _, has_guard in engine._plan] == [True, False]
+
+    context = {}
+    engine.apply_rules(context)
+    assert context["trace"] == ["always"]
+    context = {"enabled": True}
+    engine.apply_rules(context)
+    assert context["trace"] == ["guarded", "always"]
+
+
+def test_apply_rules_many_hands_each_rule_its_eligible_contexts():
+    guarded = GuardedRule("guarded", inputs=("shipment",), outputs=("status",),
+                          guard=lambda context: context["id"] != 2)
+    consumer = Rule("consumer", inputs=("status",))
+    contexts = [{"id": 1, "shipment": 1}, {"id": 2, "shipment": 2}, {"id": 3}]
+    BusinessRuleEngine([consumer, guarded]).apply_rules_many(contexts)
+
+    assert guarded.batches == [[1]]  # 2 fails the guard, 3 has no shipment
+    assert consumer.batches == [[1]]
+    assert [context.get("trace") for context in contexts] == [["guarded", "consumer"], None, None]
+
+
+def test_cyclic_dependencies_are_rejected():
+    rules = [
+        Rule("a", inputs=("y",), outputs=("x",)),
+        Rule("b", inputs=("x",), outputs=("y",)),
+    ]
+    with pytest.raises(ValueError, match="cyclic"):
+        BusinessRuleEngine(rules)
@@ -0,0 +1,37 @@
+from types import SimpleNamespace
+from unittest import mock
+import pytest
+from commons.services.shipment import ShipmentService
+
+CALLS = 100_000
+
+
+class CountingRule:
+    def __init__(self):
+        self.applied = 0
+
+    def apply(self, context):
+        self.applied += 1
+
+
+@pytest.mark.parametrize("method, rule_attribute", [
+    ("process_in_progress", "IN_PROGRESS_RULE"),
+    ("process_failed", "FAILED_RULE"),
+    ("process_active", "ACTIVE_RULE"),
+])
+def test_rules_applied_per_call_stay_constant(method, rule_attribute):
+    status_rule, caller_rule = CountingRule(), CountingRule()
+    caller_rules = [caller_rule]
+    service = ShipmentService(mock.MagicMock(), mock.MagicMock())
+    context = {"shipment": SimpleNamespace(shipment_id=1), "error_message": "timeout"}
+    process = getattr(service, method)
+
+    with mock.patch.object(ShipmentService, rule_attribute, status_rule):
+        for call in range(1, CALLS + 1):
+            before = status_rule.applied
+            process(context, caller_rules if call % 2 else None)
+            assert status_rule.applied - before == 1
+
+    assert status_rule.applied == CALLS
+    assert caller_rule.applied == CALLS // 2
+    assert caller_rules == [caller_rule]
@@ -0,0 +1,133 @@
+import datetime
+import importlib.util
+import os
+from unittest import mock
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex
+from commons.rules.catalog.fetch_shipments_rule import FetchShipmentsRule
+from commons.schemas.shipment import Shipment
+
+VERSIONS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic", "versions")
+NOW = datetime.datetime(2025, 1, 1)
+
+
+def migration_indexes(*revisions):
+    """Run the upgrades of `revisions` against a mocked `op` and collect the created indexes."""
+    indexes = {}
+    for revision in revisions:
+        path = next(os.path.join(VERSIONS, name) for name in os.listdir(VERSIONS)
+                    if name.startswith(revision) and name.endswith(".py"))
+        spec = importlib.util.spec_from_file_location(f"migration_{revision}", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        with mock.patch.object(module, "op") as op:
+            module.upgrade()
+        for call in op.create_index.call_args_list:
+            name, table, columns = call.args
+            where = call.kwargs.get("postgresql_where")
+            indexes[name] = (table, list(columns), None if where is None else str(where))
+    return indexes
+
+
+def model_indexes():
+    return {
+        index.name: (
+            index.table.name, [column.name for column in index.columns],
+            None if index.dialect_options["postgresql"]["where"] is None
+            else str(index.dialect_options["postgresql"]["where"]))
+        for index in Shipment.__table__.indexes if index.name.startswith("ix_shipments_")
+    }
+
+
+def test_model_indexes_match_the_migrations():
+    created = migration_indexes("5d2f7a1c9e84", "d41a6e0c8b52")
+    for name, definition in model_indexes().items():
+        assert created[name] == definition
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("ix_shipments_due", "ON shipments (terminal_id, scrape_status, next_scrape_time) "
+                         "WHERE scrape_status IN ('ASSIGNED', 'ACTIVE')"),
+    ("ix_shipments_retry", "ON shipments (terminal_id, scrape_status, last_scraped_time) "
+                           "WHERE scrape_status IN ('FAILED', 'IN_PROGRESS')"),
+    ("ix_shipments_terminal_next_scrape", "ON shipments (terminal_id, next_scrape_time, shipment_id)"),
+    ("ix_shipments_claims", "ON shipments (terminal_id, claimed_at) WHERE scrape_status = 'IN_PROGRESS'"),
+])
+def test_index_ddl(name, expected):
+    index = next(index for index in Shipment.__table__.indexes if index.name == name)
+    assert expected in str(CreateIndex(index).compile(dialect=postgresql.dialect()))
+
+
+def explain(session, stmt):
+    sql = str(stmt.compile(session.get_bind(), compile_kwargs={"literal_binds": True}))
+    return " ".join(row[-1] for row in session.connection().exec_driver_sql("EXPLAIN QUERY PLAN " + sql))
+
+
+@pytest.mark.parametrize("stmt", [
+    select(Shipment).where(FetchShipmentsRule.eligibility_filter("T1", NOW, NOW)),
+    select(Shipment.shipment_id).where(Shipment.terminal_id == "T1")
+    .order_by(Shipment.next_scrape_time, Shipment.shipment_id).limit(100),
+], ids=["due", "claim-order"])
+def test_scheduler_queries_search_an_index(session, stmt):
+    # SQLite ignores the partial WHERE clauses, but a full scan still means no index fits
+    Shipment.__table__.create(session.get_bind())
+    plan = explain(session, stmt)
+    assert "USING" in plan and "INDEX" in plan
+    assert "SCAN shipments" not in plan
+
+
+PG_ROWS = 1_000_000
+PG_NOW = datetime.datetime(2025, 1, 1, 12, 0)
+
+
+def seed_shipments(session):
+    """
+    Seed PG_ROWS shipments over 50 terminals: mostly ACTIVE, 1% FAILED, 1% IN_PROGRESS and
+    1% STOPPED, with about 0.1% due at PG_NOW.
+    """
+    session.execute(text(
+        """
+        INSERT INTO shipments (shipment_id, terminal_id, scrape_status, frequency, submitted_at,
+                               start_scrape_time, last_scraped_time, next_scrape_time,
+                               claimed_at, updated_at)
+        SELECT md5(i::text)::uuid,
+               'T' || (i % 50),
+               (CASE WHEN i % 100 = 1 THEN 'FAILED' WHEN i % 100 = 2 THEN 'IN_PROGRESS'
+                     WHEN i % 100 = 3 THEN 'STOPPED' ELSE 'ACTIVE' END)::scrapestatus,
+               4,
+               :now - interval '30 days',
+               :now - interval '1 day',
+               :now - interval '4 hours' + (i % 1000) * interval '1 minute',
+               :now + (i % 1000 - 1) * interval '1 minute',
+               CASE WHEN i % 100 = 2 THEN :now - (i % 60) * interval '1 minute' END,
+               :now
+        FROM generate_series(1, :rows) AS i
+        """
+    ), {"now": PG_NOW, "rows": PG_ROWS})
+    session.commit()
+    session.execute(text("ANALYZE shipments"))
+
+
+def pg_explain(session, stmt):
+    sql = str(stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+    return "\n".join(row[0] for row in session.execute(text("EXPLAIN " + sql)))
+
+
+def test_scheduler_queries_use_the_indexes_on_postgresql(pg_session):
+    seed_shipments(pg_session)
+    stale_before = PG_NOW - datetime.timedelta(minutes=30)
+    queries = {
+        "due": select(Shipment.shipment_id).where(
+            FetchShipmentsRule.eligibility_filter("T1", PG_NOW, stale_before)),
+        "claim-order": select(Shipment.shipment_id).where(
+            FetchShipmentsRule.eligibility_filter("T1", PG_NOW, stale_before))
+        .order_by(Shipment.next_scrape_time, Shipment.shipment_id).limit(100),
+        "stale-claims": select(Shipment.shipment_id).where(
+            Shipment.terminal_id == "T1", Shipment.scrape_status == "IN_PROGRESS",
+            Shipment.claimed_at <= stale_before),
+    }
+    for name, stmt in queries.items():
+        plan = pg_explain(pg_session, stmt)
+        assert "Seq Scan on shipments" not in plan, f"{name}:\n{plan}"
@@ -0,0 +1,88 @@
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from selenium.webdriver.chrome.options import Options
+from commons.services.browser import BrowserService
+from commons.services.driver_resolver import get_chrome_version
+from commons.services.scrape_profile import ScrapeProfile, get_scrape_profile
+from commons.utils.logger import get_logger
+
+IMAGES = 20
+IMAGE_DELAY = 0.1  # Seconds the server takes per image
+
+
+def blocks(pattern, url):
+    # Network.setBlockedURLs patterns: '*' is the only wildcard, '?' is literal
+    return re.fullmatch(".*".join(map(re.escape, pattern.split("*"))), url) is not None
+
+
+def test_default_profile_keeps_the_configured_strategy():
+    options = Options()
+    options.page_load_strategy = "eager"
+    get_scrape_profile("default").apply_options(options)
+    assert options.page_load_strategy == "eager"
+
+    get_scrape_profile("minimal").apply_options(options)
+    assert options.page_load_strategy == "none"
+
+
+def test_page_load_strategy_is_validated():
+    with pytest.raises(ValueError):
+        ScrapeProfile("broken", page_load_strategy="lazy")
+
+
+def test_cache_busted_resources_are_blocked():
+    blocked = get_scrape_profile("light").blocked_urls()
+    for url in ("https://portal.example.com/logo.png?v=3", "https://cdn.example.com/font.woff2?x=1"):
+        assert any(blocks(pattern, url) for pattern in blocked)
+    assert not any(blocks(pattern, "https://portal.example.com/api/containers?id=1")
+                   for pattern in blocked)
+
+
+class SlowImages(BaseHTTPRequestHandler):
+    image_requests = 0
+
+    def do_GET(self):
+        if self.path.startswith("/img"):
+            SlowImages.image_requests += 1
+            time.sleep(IMAGE_DELAY)
+            body, content_type = b"", "image/png"
+        else:
+            images = "".join(f'<img src="/img{i}.png?v={i}">' for i in range(IMAGES))
+            body, content_type = f"<html><body><p id='data'>ok</p>{images}</body></html>".encode(), "text/html"
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.mark.skipif(get_chrome_version() is None, reason="Chrome is not installed")
+def test_light_profile_loads_image_heavy_pages_faster():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowImages)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+    timings = {}
+    try:
+        for profile in ("default", "light"):
+            SlowImages.image_requests = 0
+            browser = BrowserService(None, None, get_logger(), profile=profile)
+            browser.initialize_browser()
+            try:
+                start = time.perf_counter()
+                browser.navigate_to_url(url)
+                browser.find_element("id", "data", timeout=10)
+                timings[profile] = (time.perf_counter() - start, SlowImages.image_requests)
+            finally:
+                browser.quit_browser()
+    finally:
+        server.shutdown()
+
+    print(f"\nPage load with {IMAGES} slow images: {timings}")
+    assert timings["light"][1] == 0
+    assert timings["light"][0] < timings["default"][0]
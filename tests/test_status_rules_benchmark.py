@@ -0,0 +1,83 @@
+import uuid
+from unittest import mock
+import pytest
+from sqlalchemy import event
+from commons.enums import ScrapeStatus
+from commons.repository import BaseRepository
+from commons.rules.catalog.set_status_in_failed_rule import SetFailedStatusRule
+from commons.rules.catalog.set_status_in_progress_rule import SetInProgressStatusRule
+from commons.rules.engine import BusinessRuleEngine
+from commons.schemas.shipment import Shipment
+from commons.services.shipment import ShipmentService
+from commons.utils.date import get_current_datetime_in_est
+
+SHIPMENTS = 500
+FAILED_VALUES = SetFailedStatusRule.column_values
+
+
+def sqlite_failed_values(model, current_time, error_message):
+    # SQLite has no INTERVAL arithmetic; the statement shape is otherwise the same
+    values = FAILED_VALUES(model, current_time, error_message)
+    values["next_scrape_time"] = current_time
+    return values
+
+
+def load_shipments(session):
+    Shipment.__table__.create(session.get_bind())
+    session.add_all(
+        Shipment(shipment_id=uuid.uuid4(), terminal_id="T1", frequency=4,
+                 scrape_status=ScrapeStatus.IN_PROGRESS)
+        for _ in range(SHIPMENTS))
+    session.commit()
+    return session.query(Shipment).all()
+
+
+def count_statements(session):
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        if statement != "BEGIN":  # Emitted by the test session's transaction hook
+            statements.append(statement.split()[0])
+
+    event.listen(session.get_bind(), "before_cursor_execute", record)
+    return statements
+
+
+def test_mark_shipments_in_error_is_one_statement(session):
+    shipments = load_shipments(session)
+    service = ShipmentService(session, BaseRepository(session, Shipment))
+    statements = count_statements(session)
+
+    with mock.patch.object(SetFailedStatusRule, "column_values", side_effect=sqlite_failed_values):
+        service.mark_shipments_in_error(shipments[:SHIPMENTS // 2], "timeout")
+        # The returned columns are set on the shipments; reading them loads nothing
+        assert [shipment.error for shipment in shipments[:SHIPMENTS // 2]] == ["timeout"] * (SHIPMENTS // 2)
+    assert statements == ["UPDATE"]
+
+    statements.clear()
+    for shipment in shipments[SHIPMENTS // 2:]:
+        service.process_failed({"shipment": shipment, "error_message": "timeout"})
+    assert len(statements) >= SHIPMENTS // 2
+    assert {shipment.scrape_status for shipment in shipments} == {ScrapeStatus.FAILED}
+
+
+@pytest.mark.parametrize("rule", [SetFailedStatusRule(), SetInProgressStatusRule()])
+def test_shipments_without_frequency_are_not_rescheduled(rule):
+    shipment = Shipment(shipment_id=uuid.uuid4(), frequency=None,
+                        next_scrape_time=get_current_datetime_in_est())
+    context = {"shipment": shipment, "error_message": "timeout"}
+    rule.apply(context)
+    assert shipment.next_scrape_time is None
+    rule.apply_many([context])
+    assert shipment.next_scrape_time is None
+
+
+def test_apply_rules_many_reads_the_clock_once():
+    contexts = [{"shipment": Shipment(shipment_id=uuid.uuid4(), frequency=4), "error_message": "timeout"}
+                for _ in range(SHIPMENTS)]
+    engine = BusinessRuleEngine([SetFailedStatusRule()])
+    with mock.patch("commons.rules.catalog.set_status_in_failed_rule.get_current_datetime_in_est",
+                    wraps=get_current_datetime_in_est) as clock:
+        engine.apply_rules_many(contexts)
+    assert clock.call_count == 1
+    assert len({context["shipment"].next_scrape_time for context in contexts}) == 1
@@ -0,0 +1,25 @@
+import datetime
+import uuid
+from commons.enums import ScrapeStatus
+from commons.rules.catalog.stream_shipments_rule import StreamShipmentsRule
+from commons.schemas.shipment import Shipment
+
+
+def test_processed_failed_shipments_are_not_yielded_again(session):
+    Shipment.__table__.create(session.get_bind())
+    past = datetime.datetime(2020, 1, 1)
+    session.add_all(
+        Shipment(shipment_id=uuid.uuid4(), terminal_id="T1", scrape_status=ScrapeStatus.FAILED,
+                 frequency=4, next_scrape_time=past + datetime.timedelta(minutes=i))
+        for i in range(7))
+    session.commit()
+
+    seen = []
+    for shipment in StreamShipmentsRule().iter_shipments(session, "T1", chunk_size=2):
+        seen.append(shipment.shipment_id)
+        # Failing again keeps the row eligible and moves it behind the rows not yet streamed
+        shipment.next_scrape_time = datetime.datetime(2100, 1, 1)
+        session.commit()
+
+    assert len(seen) == 7
+    assert len(set(seen)) == 7
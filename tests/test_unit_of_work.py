@@ -0,0 +1,59 @@
+from unittest import mock
+import pytest
+from sqlalchemy.exc import IntegrityError, OperationalError, SQLAlchemyError
+from commons.repository import BaseRepository
+from tests.sqlite import Item
+
+
+def stored_names(session):
+    session.rollback()
+    return sorted(name for (name,) in session.query(Item.name))
+
+
+def test_bulk_rows_count_toward_the_chunk_size(session):
+    repo = BaseRepository(session, Item)
+    with mock.patch.object(repo, "_upsert_statements", return_value=(3, [])):
+        with repo.batch(size=3) as unit_of_work:
+            rows = [{"item_id": i, "name": str(i)} for i in range(3)]
+            repo.bulk_upsert(rows, ["item_id"])
+            # The chunk filled up and was committed
+            assert unit_of_work.pending == []
+
+
+def test_entity_whose_flush_failed_is_recorded(session):
+    repo = BaseRepository(session, Item)
+    with repo.batch(size=10) as unit_of_work:
+        repo.save(Item(item_id=1, name="a"))
+        invalid = Item(item_id=2, name=None)
+        with pytest.raises(IntegrityError):
+            repo.save(invalid)
+    assert unit_of_work.failed_entities(Item)[-1] is invalid
+    assert len(unit_of_work.failed_chunks) == 1
+
+
+def test_failed_read_keeps_the_pending_chunk(session):
+    repo = BaseRepository(session, Item)
+    with repo.batch(size=10) as unit_of_work:
+        repo.save(Item(item_id=1, name="a"))
+        with pytest.raises(SQLAlchemyError):
+            repo.get_by_fields(name=object())  # The driver cannot bind it
+        repo.save(Item(item_id=2, name="b"))
+    assert unit_of_work.failed_chunks == []
+    assert stored_names(session) == ["a", "b"]
+
+
+def test_final_commit_failure_is_recorded(session):
+    repo = BaseRepository(session, Item)
+    with mock.patch.object(session, "commit", side_effect=OperationalError("COMMIT", {}, None)):
+        with repo.batch(size=10) as unit_of_work:
+            item = Item(item_id=1, name="a")
+            repo.save(item)
+    assert unit_of_work.failed_entities() == [item]
+
+
+def test_final_commit_failure_without_recorded_writes_is_raised(session):
+    repo = BaseRepository(session, Item)
+    with mock.patch.object(session, "commit", side_effect=OperationalError("COMMIT", {}, None)):
+        with pytest.raises(OperationalError):
+            with repo.batch(size=10):
+                pass
@@ -0,0 +1,171 @@
+import datetime
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from unittest import mock
+import pytest
+from sqlalchemy import update
+from sqlalchemy.dialects import postgresql
+from commons.enums import ScrapeStatus
+from commons.schemas.shipment import Shipment
+from commons.services.writer import BatchWriter, WriteBehindWriter
+
+
+def make_writer():
+    # The background thread is not needed to test the batch logic
+    with mock.patch.object(BatchWriter, "__init__", return_value=None):
+        writer = WriteBehindWriter(mock.MagicMock())
+    writer.batch_size = 500
+    writer.submitted = []
+    writer.submit_item = writer.submitted.append
+    return writer
+
+
+def stored_shipment(session):
+    Shipment.__table__.create(session.get_bind())
+    shipment = Shipment(shipment_id=uuid.uuid4(), terminal_id="T1", frequency=4,
+                        scrape_status=ScrapeStatus.IN_PROGRESS, error="timeout")
+    session.add(shipment)
+    session.commit()
+    return shipment
+
+
+def test_submit_queues_changed_columns_and_expunges(session):
+    writer = make_writer()
+    shipment = stored_shipment(session)
+    shipment.scrape_status = ScrapeStatus.ACTIVE
+    shipment.error = None
+
+    writer.submit(shipment)
+
+    (row, container_row), = writer.submitted
+    assert set(row) == {"shipment_id", "scrape_status", "error", "updated_at"}
+    assert row["scrape_status"] == ScrapeStatus.ACTIVE and row["error"] is None
+    assert container_row is None
+    assert shipment not in session
+    session.flush()  # The caller's session no longer writes the shipment
+
+
+def test_batch_is_one_guarded_transaction():
+    writer = make_writer()
+    session = mock.MagicMock()
+    shipment_id = uuid.uuid4()
+    now = datetime.datetime(2025, 2, 5, 12, 0)
+    writer.write_batch(session, [
+        ({"shipment_id": shipment_id, "scrape_status": ScrapeStatus.ACTIVE, "updated_at": now}, None),
+        ({"shipment_id": shipment_id, "error": None, "updated_at": now}, None),
+    ])
+
+    stmt, = [call.args[0] for call in session.execute.call_args_list]
+    sql = str(stmt.compile(dialect=postgresql.dialect()))
+    # Both submits merged into one row with both changes
+    assert "scrape_status = excluded.scrape_status" in sql and "error = excluded.error" in sql
+    assert "WHERE shipments.updated_at IS NULL OR excluded.updated_at >= shipments.updated_at" in sql
+    session.commit.assert_called_once()
+
+
+def test_stale_snapshot_does_not_overwrite_a_later_write_in_the_same_second(session):
+    writer = make_writer()
+    shipment = stored_shipment(session)
+    shipment_id = shipment.shipment_id
+    shipment.scrape_status = ScrapeStatus.ACTIVE
+    # SQLite rejects DEFAULT in VALUES, so the queued row carries every column
+    snapshot = {column.key: getattr(shipment, column.key) for column in Shipment.__table__.columns}
+    writer.submit(shipment)
+    (row, _), = writer.submitted
+    writer.submitted[0] = ({**snapshot, **row}, None)
+    # A synchronous write right after the submit, as mark_shipments_in_error does
+    session.execute(update(Shipment).where(Shipment.shipment_id == shipment_id)
+                    .values(scrape_status=ScrapeStatus.FAILED))
+    session.commit()
+
+    writer.write_batch(session, writer.submitted)
+
+    stored = session.get(Shipment, shipment_id, populate_existing=True)
+    assert row["updated_at"] < stored.updated_at
+    assert stored.scrape_status == ScrapeStatus.FAILED
+
+
+class RecordingWriter(BatchWriter):
+    """Records the written batches; a batch blocks while `release` is cleared."""
+
+    def __init__(self, **kwargs):
+        self.batches = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+        super().__init__(mock.MagicMock(), **kwargs)
+
+    def write_batch(self, session, items):
+        self.started.set()
+        self.release.wait(5)
+        self.batches.append(list(items))
+
+
+def test_submit_blocks_and_times_out_when_the_queue_is_full():
+    writer = RecordingWriter(max_queue_size=1, batch_size=1, put_timeout=0.05)
+    writer.release.clear()
+    writer.submit_item("a")
+    assert writer.started.wait(5)  # "a" is being written, so the queue is empty
+    writer.submit_item("b")
+    start = time.monotonic()
+    with pytest.raises(queue.Full):
+        writer.submit_item("c")
+    assert time.monotonic() - start >= 0.05
+
+    writer.release.set()
+    writer.close()
+    assert writer.batches == [["a"], ["b"]]
+
+
+def test_flush_waits_for_the_queued_items():
+    writer = RecordingWriter(batch_size=100, flush_interval=0.05)
+    for item in range(3):
+        writer.submit_item(item)
+    writer.flush()
+    assert writer.batches == [[0, 1, 2]]
+    writer.close()
+
+
+def test_close_drains_the_queue_and_stops_the_thread():
+    writer = RecordingWriter(batch_size=2, flush_interval=10)
+    for item in range(5):
+        writer.submit_item(item)
+    writer.close()
+
+    assert [item for batch in writer.batches for item in batch] == list(range(5))
+    assert not writer._thread.is_alive()
+    writer.close()  # Closing twice is harmless
+    with pytest.raises(RuntimeError):
+        writer.submit_item(5)
+
+
+ATEXIT_SCRIPT = """
+import sys
+sys.path.insert(0, {root!r})
+from unittest import mock
+from commons.utils.logger import get_logger
+get_logger("tests")
+from commons.services.writer import BatchWriter
+
+class PrintingWriter(BatchWriter):
+    def write_batch(self, session, items):
+        print(*items, flush=True)
+
+writer = PrintingWriter(mock.MagicMock(), flush_interval=10)
+for item in range(3):
+    writer.submit_item(item)
+"""
+
+
+def test_items_left_at_exit_are_written():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    # The script exits without closing the writer; its atexit hook drains the queue
+    result = subprocess.run([sys.executable, "-c", ATEXIT_SCRIPT.format(root=root)],
+                            capture_output=True, text=True, timeout=60, cwd=root)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split() == ["0", "1", "2"]